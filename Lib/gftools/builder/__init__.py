@@ -13,12 +13,12 @@ from gftools.builder.fontc import FontcArgs
 import networkx as nx
 import strictyaml
 import yaml
-from fontmake.font_project import FontProject
 from ninja import _program
 from ninja.ninja_syntax import Writer, escape_path
 from typing import Union
 
 from gftools.builder.file import File
+from gftools.glyphscache import glyphs_to_designspace
 from gftools.builder.operations import OperationBase, OperationRegistry
 from gftools.builder.operations.copy import Copy
 from gftools.builder.recipeproviders import get_provider
@@ -146,20 +146,12 @@ class GFBuilder:
     def glyphs_to_ufo(self, source):
         source = Path(source)
         directory = source.resolve().parent
-        output = str(Path(directory) / source.with_suffix(".designspace").name)
-        glyph_data = self.config.get("glyphData")
-        if glyph_data is not None:
-            glyph_data = glyph_data
-        FontProject().run_from_glyphs(
-            str(source.resolve()),
-            **{
-                "output": ["ufo"],
-                "output_dir": directory,
-                "master_dir": directory,
-                "designspace_path": output,
-                "ufo_structure": "json",
-                "glyph_data": glyph_data,
-            },
+        glyphs_to_designspace(
+            str(source),
+            str(directory),
+            glyph_data=self.config.get("glyphData"),
+            designspace_name=source.with_suffix(".designspace").name,
+            ufo_structure="json",
         )
         return source.with_suffix(".designspace").name
 
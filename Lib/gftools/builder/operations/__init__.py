@@ -31,6 +31,9 @@ class OperationBase:
     in_place = False
     description = "A badly described rule"
     rule: str = "echo"  # Must be overridden in subclass
+    # Set when the rule leaves its output untouched if it would not change,
+    # so ninja can skip rebuilding whatever depends on it
+    restat = False
 
     def __eq__(self, other):
         return self.original == other.original
@@ -62,6 +65,7 @@ class OperationBase:
             name,
             f"{shell_quote(sys.executable)} -m gftools.builder.jobrunner {cmd}",
             description=name,
+            restat=cls.restat,
         )
         writer.newline()
 
@@ -1,14 +1,22 @@
 import os
+import sys
 from tempfile import TemporaryDirectory
 
 from gftools.builder.file import File
 from gftools.builder.operations import OperationBase
+from gftools.utils import shell_quote
 from glyphsLib.builder.axes import find_base_style
+from ninja.ninja_syntax import escape_path
 
 
 class Glyphs2DS(OperationBase):
     description = "Turn a Glyphs file into a Designspace file"
-    rule = "fontmake -o ufo -g $in --output-dir $outdir $fontmake_args"
+    # The conversion result is cached on disk (see gftools.glyphscache),
+    # so unchanged sources are not reconverted on every build.
+    rule = (
+        f"{shell_quote(sys.executable)} -m gftools.glyphscache"
+        " --output-dir $outdir $args $in"
+    )
 
     def convert_dependencies(self, builder):
         self._target = TemporaryDirectory()  # Stow object
@@ -31,6 +39,11 @@ class Glyphs2DS(OperationBase):
 
     @property
     def variables(self):
+        args = ""
+        if self.original.get("glyphData") is not None:
+            for glyphData in self.original["glyphData"]:
+                args += f" --glyph-data {escape_path(glyphData)}"
         return {
             "outdir": os.path.dirname(self.targets[0].path),
+            "args": args,
         }
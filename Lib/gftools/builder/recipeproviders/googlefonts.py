@@ -456,7 +456,8 @@ class GFBuilder(RecipeProviderBase):
         if source.is_glyphs:
             steps.append(
                 {
-                    "operation": "glyphs2ds",  # GlyphData?
+                    "operation": "glyphs2ds",
+                    "glyphData": self.config.get("glyphData"),
                 }
             )
         steps += [
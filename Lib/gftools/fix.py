@@ -25,6 +25,7 @@ from gftools.utils import (
     typo_metrics_enabled,
     validate_family,
     unique_name,
+    parallel_map,
 )
 from axisregistry import (
     build_filename,
@@ -32,16 +33,21 @@ from axisregistry import (
     build_fvar_instances,
     build_variations_ps_name,
 )
+from gftools.glyphmetrics import GlyphMetrics
 from gftools.stat import gen_stat_tables
 
 from os.path import basename, splitext
-from copy import deepcopy
+from copy import copy, deepcopy
 import logging
 import math
+import numpy as np
 import subprocess
+import filecmp
 import os
+import shutil
 import tempfile
 from datetime import datetime
+from io import BytesIO
 import re
 from gftools.constants import OFL_BODY_TEXT
 
@@ -71,8 +77,11 @@ __all__ = [
     "drop_superfluous_mac_names",
     "fix_font",
     "fix_family",
+    "fix_family_files",
     "rename_font",
     "fix_filename",
+    "font_is_modified",
+    "save_font",
 ]
 
 
@@ -110,6 +119,26 @@ def fixes(*fb_ids):
     return _predicate
 
 
+# Sentinel for fixers which may rewrite any table (e.g. by reordering glyphs)
+ANY_TABLE = frozenset(["*"])
+
+
+def uses_tables(reads=(), writes=()):
+    """Declare which tables a fixer reads and which it may modify.
+
+    The declarations document what each fixer touches. Whether a table was
+    actually modified is decided by compiling it, see
+    _release_unchanged_tables. A fixer which may modify anything should
+    declare writes=ANY_TABLE."""
+
+    def _predicate(func):
+        func.writes_tables = frozenset(writes)
+        func.reads_tables = frozenset(reads) | func.writes_tables
+        return func
+
+    return _predicate
+
+
 def _expect(
     ttFont: TTFont, table: str, field: str, value: any, getter=None, setter=None
 ) -> FixResult:
@@ -133,6 +162,7 @@ def _combine_results(*results: FixResult) -> FixResult:
 
 
 @fixes("com.google.fonts/check/unwanted_tables")
+@uses_tables()
 def remove_tables(ttFont: TTFont, tables=None) -> FixResult:
     """Remove unwanted tables from a font. The unwanted tables must belong
     to the UNWANTED_TABLES set.
@@ -165,6 +195,7 @@ def remove_tables(ttFont: TTFont, tables=None) -> FixResult:
     return True, [f"Removed tables '{list(tables_to_remove)}'"]
 
 
+@uses_tables(writes=["DSIG"])
 def add_dummy_dsig(ttFont: TTFont) -> FixResult:
     """Add a dummy dsig table to a font. Older versions of MS Word
     require this table.
@@ -185,6 +216,7 @@ def add_dummy_dsig(ttFont: TTFont) -> FixResult:
 
 
 @fixes("com.google.fonts/check/gasp")
+@uses_tables(writes=["gasp", "prep"])
 def fix_unhinted_font(ttFont: TTFont) -> FixResult:
     """Improve the appearance of an unhinted font on Win platforms by:
         - Add a new GASP table with a newtable that has a single
@@ -213,6 +245,7 @@ def fix_unhinted_font(ttFont: TTFont) -> FixResult:
 
 
 @fixes("com.google.fonts/check/integer_ppem_if_hinted")
+@uses_tables(writes=["head"])
 def fix_hinted_font(ttFont: TTFont) -> FixResult:
     """Improve the appearance of a hinted font on Win platforms by enabling
     the head table's flag 3.
@@ -226,6 +259,7 @@ def fix_hinted_font(ttFont: TTFont) -> FixResult:
 
 
 @fixes("com.google.fonts/check/fstype")
+@uses_tables(writes=["OS/2"])
 def fix_fs_type(ttFont: TTFont) -> FixResult:
     """Set the OS/2 table's fsType flag to 0 (Installable embedding).
 
@@ -236,6 +270,7 @@ def fix_fs_type(ttFont: TTFont) -> FixResult:
 
 
 @fixes("com.google.fonts/check/usweightclass")
+@uses_tables(reads=["fvar", "name"], writes=["OS/2"])
 def fix_weight_class(ttFont: TTFont) -> FixResult:
     """Set the OS/2 table's usWeightClass so it conforms to GF's supported
     styles table:
@@ -271,6 +306,7 @@ def fix_weight_class(ttFont: TTFont) -> FixResult:
 @fixes(
     "com.google.fonts/check/os2/use_typo_metrics", "com.google.fonts/check/fsselection"
 )
+@uses_tables(reads=["name"], writes=["OS/2"])
 def fix_fs_selection(ttFont: TTFont) -> FixResult:
     """Fix the OS/2 table's fsSelection so it conforms to GF's supported
     styles table:
@@ -296,6 +332,7 @@ def fix_fs_selection(ttFont: TTFont) -> FixResult:
     return _expect(ttFont, "OS/2", "fsSelection", fs_selection)
 
 
+@uses_tables(reads=["name"], writes=["head"])
 def fix_mac_style(ttFont: TTFont) -> FixResult:
     """Fix the head table's macStyle so it conforms to GF's supported
     styles table:
@@ -315,6 +352,7 @@ def fix_mac_style(ttFont: TTFont) -> FixResult:
 
 
 @fixes("com.google.fonts/check/fvar_instances")
+@uses_tables(reads=["STAT"], writes=["fvar", "name"])
 def fix_fvar_instances(ttFont, axis_dflts=None) -> FixResult:
     """Replace a variable font's fvar instances with a set of new instances
     that conform to the Google Fonts instance spec:
@@ -351,6 +389,7 @@ def fix_fvar_instances(ttFont, axis_dflts=None) -> FixResult:
 
 
 @fixes("com.google.fonts/check/font_names")
+@uses_tables(reads=["fvar", "post"], writes=["name", "OS/2", "head", "STAT"])
 def fix_nametable(ttFont) -> FixResult:
     """Fix a static font's name table so it conforms to the Google Fonts
     supported styles table:
@@ -375,6 +414,7 @@ def fix_nametable(ttFont) -> FixResult:
     return True, messages
 
 
+@uses_tables(reads=["fvar", "post"], writes=["name", "OS/2", "head", "STAT"])
 def rename_font(font, new_name, aggressive=True):
     current_name = font_familyname(font)
     if not current_name:
@@ -470,6 +510,7 @@ def copy_vertical_metrics(src_font, dst_font):
         setattr(dst_font[table], key, val)
 
 
+@uses_tables(reads=["name", "hhea"], writes=["post"])
 def fix_italic_angle(ttFont) -> FixResult:
     style_name = font_stylename(ttFont)
     if "Italic" not in style_name:
@@ -487,6 +528,7 @@ def fix_italic_angle(ttFont) -> FixResult:
 
 
 @fixes("com.google.fonts/check/caret_slope")
+@uses_tables(reads=["post", "head"], writes=["hhea"])
 def fix_hhea_caret_slope_run(ttFont: TTFont) -> FixResult:
     if ttFont["post"].italicAngle == 0:
         return False, []
@@ -503,6 +545,7 @@ def fix_hhea_caret_slope_run(ttFont: TTFont) -> FixResult:
 
 
 @fixes("com.google.fonts/check/name/unwanted_chars")
+@uses_tables(writes=["name"])
 def fix_ascii_fontmetadata(font: TTFont) -> FixResult:
     """Fixes TTF 'name' table strings to be ascii only"""
     results = []
@@ -548,6 +591,7 @@ def drop_mac_cmap(font, report=True):
     return drop
 
 
+@uses_tables(reads=["post"], writes=["cmap"])
 def fix_pua(font) -> FixResult:
     unencoded_glyphs = get_unencoded_glyphs(font)
     if not unencoded_glyphs:
@@ -576,20 +620,19 @@ def fix_pua(font) -> FixResult:
     # Map all glyphs to UCS-4 cmap Supplementary PUA-A codepoints
     # by 0xF0000 + glyphID
     ucs4cmap = cmap.getcmap(3, 10)
-    for glyphID, glyph in enumerate(font.getGlyphOrder()):
-        if glyph in unencoded_glyphs:
-            ucs4cmap.cmap[0xF0000 + glyphID] = glyph
+    for glyph in unencoded_glyphs:
+        ucs4cmap.cmap[0xF0000 + font.getGlyphID(glyph)] = glyph
     font["cmap"] = cmap
     return True, ["Added UCS-4 cmap for PUA glyphs"]
 
 
 @fixes("com.google.fonts/check/monospace")
+@uses_tables(reads=["hmtx"], writes=["post", "OS/2", "hhea"])
 def fix_isFixedPitch(ttfont) -> FixResult:
-    same_width = set()
-    glyph_metrics = ttfont["hmtx"].metrics
+    metrics = GlyphMetrics(ttfont)
     messages = []
-    for character in [chr(c) for c in range(65, 91)]:
-        same_width.add(glyph_metrics[character][0])
+    uppercase = [metrics.index(chr(c)) for c in range(65, 91)]
+    same_width = np.unique(metrics.advance[uppercase])
 
     if len(same_width) == 1:
         _, messages = _expect(ttfont, "post", "isFixedPitch", 1)
@@ -625,9 +668,9 @@ def fix_isFixedPitch(ttfont) -> FixResult:
                 ttfont["OS/2"].panose.bProportion = expected
                 changed = True
 
-        widths = [m[0] for m in ttfont["hmtx"].metrics.values() if m[0] > 0]
-        width_max = max(widths)
-        avg_width = otRound(sum(widths) / len(widths))
+        widths = metrics.advance[metrics.advance > 0]
+        width_max = int(widths.max())
+        avg_width = otRound(int(widths.sum()) / len(widths))
         changed, messages = _combine_results(
             (ttfont, messages),
             _expect(ttfont, "hhea", "advanceWidthMax", width_max),
@@ -652,6 +695,7 @@ def fix_isFixedPitch(ttfont) -> FixResult:
     return changed, messages
 
 
+@uses_tables(writes=["name"])
 def drop_superfluous_mac_names(ttfont) -> FixResult:
     """Drop superfluous Mac nameIDs.
 
@@ -677,6 +721,7 @@ def drop_superfluous_mac_names(ttfont) -> FixResult:
     drop_mac_names(ttfont, keep_ids=[1, 2, 3, 4, 5, 6, 16, 17, 18, 20, 21, 22, 25])
 
 
+@uses_tables(writes=["name"])
 def drop_mac_names(ttfont, keep_ids=[]) -> FixResult:
     """Drop all mac names"""
     messages = []
@@ -795,6 +840,7 @@ def fix_colr_v1_add_svg(ttfont) -> FixResult:
     "com.google.fonts/check/colorfont_tables",
     "com.google.fonts/check/empty_glyph_on_gid1_for_colrv0",
 )
+@uses_tables(reads=["COLR"], writes=ANY_TABLE)
 def fix_colr_font(ttfont: TTFont) -> FixResult:
     """For COLR v0 fonts, we need to ensure that the 2nd glyph is whitespace glyph,
     https://github.com/googlefonts/gftools/issues/609. For COLR v1 fonts, we need
@@ -820,6 +866,7 @@ def fix_colr_font(ttfont: TTFont) -> FixResult:
 
 
 @fixes("com.google.fonts/check/name/license", "com.google.fonts/check/name/license_url")
+@uses_tables(writes=["name"])
 def fix_license_strings(ttfont: TTFont) -> FixResult:
     """Update font's nametable license and license url strings"""
     from gftools.constants import OFL_LICENSE_URL, OFL_LICENSE_INFO
@@ -863,6 +910,7 @@ def fix_ofl_license(ttfont):
 
 
 @fixes("com.google.fonts/check/metadata/valid_nameid25")
+@uses_tables(reads=["fvar"], writes=["name"])
 def fix_no_varpsname(ttFont: TTFont) -> FixResult:
     if "fvar" not in ttFont:
         return ttFont, []
@@ -877,6 +925,101 @@ def fix_no_varpsname(ttFont: TTFont) -> FixResult:
     return ttFont, []
 
 
+def _copy_on_write(ttFont: TTFont) -> TTFont:
+    """Copy a font without decompiling or duplicating its untouched tables.
+
+    Tables which are already decompiled in the source (and so may carry
+    unsaved changes) are deep-copied. Every other table keeps pointing at
+    the source's compiled data and is only decompiled when first accessed."""
+    if ttFont.reader is None or ttFont.flavor is not None:
+        return deepcopy(ttFont)
+    fixed_font = TTFont(
+        recalcBBoxes=ttFont.recalcBBoxes,
+        recalcTimestamp=ttFont.recalcTimestamp,
+        ignoreDecompileErrors=ttFont.ignoreDecompileErrors,
+        cfg=ttFont.cfg,
+    )
+    fixed_font.sfntVersion = ttFont.sfntVersion
+    fixed_font._tableCache = None
+    fixed_font.reader = copy(ttFont.reader)
+    # Removing a table from the copy must not remove it from the source
+    fixed_font.reader.tables = dict(ttFont.reader.tables)
+    # Lazily decompiled tables may hold a reference back to their font
+    memo = {id(ttFont): fixed_font, id(ttFont.reader): fixed_font.reader}
+    fixed_font.tables = deepcopy(ttFont.tables, memo)
+    if hasattr(ttFont, "glyphOrder"):
+        fixed_font.glyphOrder = list(ttFont.glyphOrder)
+    return fixed_font
+
+
+def _release_unchanged_tables(ttFont: TTFont):
+    """Drop decompiled tables which compile back to their original data."""
+    if ttFont.reader is None:
+        return
+    # Compiling head would otherwise bump its modified timestamp
+    recalc_timestamp = ttFont.recalcTimestamp
+    ttFont.recalcTimestamp = False
+    checked = {"GlyphOrder"}
+    unchanged = []
+    try:
+        # Compiling a table may decompile others (hmtx loads hhea), so keep
+        # going until every decompiled table has been looked at
+        while pending := [t for t in ttFont.tables if t not in checked]:
+            for tag in pending:
+                checked.add(tag)
+                if tag in ttFont.reader:
+                    if ttFont.getTableData(tag) == ttFont.reader[tag]:
+                        unchanged.append(tag)
+    finally:
+        ttFont.recalcTimestamp = recalc_timestamp
+    for tag in unchanged:
+        del ttFont.tables[tag]
+
+
+def font_is_modified(ttFont: TTFont) -> bool:
+    """Check whether a font differs from the file it was loaded from.
+
+    Decompiled tables which turn out to be unchanged are released, so a
+    later save writes their original bytes."""
+    reader = ttFont.reader
+    if reader is None:
+        return True
+    if ttFont.sfntVersion != reader.sfntVersion or ttFont.flavor != reader.flavor:
+        return True
+    # Removing a table also removes it from the reader's directory
+    if len(reader.tables) != reader.numTables:
+        return True
+    _release_unchanged_tables(ttFont)
+    return any(tag != "GlyphOrder" for tag in ttFont.tables)
+
+
+def save_font(ttFont: TTFont, path: str) -> bool:
+    """Save a font, leaving the file at path alone if it would not change.
+
+    A font which is unmodified since it was loaded is written out as the
+    original file's bytes rather than being recompiled. Keeping the file
+    untouched lets ninja's restat skip the steps which depend on it.
+
+    Returns:
+        True if the file at path was written.
+    """
+    if font_is_modified(ttFont):
+        buf = BytesIO()
+        ttFont.save(buf)
+        data = buf.getvalue()
+    else:
+        ttFont.reader.file.seek(0)
+        data = ttFont.reader.file.read()
+    if os.path.isfile(path):
+        with open(path, "rb") as existing:
+            if existing.read() == data:
+                log.debug(f"{path} is unchanged, not saving")
+                return False
+    with open(path, "wb") as out:
+        out.write(data)
+    return True
+
+
 def fix_font(
     font: TTFont,
     include_source_fixes: bool = False,
@@ -884,7 +1027,7 @@ def fix_font(
     fvar_instance_axis_dflts: dict[str, float] | None = None,
     overwrite_fvar_instances: bool = True,
 ) -> TTFont:
-    fixed_font = deepcopy(font)
+    fixed_font = _copy_on_write(font)
     if new_family_name:
         rename_font(fixed_font, new_family_name)
     if fixed_font["OS/2"].version > 1:
@@ -895,9 +1038,10 @@ def fix_font(
         fix_hinted_font,
         fix_unhinted_font,
         fix_no_varpsname,
-        fix_colr_font,
         fix_hhea_caret_slope_run,
     ]
+    if "COLR" in fixed_font:
+        fixes.insert(4, fix_colr_font)
 
     if include_source_fixes:
         fixes.extend(
@@ -922,6 +1066,11 @@ def fix_font(
 
     if overwrite_fvar_instances:
         fix_fvar_instances(fixed_font, fvar_instance_axis_dflts)
+    # Tables which were only read, or which the fixes left as they were,
+    # are saved as their original compiled bytes. This is decided by
+    # compiling them rather than from the fixers' declarations, which can't
+    # see what the libraries they call (e.g. axisregistry) touch.
+    _release_unchanged_tables(fixed_font)
     return fixed_font
 
 
@@ -943,25 +1092,130 @@ def fix_family(
             fvar_instance_axis_dflts=fvar_instance_axis_dflts,
         )
         fixed_fonts.append(fixed_font)
-    family_name = font_familyname(fixed_fonts[0])
     if include_source_fixes:
-        try:
-            if Google_Fonts_has_family(family_name):
-                inherit_vertical_metrics(fixed_fonts)
-            else:
-                log.warning(
-                    f"{family_name} is not on Google Fonts. Skipping "
-                    "regression fixes"
-                )
-        except FileNotFoundError:
+        _fix_family_metrics(fixed_fonts)
+    return fixed_fonts
+
+
+def _fix_family_metrics(fonts):
+    """Run the fixes which need to see the whole family at once."""
+    family_name = font_familyname(fonts[0])
+    try:
+        if Google_Fonts_has_family(family_name):
+            inherit_vertical_metrics(fonts)
+        else:
             log.warning(
-                f"Google Fonts api key not found so we can't regression "
-                "fix fonts. See Repo readme to add keys."
+                f"{family_name} is not on Google Fonts. Skipping regression fixes"
             )
-        fix_vertical_metrics(fixed_fonts)
-        if all(["fvar" in f for f in fonts]):
-            gen_stat_tables(fixed_fonts)
-    return fixed_fonts
+    except FileNotFoundError:
+        log.warning(
+            f"Google Fonts api key not found so we can't regression "
+            "fix fonts. See Repo readme to add keys."
+        )
+    fix_vertical_metrics(fonts)
+    if all(["fvar" in f for f in fonts]):
+        gen_stat_tables(fonts)
+
+
+# The family wide fixes only read these tables and only modify the
+# second set, so that is all which needs to travel between processes.
+FAMILY_TABLES = ("head", "hhea", "OS/2", "name", "post", "fvar", "STAT")
+FAMILY_FIXED_TABLES = ("hhea", "OS/2", "name", "STAT")
+
+
+def _family_stub(ttFont):
+    stub = TTFont()
+    for tag in FAMILY_TABLES:
+        if tag in ttFont:
+            stub[tag] = ttFont[tag]
+    return stub
+
+
+def _fix_font_file(path, out_path, kwargs):
+    fixed_font = fix_font(TTFont(path, lazy=True), **kwargs)
+    save_font(fixed_font, out_path)
+    return _family_stub(fixed_font), fix_filename(fixed_font)
+
+
+def _merge_family_stub(path, stub, out_path):
+    font = TTFont(path)
+    for tag in FAMILY_FIXED_TABLES:
+        if tag in stub:
+            font[tag] = stub[tag]
+        elif tag in font:
+            del font[tag]
+    save_font(font, out_path)
+    return out_path
+
+
+def _move_if_changed(src, dst):
+    if os.path.isfile(dst) and filecmp.cmp(src, dst, shallow=False):
+        return
+    shutil.move(src, dst)
+
+
+def fix_family_files(
+    paths,
+    destination,
+    include_source_fixes=False,
+    new_family_name=None,
+    fvar_instance_axis_dflts=None,
+    jobs=None,
+):
+    """Fix all fonts in a family, reading and writing them from disk.
+
+    Same fixes as fix_family but the per font fixes run in a pool of
+    jobs processes and each fixed font is written to disk straight away.
+    The family wide fixes then run on small stand-in fonts holding only
+    the tables they need, so memory use does not grow with the size of
+    the family.
+
+    Args:
+        paths: paths of the fonts which make up the family
+        destination: callable taking a source path and the GF filename of
+            its fixed font, returning the path to save the fixed font to
+        jobs: number of worker processes. None uses every CPU, 1 runs
+            everything in the current process.
+
+    Returns:
+        a list of the paths the fixed fonts were saved to
+    """
+    fonts = [TTFont(p, lazy=True) for p in paths]
+    validate_family(fonts)
+    for font in fonts:
+        font.close()
+    del fonts
+
+    kwargs = dict(
+        include_source_fixes=include_source_fixes,
+        new_family_name=new_family_name,
+        fvar_instance_axis_dflts=fvar_instance_axis_dflts,
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_paths = [
+            os.path.join(tmp_dir, f"{i}-{basename(p)}") for i, p in enumerate(paths)
+        ]
+        results = list(
+            parallel_map(
+                _fix_font_file,
+                paths,
+                tmp_paths,
+                itertools.repeat(kwargs),
+                jobs=jobs,
+            )
+        )
+        stubs = [stub for stub, _ in results]
+        out_paths = [destination(p, name) for p, (_, name) in zip(paths, results)]
+
+        if not include_source_fixes:
+            for tmp_path, out_path in zip(tmp_paths, out_paths):
+                _move_if_changed(tmp_path, out_path)
+            return out_paths
+
+        _fix_family_metrics(stubs)
+        return list(
+            parallel_map(_merge_family_stub, tmp_paths, stubs, out_paths, jobs=jobs)
+        )
 
 
 class FontFixer:
@@ -981,10 +1235,10 @@ class FontFixer:
     def __del__(self):
         if self.report:
             print("\n".join(self.messages))
-        if self.saveit:
+        if self.saveit and font_is_modified(self.font):
             if self.verbose:
                 print("Saving %s to %s.fix" % (self.font_filename, self.path))
-            self.font.save(self.path + ".fix")
+            save_font(self.font, self.path + ".fix")
         elif self.verbose:
             print("There were no changes needed on %s!" % self.font_filename)
 
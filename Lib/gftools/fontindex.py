@@ -0,0 +1,435 @@
+"""An SQLite index of facts about the fonts in a google/fonts checkout.
+
+Many scripts walk the repository and open thousands of fonts only to read
+a few fields from their name, OS/2, head or post tables, or the families'
+METADATA.pb files. The index extracts those facts once and keeps them in
+a database, by default in the gftools user cache. Updating it only reads
+the files whose modification time or size has changed, and a cold build
+is spread over a process pool.
+
+    >>> from gftools.fontindex import FontIndex
+    >>> with FontIndex() as index:
+    ...     index.update("~/fonts/ofl")
+    ...     heavy = index.query("SELECT path FROM fonts WHERE us_weight_class > 800")
+
+Tables:
+
+fonts
+    One row per .ttf/.otf file. ``axes`` (fvar axes), ``panose`` and
+    ``codepoints`` (ranges of the Unicode cmaps, see :meth:`codepoints`)
+    are JSON. Fonts which can't be read have an ``error`` and no facts.
+names
+    Every name record of every font.
+metadata
+    One row per METADATA.pb. ``categories`` and ``subsets`` are JSON.
+metadata_fonts
+    The fonts listed in each METADATA.pb.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Set
+
+from fontTools.ttLib import TTFont
+
+from gftools.util.google_fonts import Metadata, UnicodeCmapTables
+from gftools.utils import gftools_cache_dir, parallel_map
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["FontIndex", "font_facts", "metadata_facts"]
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fonts (
+    path TEXT PRIMARY KEY,
+    family_dir TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    error TEXT,
+    family_name TEXT,
+    subfamily_name TEXT,
+    typo_family_name TEXT,
+    typo_subfamily_name TEXT,
+    full_name TEXT,
+    postscript_name TEXT,
+    version TEXT,
+    vendor_id TEXT,
+    us_weight_class INTEGER,
+    us_width_class INTEGER,
+    fs_selection INTEGER,
+    fs_type INTEGER,
+    panose TEXT,
+    italic_angle REAL,
+    units_per_em INTEGER,
+    mac_style INTEGER,
+    font_revision REAL,
+    num_glyphs INTEGER,
+    is_variable INTEGER,
+    axes TEXT,
+    codepoint_count INTEGER,
+    codepoints TEXT
+);
+CREATE INDEX IF NOT EXISTS fonts_family_dir ON fonts (family_dir);
+CREATE TABLE IF NOT EXISTS names (
+    path TEXT NOT NULL,
+    name_id INTEGER NOT NULL,
+    platform_id INTEGER NOT NULL,
+    plat_enc_id INTEGER NOT NULL,
+    lang_id INTEGER NOT NULL,
+    string TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS names_path ON names (path);
+CREATE TABLE IF NOT EXISTS metadata (
+    path TEXT PRIMARY KEY,
+    family_dir TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    error TEXT,
+    name TEXT,
+    designer TEXT,
+    license TEXT,
+    categories TEXT,
+    date_added TEXT,
+    subsets TEXT
+);
+CREATE TABLE IF NOT EXISTS metadata_fonts (
+    metadata_path TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    name TEXT,
+    style TEXT,
+    weight INTEGER,
+    full_name TEXT,
+    post_script_name TEXT,
+    copyright TEXT
+);
+CREATE INDEX IF NOT EXISTS metadata_fonts_path ON metadata_fonts (metadata_path);
+"""
+
+FONT_EXTENSIONS = (".ttf", ".otf")
+
+# Columns holding JSON, decoded by FontIndex.font() and metadata()
+_JSON_COLUMNS = frozenset(["panose", "axes", "codepoints", "categories", "subsets"])
+
+# How many extracted files to write between commits, so that an
+# interrupted cold build keeps most of its work
+_COMMIT_EVERY = 500
+
+
+def _ranges(codepoints: Iterable[int]) -> List[List[int]]:
+    ranges = []
+    for cp in sorted(codepoints):
+        if ranges and ranges[-1][1] == cp - 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    return ranges
+
+
+def font_facts(path: str) -> dict:
+    """Extract the indexed facts from a font. Returns the font's row, with
+    its name records under "names"."""
+    with TTFont(path, lazy=True) as font:
+        name = font["name"]
+        os2 = font["OS/2"]
+        head = font["head"]
+        codepoints = set()
+        for table in UnicodeCmapTables(font):
+            codepoints.update(table.cmap.keys())
+        axes = []
+        if "fvar" in font:
+            axes = [
+                {
+                    "tag": axis.axisTag,
+                    "min": axis.minValue,
+                    "default": axis.defaultValue,
+                    "max": axis.maxValue,
+                }
+                for axis in font["fvar"].axes
+            ]
+        return {
+            "family_name": name.getDebugName(1),
+            "subfamily_name": name.getDebugName(2),
+            "typo_family_name": name.getDebugName(16),
+            "typo_subfamily_name": name.getDebugName(17),
+            "full_name": name.getDebugName(4),
+            "postscript_name": name.getDebugName(6),
+            "version": name.getDebugName(5),
+            "vendor_id": os2.achVendID,
+            "us_weight_class": os2.usWeightClass,
+            "us_width_class": os2.usWidthClass,
+            "fs_selection": os2.fsSelection,
+            "fs_type": os2.fsType,
+            "panose": json.dumps(dict(sorted(vars(os2.panose).items()))),
+            "italic_angle": font["post"].italicAngle,
+            "units_per_em": head.unitsPerEm,
+            "mac_style": head.macStyle,
+            "font_revision": head.fontRevision,
+            "num_glyphs": font["maxp"].numGlyphs,
+            "is_variable": bool(axes),
+            "axes": json.dumps(axes),
+            "codepoint_count": len(codepoints),
+            "codepoints": json.dumps(_ranges(codepoints)),
+            "names": [
+                (
+                    record.nameID,
+                    record.platformID,
+                    record.platEncID,
+                    record.langID,
+                    record.toUnicode(errors="replace"),
+                )
+                for record in name.names
+            ],
+        }
+
+
+def metadata_facts(path: str) -> dict:
+    """Extract the indexed facts from a METADATA.pb. Returns its row, with
+    the fonts it lists under "fonts"."""
+    metadata = Metadata(path)
+    return {
+        "name": metadata.name,
+        "designer": metadata.designer,
+        "license": metadata.license,
+        "categories": json.dumps(list(metadata.category)),
+        "date_added": metadata.date_added,
+        "subsets": json.dumps(list(metadata.subsets)),
+        "fonts": [
+            (
+                font.filename,
+                font.name,
+                font.style,
+                font.weight,
+                font.full_name,
+                font.post_script_name,
+                font.copyright,
+            )
+            for font in metadata.fonts
+        ],
+    }
+
+
+def _extract(path: str, stat) -> dict:
+    is_metadata = os.path.basename(path) == "METADATA.pb"
+    try:
+        facts = metadata_facts(path) if is_metadata else font_facts(path)
+    except Exception as e:
+        facts = {"error": f"{type(e).__name__}: {e}"}
+    facts.update(
+        path=path,
+        family_dir=os.path.dirname(path),
+        mtime_ns=stat[0],
+        size=stat[1],
+    )
+    if not is_metadata:
+        facts["filename"] = os.path.basename(path)
+    return facts
+
+
+class FontIndex:
+    """The font fact index, kept in an SQLite database at ``path`` (by
+    default fontindex.sqlite in the gftools user cache). Paths are stored
+    absolute, so one index can hold several checkouts."""
+
+    def __init__(self, path=None):
+        self.path = str(path or gftools_cache_dir() / "fontindex.sqlite")
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def _known(self, table, root=None) -> Dict[str, tuple]:
+        if root is None:
+            rows = self.conn.execute(f"SELECT path, mtime_ns, size FROM {table}")
+        else:
+            prefix = os.path.join(root, "")
+            rows = self.conn.execute(
+                f"SELECT path, mtime_ns, size FROM {table} "
+                "WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix),
+            )
+        return {path: (mtime_ns, size) for path, mtime_ns, size in rows}
+
+    def update(self, root, jobs=None) -> Dict[str, int]:
+        """Bring the index up to date with the fonts and METADATA.pb files
+        under ``root``. Returns how many files were added, updated, removed
+        and found unchanged."""
+        root = os.path.abspath(os.path.expanduser(root))
+        found = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for filename in filenames:
+                if filename.endswith(FONT_EXTENSIONS) or filename == "METADATA.pb":
+                    path = os.path.join(dirpath, filename)
+                    st = os.stat(path)
+                    found[path] = (st.st_mtime_ns, st.st_size)
+        known = self._known("fonts", root)
+        known.update(self._known("metadata", root))
+        removed = known.keys() - found.keys()
+        for path in removed:
+            self._delete(path)
+        counts = self._refresh(found, known, jobs)
+        counts["removed"] = len(removed)
+        self.conn.commit()
+        return counts
+
+    def refresh(self, paths: Iterable[str], jobs=1) -> Dict[str, int]:
+        """Make sure the given fonts or METADATA.pb files are indexed and
+        up to date, e.g. before querying facts about a script's inputs."""
+        found = {}
+        for path in paths:
+            path = os.path.abspath(path)
+            st = os.stat(path)
+            found[path] = (st.st_mtime_ns, st.st_size)
+        if not found:
+            return {"added": 0, "updated": 0, "unchanged": 0}
+        known = {}
+        for table in ("fonts", "metadata"):
+            for path, mtime_ns, size in self.conn.execute(
+                f"SELECT path, mtime_ns, size FROM {table} WHERE path IN "
+                f"({','.join('?' * len(found))})",
+                list(found),
+            ):
+                known[path] = (mtime_ns, size)
+        counts = self._refresh(found, known, jobs)
+        self.conn.commit()
+        return counts
+
+    def _refresh(self, found, known, jobs) -> Dict[str, int]:
+        stale = sorted(path for path, stat in found.items() if known.get(path) != stat)
+        if stale:
+            logger.info(f"Indexing {len(stale)} files")
+            # Only start a process pool if there is work for it
+            jobs = jobs if len(stale) > 1 else 1
+        extracted = parallel_map(
+            _extract, stale, [found[path] for path in stale], jobs=jobs
+        )
+        for i, facts in enumerate(extracted, 1):
+            self._store(facts)
+            if i % _COMMIT_EVERY == 0:
+                self.conn.commit()
+        added = len([path for path in stale if path not in known])
+        return {
+            "added": added,
+            "updated": len(stale) - added,
+            "unchanged": len(found) - len(stale),
+        }
+
+    def _delete(self, path):
+        self.conn.execute("DELETE FROM fonts WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM names WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM metadata WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM metadata_fonts WHERE metadata_path = ?", (path,))
+
+    def _store(self, facts):
+        path = facts["path"]
+        self._delete(path)
+        names = facts.pop("names", [])
+        fonts = facts.pop("fonts", [])
+        table = "metadata" if os.path.basename(path) == "METADATA.pb" else "fonts"
+        self.conn.execute(
+            f"INSERT INTO {table} ({', '.join(facts)}) "
+            f"VALUES ({', '.join('?' * len(facts))})",
+            list(facts.values()),
+        )
+        self.conn.executemany(
+            "INSERT INTO names VALUES (?, ?, ?, ?, ?, ?)",
+            [(path, *record) for record in names],
+        )
+        self.conn.executemany(
+            "INSERT INTO metadata_fonts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(path, *font) for font in fonts],
+        )
+
+    def query(self, sql, params=()) -> List[sqlite3.Row]:
+        return self.conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _decode(row) -> Optional[dict]:
+        if row is None:
+            return None
+        return {
+            key: (
+                json.loads(row[key])
+                if key in _JSON_COLUMNS and row[key] is not None
+                else row[key]
+            )
+            for key in row.keys()
+        }
+
+    def font(self, path) -> Optional[dict]:
+        """The facts about a font, or None if it isn't indexed."""
+        row = self.conn.execute(
+            "SELECT * FROM fonts WHERE path = ?", (os.path.abspath(path),)
+        ).fetchone()
+        return self._decode(row)
+
+    def facts(self, paths: Iterable[str], jobs=1) -> List[dict]:
+        """The facts about each of the given fonts, indexing any which
+        aren't already.
+
+        Raises ValueError if one of the fonts can't be read."""
+        paths = list(paths)
+        self.refresh(paths, jobs=jobs)
+        facts = [self.font(path) for path in paths]
+        for path, font in zip(paths, facts):
+            if font is not None and font["error"]:
+                raise ValueError(f"Cannot read {path}: {font['error']}")
+        return facts
+
+    def fonts(self, family_dir) -> List[dict]:
+        """The facts about every font in a family directory."""
+        rows = self.conn.execute(
+            "SELECT * FROM fonts WHERE family_dir = ? ORDER BY filename",
+            (os.path.abspath(family_dir),),
+        )
+        return [self._decode(row) for row in rows]
+
+    def names(self, path, name_id=None) -> List[sqlite3.Row]:
+        """The name records of a font, optionally just those with the
+        given nameID."""
+        sql = "SELECT * FROM names WHERE path = ?"
+        params = [os.path.abspath(path)]
+        if name_id is not None:
+            sql += " AND name_id = ?"
+            params.append(name_id)
+        return self.conn.execute(sql, params).fetchall()
+
+    def codepoints(self, path) -> Set[int]:
+        """The codepoints in a font's Unicode cmaps, as with
+        gfsubsets.CodepointsInFont."""
+        font = self.font(path)
+        if font is None:
+            raise KeyError(f"{path} is not indexed")
+        if font["error"]:
+            raise ValueError(f"Cannot read {path}: {font['error']}")
+        return {cp for start, end in font["codepoints"] for cp in range(start, end + 1)}
+
+    def metadata(self, family_dir) -> Optional[dict]:
+        """The facts from a family's METADATA.pb, with the fonts it lists
+        under "fonts"."""
+        path = os.path.join(os.path.abspath(family_dir), "METADATA.pb")
+        row = self.conn.execute(
+            "SELECT * FROM metadata WHERE path = ?", (path,)
+        ).fetchone()
+        metadata = self._decode(row)
+        if metadata is not None:
+            metadata["fonts"] = [
+                dict(font)
+                for font in self.conn.execute(
+                    "SELECT * FROM metadata_fonts WHERE metadata_path = ?", (path,)
+                )
+            ]
+        return metadata
@@ -0,0 +1,188 @@
+"""Array-backed per-glyph metrics for a font
+
+GlyphMetrics exposes the advance width, left side bearing, bounding box
+and contour count of every glyph as NumPy arrays indexed by glyph ID, so
+fixes and checks which look at every glyph can be written as array
+operations instead of Python loops over the glyph order.
+
+When the hmtx, loca and glyf tables have not been decompiled yet, the
+arrays are read straight from their binary data, which avoids building a
+Python object per glyph. Tables which have been decompiled (and may hold
+unsaved changes) are read from the decompiled objects instead.
+
+    >>> metrics = GlyphMetrics(ttFont)
+    >>> metrics.advance[metrics.advance > 0].max()
+"""
+
+from functools import cached_property
+
+import numpy as np
+from fontTools.pens.boundsPen import BoundsPen
+from fontTools.ttLib import TTFont
+
+
+__all__ = ["GlyphMetrics"]
+
+
+class _ContourCountingBoundsPen(BoundsPen):
+    def __init__(self, glyphSet):
+        super().__init__(glyphSet)
+        self.contours = 0
+
+    def _moveTo(self, pt):
+        self.contours += 1
+        super()._moveTo(pt)
+
+
+class GlyphMetrics:
+    """Per-glyph metrics of a font, as arrays indexed by glyph ID.
+
+    Attributes are computed on first access, so only the tables a caller
+    actually needs are read. The arrays are a snapshot: build a new
+    GlyphMetrics after modifying the font's metrics or outlines.
+
+    Attributes:
+        glyph_order: the font's glyph order
+        advance: advance widths
+        lsb: left side bearings
+        bbox: (numGlyphs, 4) array of xMin, yMin, xMax, yMax; zero for
+            glyphs without outlines
+        num_contours: number of contours, following the glyf convention
+            of -1 for composite glyphs
+    """
+
+    def __init__(self, ttFont: TTFont):
+        self.font = ttFont
+        self.glyph_order = ttFont.getGlyphOrder()
+
+    def __len__(self):
+        return len(self.glyph_order)
+
+    @cached_property
+    def _gids(self):
+        return {name: gid for gid, name in enumerate(self.glyph_order)}
+
+    def index(self, glyph_name: str) -> int:
+        """Return the glyph ID of a glyph name, raising KeyError if the
+        font has no such glyph."""
+        return self._gids[glyph_name]
+
+    @property
+    def advance(self) -> np.ndarray:
+        return self._hmtx[0]
+
+    @property
+    def lsb(self) -> np.ndarray:
+        return self._hmtx[1]
+
+    @property
+    def num_contours(self) -> np.ndarray:
+        return self._outlines[0]
+
+    @property
+    def bbox(self) -> np.ndarray:
+        return self._outlines[1]
+
+    @property
+    def is_composite(self) -> np.ndarray:
+        return self.num_contours < 0
+
+    @property
+    def is_empty(self) -> np.ndarray:
+        """Glyphs with no outline, e.g. spaces"""
+        return self.num_contours == 0
+
+    @cached_property
+    def _hmtx(self):
+        font = self.font
+        num_glyphs = len(self.glyph_order)
+        if font.isLoaded("hmtx") or font.reader is None or "hmtx" not in font.reader:
+            metrics = font["hmtx"].metrics
+            pairs = np.array(
+                [metrics[name] for name in self.glyph_order], dtype=np.int64
+            ).reshape(num_glyphs, 2)
+            return pairs[:, 0], pairs[:, 1]
+
+        # Parse the binary table: numberOfHMetrics (advance, lsb) pairs
+        # followed by bare lsbs which share the last advance width
+        data = font.reader["hmtx"]
+        num_metrics = font["hhea"].numberOfHMetrics
+        pairs = np.frombuffer(data, dtype=">u2", count=num_metrics * 2)
+        pairs = pairs.reshape(num_metrics, 2).astype(np.int64)
+        advance = np.empty(num_glyphs, dtype=np.int64)
+        advance[:num_metrics] = pairs[:, 0]
+        advance[num_metrics:] = pairs[-1, 0]
+        lsb = np.empty(num_glyphs, dtype=np.int64)
+        lsb[:num_metrics] = pairs[:, 1].astype(np.uint16).view(np.int16)
+        lsb[num_metrics:] = np.frombuffer(
+            data, dtype=">i2", count=num_glyphs - num_metrics, offset=num_metrics * 4
+        )
+        return advance, lsb
+
+    @cached_property
+    def _outlines(self):
+        font = self.font
+        if "glyf" in font:
+            if font.isLoaded("glyf") or font.isLoaded("loca") or font.reader is None:
+                return self._decompiled_glyf_outlines()
+            return self._binary_glyf_outlines()
+        if "CFF " in font or "CFF2" in font:
+            return self._cff_outlines()
+        num_glyphs = len(self.glyph_order)
+        return np.zeros(num_glyphs, dtype=np.int64), np.zeros(
+            (num_glyphs, 4), dtype=np.int64
+        )
+
+    def _binary_glyf_outlines(self):
+        font = self.font
+        num_glyphs = len(self.glyph_order)
+        if font["head"].indexToLocFormat == 0:
+            offsets = np.frombuffer(
+                font.reader["loca"], dtype=">u2", count=num_glyphs + 1
+            )
+            offsets = offsets.astype(np.int64) * 2
+        else:
+            offsets = np.frombuffer(
+                font.reader["loca"], dtype=">u4", count=num_glyphs + 1
+            )
+            offsets = offsets.astype(np.int64)
+        glyf = np.frombuffer(font.reader["glyf"], dtype=np.uint8)
+
+        # Every non-empty glyph starts with a header of five int16s:
+        # numberOfContours, xMin, yMin, xMax, yMax
+        has_data = offsets[1:] > offsets[:-1]
+        starts = offsets[:-1][has_data]
+        header_bytes = glyf[starts[:, None] + np.arange(10)]
+        headers = header_bytes.view(">i2").reshape(-1, 5).astype(np.int64)
+
+        num_contours = np.zeros(num_glyphs, dtype=np.int64)
+        bbox = np.zeros((num_glyphs, 4), dtype=np.int64)
+        num_contours[has_data] = headers[:, 0]
+        bbox[has_data] = headers[:, 1:]
+        bbox[num_contours == 0] = 0
+        return num_contours, bbox
+
+    def _decompiled_glyf_outlines(self):
+        glyf = self.font["glyf"]
+        num_glyphs = len(self.glyph_order)
+        num_contours = np.zeros(num_glyphs, dtype=np.int64)
+        bbox = np.zeros((num_glyphs, 4), dtype=np.int64)
+        for gid, name in enumerate(self.glyph_order):
+            glyph = glyf[name]
+            num_contours[gid] = glyph.numberOfContours
+            if glyph.numberOfContours:
+                bbox[gid] = (glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax)
+        return num_contours, bbox
+
+    def _cff_outlines(self):
+        glyph_set = self.font.getGlyphSet()
+        num_glyphs = len(self.glyph_order)
+        num_contours = np.zeros(num_glyphs, dtype=np.int64)
+        bbox = np.zeros((num_glyphs, 4), dtype=np.int64)
+        for gid, name in enumerate(self.glyph_order):
+            pen = _ContourCountingBoundsPen(glyph_set)
+            glyph_set[name].draw(pen)
+            num_contours[gid] = pen.contours
+            if pen.bounds is not None:
+                bbox[gid] = np.round(pen.bounds)
+        return num_contours, bbox
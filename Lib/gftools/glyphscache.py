@@ -0,0 +1,181 @@
+"""Cached conversion of Glyphs sources to designspace + UFOs.
+
+Turning a large .glyphs file into UFOs (`fontmake -o ufo -g`) is one of
+the slowest steps of a subset-enabled build, and it produces exactly the
+same output every time the source is unchanged. This module keeps the
+converted designspace and masters in the gftools user cache, keyed by the
+contents of the source, the glyphData files passed to glyphsLib and the
+versions of the tools that did the conversion, so that repeated builds
+and sibling targets can simply copy the result into place.
+
+It is used directly by the builder and the subset merger, and by the
+*glyphs2ds* operation via `python -m gftools.glyphscache`.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+import fontmake
+import glyphsLib
+from filelock import FileLock
+from fontmake.font_project import FontProject
+
+from gftools.utils import (
+    gftools_cache_dir,
+    hash_path,
+    maybe_prune_cache,
+    touch_cache_entry,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(
+    source: str,
+    glyph_data: Optional[List[str]] = None,
+    designspace_name: Optional[str] = None,
+    ufo_structure: str = "package",
+) -> str:
+    """Return a key which changes whenever the conversion output could."""
+    hasher = hash_path(source)
+    for path in glyph_data or []:
+        hash_path(path, hasher)
+    hasher.update(
+        json.dumps(
+            {
+                "glyphsLib": glyphsLib.__version__,
+                "fontmake": fontmake.__version__,
+                "designspace_name": designspace_name,
+                "ufo_structure": ufo_structure,
+                "glyph_data": len(glyph_data or []),
+            },
+            sort_keys=True,
+        ).encode("utf-8")
+    )
+    return hasher.hexdigest()
+
+
+def _convert(
+    source: str,
+    directory: str,
+    glyph_data: Optional[List[str]],
+    designspace_name: Optional[str],
+    ufo_structure: str,
+):
+    designspace_path = None
+    if designspace_name:
+        designspace_path = os.path.join(directory, designspace_name)
+    FontProject().run_from_glyphs(
+        str(Path(source).resolve()),
+        **{
+            "output": ["ufo"],
+            "output_dir": directory,
+            "master_dir": directory,
+            "instance_dir": os.path.join(directory, "instance_ufo"),
+            "designspace_path": designspace_path,
+            "ufo_structure": ufo_structure,
+            "glyph_data": glyph_data,
+        },
+    )
+
+
+def glyphs_to_designspace(
+    source: str,
+    output_dir: str,
+    glyph_data: Optional[List[str]] = None,
+    designspace_name: Optional[str] = None,
+    ufo_structure: str = "package",
+    use_cache: bool = True,
+) -> str:
+    """Convert a Glyphs source into a designspace and UFO masters.
+
+    The designspace and its masters are written to `output_dir`; the path
+    to the designspace is returned. If `designspace_name` is not given,
+    glyphsLib's default file name (family name plus any common style) is
+    used, just as with `fontmake -o ufo`."""
+    os.makedirs(output_dir, exist_ok=True)
+    if not use_cache:
+        _convert(source, output_dir, glyph_data, designspace_name, ufo_structure)
+        return _find_designspace(output_dir, designspace_name)
+
+    cache_root = gftools_cache_dir("glyphs2ds")
+    key = cache_key(source, glyph_data, designspace_name, ufo_structure)
+    entry = cache_root / key
+    # Sibling targets are often converted concurrently by ninja; the lock
+    # makes sure only one of them does the work.
+    with FileLock(str(entry) + ".lock"):
+        if entry.is_dir():
+            logger.info(f"Reusing cached UFOs for {source}")
+            touch_cache_entry(entry)
+        else:
+            logger.info(f"Converting {source} to UFO")
+            staging = tempfile.mkdtemp(dir=cache_root, prefix=".tmp-")
+            try:
+                _convert(source, staging, glyph_data, designspace_name, ufo_structure)
+                os.replace(staging, entry)
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            maybe_prune_cache(cache_root)
+        # The copies must be newer than the source, or ninja would keep
+        # seeing the outputs as dirty: copy the contents without their
+        # timestamps, and touch the directories copytree stamps.
+        shutil.copytree(
+            entry, output_dir, copy_function=shutil.copy, dirs_exist_ok=True
+        )
+        for name in os.listdir(entry):
+            if os.path.isdir(entry / name):
+                for root, _, _ in os.walk(os.path.join(output_dir, name)):
+                    os.utime(root)
+    return _find_designspace(output_dir, designspace_name, entry)
+
+
+def _find_designspace(
+    output_dir: str, designspace_name: Optional[str], entry: Optional[Path] = None
+) -> str:
+    if designspace_name:
+        return os.path.join(output_dir, designspace_name)
+    # Only look at what the conversion produced, not at anything that
+    # might already be sitting next to it in the output directory.
+    candidates = sorted((entry or Path(output_dir)).glob("*.designspace"))
+    if len(candidates) != 1:
+        raise ValueError(f"Expected one designspace from conversion, got {candidates}")
+    return os.path.join(output_dir, candidates[0].name)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Convert a Glyphs file to designspace + UFOs, using a cache"
+    )
+    parser.add_argument("--output-dir", required=True, help="Output directory")
+    parser.add_argument(
+        "--glyph-data",
+        action="append",
+        default=[],
+        help="Custom GlyphData XML file (can be given multiple times)",
+    )
+    parser.add_argument(
+        "--ufo-structure", default="package", choices=["package", "zip", "json"]
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Always run the conversion"
+    )
+    parser.add_argument("source", help="Glyphs source file")
+    args = parser.parse_args(args)
+    glyphs_to_designspace(
+        args.source,
+        args.output_dir,
+        glyph_data=args.glyph_data or None,
+        ufo_structure=args.ufo_structure,
+        use_cache=not args.no_cache,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -266,29 +266,27 @@ def download_assets(
         if latest_release:
             release = upstream.get_latest_release()
             metadata.source.archive_url = release["assets"][0]["browser_download_url"]
-        z = download_file(metadata.source.archive_url)
-
-        zf = ZipFile(z)
-        for item in metadata.source.files:
-            out_fp = Path(out / item.dest_file)
-            if not out_fp.parent.exists():
-                os.makedirs(out_fp.parent, exist_ok=True)
-            found = False
-            for file in zf.namelist():
-                if file.endswith(item.source_file):
-                    if found:
-                        log.error(
-                            f"Found '{item.source_file}' more than once in archive '{metadata.source.archive_url}'"
-                        )
-                        continue
-                    found = True
-                    with open(out_fp, "wb") as f:
-                        f.write(zf.read(file))
-            if not found:
-                raise ValueError(
-                    f"Could not find '{item.source_file}' in archive '{metadata.source.archive_url}'"
-                )
-            res.append(out_fp)
+        with download_file(metadata.source.archive_url) as z, ZipFile(z) as zf:
+            for item in metadata.source.files:
+                out_fp = Path(out / item.dest_file)
+                if not out_fp.parent.exists():
+                    os.makedirs(out_fp.parent, exist_ok=True)
+                found = False
+                for file in zf.namelist():
+                    if file.endswith(item.source_file):
+                        if found:
+                            log.error(
+                                f"Found '{item.source_file}' more than once in archive '{metadata.source.archive_url}'"
+                            )
+                            continue
+                        found = True
+                        with zf.open(file) as src, open(out_fp, "wb") as f:
+                            shutil.copyfileobj(src, f)
+                if not found:
+                    raise ValueError(
+                        f"Could not find '{item.source_file}' in archive '{metadata.source.archive_url}'"
+                    )
+                res.append(out_fp)
         return res
 
     for item in metadata.source.files:
@@ -1,12 +1,36 @@
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+import hashlib
+import json
 import logging
 import os
 from pathlib import Path
+import shutil
 import subprocess
+import tempfile
+import threading
+import time
 import traceback
-from typing import List, Sequence
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence
+
+import fontTools
+from filelock import FileLock
+from fontTools.ttLib import TTFont
 
 from gftools.gfgithub import GitHubClient
-from gftools.utils import mkdir
+from gftools.utils import (
+    gftools_cache_dir,
+    hash_path,
+    maybe_prune_cache,
+    mkdir,
+    touch_cache_entry,
+)
+
+if TYPE_CHECKING:
+    from diffenator2.font import DFont
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -47,13 +71,478 @@ def all_relevant_files(fonts: Sequence[DFont]) -> List[str]:
     return files
 
 
+# Tables which change in metadata-only upgrades but which don't affect how
+# a font shapes or renders
+FINGERPRINT_IGNORED_TABLES = frozenset(["DSIG", "meta", "name"])
+
+
+def font_fingerprint(path) -> str:
+    """Hash the tables of a font which affect its outlines, layout and
+    metrics.
+
+    The name table, the head table's fontRevision, checkSumAdjustment and
+    timestamps and the DSIG and meta tables are ignored, so a font whose
+    only changes are to its metadata has the same fingerprint as before.
+    """
+    hasher = hashlib.sha256()
+    with TTFont(path, lazy=True) as font:
+        for tag in sorted(font.reader.keys()):
+            if tag in FINGERPRINT_IGNORED_TABLES:
+                continue
+            data = font.reader[tag]
+            if tag == "head":
+                # fontRevision and checkSumAdjustment, then created and modified
+                data = data[:4] + bytes(8) + data[12:20] + bytes(16) + data[36:]
+            hasher.update(tag.encode("ascii"))
+            hasher.update(len(data).to_bytes(4, "big"))
+            hasher.update(data)
+    return hasher.hexdigest()
+
+
+@dataclass
+class QAJob:
+    """An external QA tool run, with its outcome once it has finished."""
+
+    tool: str
+    cmd: List[str]
+    label: str = ""
+    on_done: Optional[Callable[["QAJob"], None]] = None
+    start: Optional[float] = None
+    end: Optional[float] = None
+    returncode: Optional[int] = None
+    timed_out: bool = False
+    exception: Optional[BaseException] = None
+    traceback: Optional[str] = None
+    # Files the run reads and the directory it writes into, for QACache
+    inputs: List[str] = field(default_factory=list)
+    output: Optional[str] = None
+    # How long the run took when its results were cached
+    cached_duration: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        if self.start is None or self.end is None:
+            return 0.0
+        return self.end - self.start
+
+    @property
+    def cached(self) -> bool:
+        return self.cached_duration is not None
+
+    @property
+    def failed(self) -> bool:
+        return self.timed_out or self.exception is not None or self.returncode != 0
+
+    def run(self, timeout: Optional[float] = None):
+        self.start = time.monotonic()
+        try:
+            self.returncode = subprocess.run(self.cmd, timeout=timeout).returncode
+        except subprocess.TimeoutExpired:
+            logger.error(f"{self.tool} {self.label} timed out after {timeout}s")
+            self.timed_out = True
+        except Exception as e:
+            self.exception = e
+            self.traceback = traceback.format_exc()
+        self.end = time.monotonic()
+
+
+_tool_version_lock = threading.Lock()
+
+
+def tool_version(executable: str) -> Optional[str]:
+    """The version a QA tool reports, or None if it can't be found."""
+    # Every run asks; make sure the tool is only asked once
+    with _tool_version_lock:
+        return _tool_version(executable)
+
+
+@lru_cache(maxsize=None)
+def _tool_version(executable: str) -> Optional[str]:
+    if executable == "fonttools":
+        # fonttools has no --version option
+        return fontTools.version
+    try:
+        process = subprocess.run(
+            [executable, "--version"], capture_output=True, text=True, timeout=60
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if process.returncode != 0:
+        return None
+    return process.stdout.strip() or None
+
+
+class QACache:
+    """Keeps the outputs of QA tool runs in the gftools user cache.
+
+    A run is keyed by its tool, the tool's version, its arguments and the
+    contents of its input files and of any other files its arguments name, so running QA again on fonts which haven't
+    changed restores the earlier reports instead of running the tools. The
+    paths of the inputs and of the output directory are left out of the
+    key, so results are shared between output directories and checkouts.
+    """
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root else gftools_cache_dir("qa")
+
+    def key(self, job: QAJob) -> Optional[str]:
+        """Returns None if the run can't be cached."""
+        version = tool_version(job.cmd[0])
+        if version is None or job.output is None:
+            return None
+        hasher = hashlib.sha256()
+        args = []
+        files = list(job.inputs)
+        for arg in job.cmd[1:]:
+            if arg in job.inputs:
+                args.append(f"<input {job.inputs.index(arg)}>")
+            elif arg.startswith(job.output):
+                args.append("<output>" + arg[len(job.output) :])
+            else:
+                args.append(arg)
+                # Other files the tool is pointed at, e.g. a config given
+                # in extra_args, are part of the key too. A directory
+                # can't be hashed reliably, so the run isn't cached.
+                path = arg.split("=", 1)[-1]
+                if os.path.isdir(path):
+                    return None
+                if os.path.isfile(path) and path not in files:
+                    files.append(path)
+        for path in files:
+            hasher.update(hash_path(path).digest())
+        hasher.update(
+            json.dumps(
+                {
+                    "tool": job.tool,
+                    "executable": job.cmd[0],
+                    "version": version,
+                    "args": args,
+                },
+                sort_keys=True,
+            ).encode("utf-8")
+        )
+        return hasher.hexdigest()
+
+    def run(self, job: QAJob, timeout: Optional[float] = None):
+        """Restore the job's outputs from the cache, or run it and cache
+        them. Runs which time out or can't be started are not cached."""
+        try:
+            key = self.key(job)
+        except Exception as e:
+            logger.warning(f"Cannot cache {job.tool} {job.label}: {e}")
+            key = None
+        if key is None:
+            job.run(timeout)
+            return
+        entry = self.root / key
+        with FileLock(str(entry) + ".lock"):
+            if entry.is_dir():
+                logger.info(f"Reusing cached {job.tool} results for {job.label}")
+                touch_cache_entry(entry)
+                job.start = time.monotonic()
+                shutil.copytree(entry / "output", job.output, dirs_exist_ok=True)
+                result = json.loads((entry / "result.json").read_text())
+                job.returncode = result["returncode"]
+                job.cached_duration = result["duration"]
+                job.end = time.monotonic()
+                return
+            job.run(timeout)
+            if job.returncode is None:
+                return
+            staging = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+            try:
+                shutil.copytree(job.output, os.path.join(staging, "output"))
+                with open(os.path.join(staging, "result.json"), "w") as fp:
+                    json.dump(
+                        {"returncode": job.returncode, "duration": job.duration}, fp
+                    )
+                os.replace(staging, entry)
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+        maybe_prune_cache(self.root)
+
+
+class QAScheduler:
+    """Runs QAJobs concurrently.
+
+    At most ``jobs`` run at once (one per CPU by default), and at most
+    ``tool_jobs[tool]`` of each tool which has a limit. Jobs start in the
+    order they were submitted, as soon as their limits allow; a job whose
+    tool is at its limit doesn't hold up the jobs of other tools.
+    """
+
+    def __init__(
+        self,
+        jobs: Optional[int] = None,
+        tool_jobs: Optional[Dict[str, int]] = None,
+        timeout: Optional[float] = None,
+        cache: Optional[QACache] = None,
+    ):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.tool_jobs = dict(tool_jobs or {})
+        self.timeout = timeout
+        self.cache = cache
+        self.finished: List[QAJob] = []
+        self.skipped: Dict[str, List[str]] = defaultdict(list)
+        self._pending: List[QAJob] = []
+        self._running: Counter = Counter()
+        self._condition = threading.Condition()
+
+    def submit(self, job: QAJob):
+        with self._condition:
+            self._pending.append(job)
+            self._dispatch()
+
+    def skip(self, tool: str, label: str):
+        """Record a run which wasn't needed, for the summary."""
+        with self._condition:
+            self.skipped[tool].append(label)
+
+    def _dispatch(self):
+        # Called with the condition's lock held
+        for job in list(self._pending):
+            if sum(self._running.values()) >= self.jobs:
+                return
+            limit = self.tool_jobs.get(job.tool)
+            if limit is not None and self._running[job.tool] >= limit:
+                continue
+            self._pending.remove(job)
+            self._running[job.tool] += 1
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job: QAJob):
+        try:
+            if self.cache is not None:
+                self.cache.run(job, self.timeout)
+            else:
+                job.run(self.timeout)
+            if job.on_done is not None:
+                job.on_done(job)
+        finally:
+            with self._condition:
+                self.finished.append(job)
+                self._running[job.tool] -= 1
+                self._dispatch()
+                self._condition.notify_all()
+
+    def wait(self) -> List[QAJob]:
+        """Block until every submitted job has finished."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: not self._pending and not any(self._running.values())
+            )
+        return self.finished
+
+    def summary(self) -> dict:
+        """Wall time of the whole run and of each tool, the total time
+        spent in jobs (roughly what running them one by one would take),
+        and the time saved by cached runs and, separately, an estimate of
+        that saved by skipped ones. The estimate is None when a tool
+        skipped every run, leaving nothing to base it on."""
+        finished = [job for job in self.finished if job.start is not None]
+        by_tool = defaultdict(list)
+        for job in finished:
+            by_tool[job.tool].append(job)
+        tools = {}
+        for tool in sorted(set(by_tool) | set(self.skipped)):
+            jobs = by_tool[tool]
+            cached = [j for j in jobs if j.cached]
+            skipped = len(self.skipped.get(tool, []))
+            cache_saved_time = sum(j.cached_duration for j in cached)
+            skip_saved_time = 0.0
+            if skipped:
+                # Skipped runs are assumed to take as long as the tool's
+                # others did; unknown if there were none
+                costs = [j.cached_duration if j.cached else j.duration for j in jobs]
+                skip_saved_time = sum(costs) / len(costs) * skipped if costs else None
+            tools[tool] = {
+                "jobs": len(jobs),
+                "failed": sum(j.failed for j in jobs),
+                "wall_time": _span(jobs),
+                "job_time": sum(j.duration for j in jobs),
+                "slowest": max(jobs, key=lambda j: j.duration).label if jobs else None,
+                "cached": len(cached),
+                "skipped": skipped,
+                "cache_saved_time": cache_saved_time,
+                "skip_saved_time": skip_saved_time,
+                "saved_time": _total([cache_saved_time, skip_saved_time]),
+            }
+        return {
+            "wall_time": _span(finished),
+            "job_time": sum(j.duration for j in finished),
+            "cache_saved_time": sum(t["cache_saved_time"] for t in tools.values()),
+            "skip_saved_time": _total(t["skip_saved_time"] for t in tools.values()),
+            "saved_time": _total(t["saved_time"] for t in tools.values()),
+            "tools": tools,
+        }
+
+
+def _total(times) -> Optional[float]:
+    """The sum of some durations, or None if any of them is unknown."""
+    times = list(times)
+    return None if None in times else sum(times)
+
+
+def _seconds(time: Optional[float]) -> str:
+    return "an unknown time" if time is None else f"{time:.1f}s"
+
+
+def _span(jobs: List[QAJob]) -> float:
+    if not jobs:
+        return 0.0
+    return max(j.end for j in jobs) - min(j.start for j in jobs)
+
+
 class FontQA:
-    def __init__(self, fonts, fonts_before=None, out="out", url=None):
+    """Runs the QA tools on a family.
+
+    Each tool method schedules the tool's runs (one per font or font pair)
+    on a shared QAScheduler and returns straight away; call :meth:`wait`
+    once everything has been scheduled. Runs which write into the same
+    directory are given an isolated directory each, whose contents are
+    moved into place when they finish.
+
+    Font pairs whose :func:`font_fingerprint` hasn't changed are not
+    diffed unless ``skip_unchanged`` is False; they are listed as
+    "unchanged" in the summary. Unless ``use_cache`` is False, the reports
+    of runs on the same files are restored from a :class:`QACache`.
+    """
+
+    def __init__(
+        self,
+        fonts,
+        fonts_before=None,
+        out="out",
+        url=None,
+        rust=False,
+        jobs=None,
+        tool_jobs=None,
+        timeout=None,
+        skip_unchanged=True,
+        use_cache=True,
+    ):
         self.fonts = fonts
         self.fonts_before = fonts_before
         self.out = out
         self.url = url
+        self.rust = rust
         self.has_error = False
+        self.skip_unchanged = skip_unchanged
+        self.scheduler = QAScheduler(
+            jobs, tool_jobs, timeout, cache=QACache() if use_cache else None
+        )
+        self._move_lock = threading.Lock()
+        self._font_pairs = None
+        self.unchanged: List[str] = []
+
+    def font_pairs(self):
+        """Pair up the before and after fonts, as (before, after) paths, and
+        split off the pairs which are unchanged."""
+        if self._font_pairs is not None:
+            return self._font_pairs
+        assert len(self.fonts) >= len(self.fonts_before)
+        pairs, unchanged = [], []
+        for f, f_before in zip(
+            sorted([f.path for f in self.fonts]),
+            sorted([f.path for f in self.fonts_before]),
+        ):
+            if self.skip_unchanged and self._same_font(f_before, f):
+                logger.info(f"{f} is unchanged; it will not be diffed")
+                unchanged.append((f_before, f))
+            else:
+                pairs.append((f_before, f))
+        self.unchanged = [f for _, f in unchanged]
+        self._font_pairs = pairs, unchanged
+        return self._font_pairs
+
+    def _same_font(self, f_before, f):
+        try:
+            return font_fingerprint(f_before) == font_fingerprint(f)
+        except Exception as e:
+            logger.warning(f"Cannot fingerprint {f_before} and {f}: {e}")
+            return False
+
+    def _schedule(
+        self, tool, cmd, label="", on_done=None, check=True, inputs=(), output=None
+    ):
+        """Run a command on the scheduler, then ``on_done(job)``. A failed
+        or timed out run sets has_error if ``check``; an exception is
+        reported as report_exceptions does. Runs which give the files they
+        read and the directory they write into can be cached."""
+
+        def done(job):
+            try:
+                if on_done is not None:
+                    on_done(job)
+                if job.exception is not None:
+                    raise job.exception
+            except Exception as e:
+                msg = f"Call to {tool} {label} failed:\n{e}"
+                print(msg)
+                print()
+                print(job.traceback or traceback.format_exc())
+                self.post_to_github(msg + "\n\n" + "See CI logs for more details")
+            else:
+                if check and job.failed:
+                    self.has_error = True
+
+        self.scheduler.submit(
+            QAJob(
+                tool,
+                cmd,
+                label,
+                on_done=done,
+                inputs=list(inputs),
+                output=output,
+            )
+        )
+
+    def _isolated_dir(self, dst, label):
+        return tempfile.mkdtemp(prefix=f".{label}-", dir=dst)
+
+    def _move_outputs(self, job_dir, dst, renames=None):
+        """Move everything a job wrote into its isolated directory into
+        ``dst``, renaming files given in ``renames``."""
+        renames = renames or {}
+        with self._move_lock:
+            for name in os.listdir(job_dir):
+                src = os.path.join(job_dir, name)
+                target = os.path.join(dst, renames.get(name, name))
+                if os.path.isdir(src):
+                    shutil.copytree(src, target, dirs_exist_ok=True)
+                else:
+                    os.replace(src, target)
+            shutil.rmtree(job_dir)
+
+    def wait(self):
+        """Wait for every scheduled tool to finish, then log how long they
+        took and write the timings to ``timings.json`` in the output
+        directory."""
+        self.scheduler.wait()
+        summary = self.scheduler.summary()
+        summary["unchanged"] = self.unchanged
+        logger.info(
+            f"QA tools finished in {summary['wall_time']:.1f}s "
+            f"({summary['job_time']:.1f}s of tool runs, "
+            f"{summary['cache_saved_time']:.1f}s saved by caching)"
+        )
+        if self.unchanged:
+            logger.info(
+                f"  {len(self.unchanged)} unchanged fonts were not diffed, "
+                f"saving about {_seconds(summary['skip_saved_time'])}"
+            )
+        for tool, timing in sorted(summary["tools"].items()):
+            logger.info(
+                f"  {tool}: {timing['jobs']} runs, {timing['failed']} failed, "
+                f"{timing['cached']} cached, {timing['skipped']} skipped, "
+                f"{timing['wall_time']:.1f}s wall, "
+                f"{timing['job_time']:.1f}s total, slowest {timing['slowest']}"
+            )
+        mkdir(self.out, overwrite=False)
+        with open(os.path.join(self.out, "timings.json"), "w") as fp:
+            json.dump(summary, fp, indent=2)
+        return summary
 
     @report_exceptions
     def diffenator3(self, **kwargs):
@@ -61,25 +550,44 @@ class FontQA:
         if not self.fonts_before:
             logger.warning("Cannot run Diffenator since there are no fonts before")
             return
-        assert len(self.fonts) >= len(self.fonts_before)
-        for f, f_before in zip(
-            sorted([f.path for f in self.fonts]),
-            sorted([f.path for f in self.fonts_before]),
-        ):
+        dst = os.path.join(self.out, "Diffenator")
+        mkdir(dst)
+        pairs, unchanged = self.font_pairs()
+        for _, f in unchanged:
+            self.scheduler.skip("diffenator3", Path(f).stem)
+        for f_before, f in pairs:
+            job_dir = self._isolated_dir(dst, Path(f).stem)
             cmd = [
                 "diffenator3",
                 "--html",
                 "--instance",
                 "*",
                 "--output",
-                os.path.join(self.out, "Diffenator"),
+                job_dir,
                 f_before,
                 f,
             ]
-            process = subprocess.run(cmd)
-            if process.returncode != 0:
-                self.has_error = True
-                return
+            self._schedule(
+                "diffenator3",
+                cmd,
+                Path(f).stem,
+                on_done=lambda job, job_dir=job_dir: self._move_outputs(job_dir, dst),
+                inputs=[f_before, f],
+                output=job_dir,
+            )
+
+    def _diff3proof(self, tool, dst, fonts, label):
+        job_dir = self._isolated_dir(dst, label)
+        cmd = ["diff3proof", "--output", job_dir] + fonts
+        renames = {"diff3proof.html": f"diff3proof-{label}.html"}
+        self._schedule(
+            tool,
+            cmd,
+            label,
+            on_done=lambda job: self._move_outputs(job_dir, dst, renames),
+            inputs=fonts,
+            output=job_dir,
+        )
 
     @report_exceptions
     def diffbrowsers(self, imgs=False):
@@ -89,26 +597,11 @@ class FontQA:
             return
         dst = os.path.join(self.out, "Diffbrowsers")
         mkdir(dst)
-        assert len(self.fonts) >= len(self.fonts_before)
-        for f, f_before in zip(
-            sorted([f.path for f in self.fonts]),
-            sorted([f.path for f in self.fonts_before]),
-        ):
-            cmd = [
-                "diff3proof",
-                "--output",
-                dst,
-                f_before,
-                f,
-            ]
-            process = subprocess.run(cmd)
-            if process.returncode != 0:
-                self.has_error = True
-            os.rename(
-                os.path.join(dst, "diff3proof.html"),
-                os.path.join(dst, f"diff3proof-{Path(f).stem}.html"),
-            )
-        return
+        pairs, unchanged = self.font_pairs()
+        for _, f in unchanged:
+            self.scheduler.skip("diffbrowsers", Path(f).stem)
+        for f_before, f in pairs:
+            self._diff3proof("diffbrowsers", dst, [f_before, f], Path(f).stem)
 
     @report_exceptions
     def proof(self, imgs=False):
@@ -116,21 +609,7 @@ class FontQA:
         dst = os.path.join(self.out, "Proof")
         mkdir(dst)
         for font in self.fonts:
-            cmd = [
-                "diff3proof",
-                "--output",
-                dst,
-                font.path,
-            ]
-            process = subprocess.run(cmd)
-            os.rename(
-                os.path.join(dst, "diff3proof.html"),
-                os.path.join(dst, f"diff3proof-{Path(font.path).stem}.html"),
-            )
-
-            if process.returncode != 0:
-                self.has_error = True
-                return
+            self._diff3proof("proof", dst, [font.path], Path(font.path).stem)
 
     @report_exceptions
     def interpolations(self):
@@ -139,10 +618,11 @@ class FontQA:
             return
         mkdir(dst)
         for font in self.fonts:
-            font_dst = os.path.join(dst, f"{os.path.basename(font.path[:-4])}.pdf")
             if not font.is_variable():
                 continue
-            if rust:
+            job_dir = self._isolated_dir(dst, Path(font.path).stem)
+            font_dst = os.path.join(job_dir, f"{os.path.basename(font.path[:-4])}.pdf")
+            if self.rust:
                 cmd = ["interpolatable", font.path, "--pdf", font_dst]
             else:
                 cmd = [
@@ -152,7 +632,15 @@ class FontQA:
                     "--pdf",
                     font_dst,
                 ]
-            subprocess.call(cmd)
+            self._schedule(
+                "interpolations",
+                cmd,
+                Path(font.path).stem,
+                on_done=lambda job, job_dir=job_dir: self._move_outputs(job_dir, dst),
+                check=False,
+                inputs=[font.path],
+                output=job_dir,
+            )
 
     @report_exceptions
     def fontbakery(self, profile="googlefonts", html=False, extra_args=None):
@@ -170,26 +658,20 @@ class FontQA:
             cmd.extend(["--html", os.path.join(out, "report.html")])
         if extra_args:
             cmd.extend(extra_args)
-        process = subprocess.run(cmd)
-
-        fontbakery_report = os.path.join(self.out, "Fontbakery", "report.md")
-        if not os.path.isfile(fontbakery_report):
-            logger.warning(
-                "Cannot Post Github message because no Fontbakery report exists"
-            )
-            return
-        with open(fontbakery_report) as doc:
-            msg = doc.read()
-            self.post_to_github(msg)
-
-        if process.returncode != 0:
-            self.has_error = True
+        self._schedule(
+            "fontbakery",
+            cmd,
+            on_done=lambda job: self._post_report("Fontbakery", out),
+            inputs=all_relevant_files(self.fonts),
+            output=out,
+        )
 
     @report_exceptions
     def fontspector(self, profile="googlefonts", html=False, extra_args=None):
         logger.info("Running Fontspector")
         out = os.path.join(self.out, "Fontspector")
         mkdir(out)
+        inputs = all_relevant_files(self.fonts)
         cmd = (
             [
                 "fontspector",
@@ -201,28 +683,32 @@ class FontQA:
                 "-e",
                 "error",
             ]
-            + all_relevant_files(self.fonts)
+            + inputs
             + ["--ghmarkdown", os.path.join(out, "report.md")]
         )
         if html:
             cmd.extend(["--html", os.path.join(out, "report.html")])
         if extra_args:
             cmd.extend(extra_args)
-        process = subprocess.run(cmd)
+        self._schedule(
+            "fontspector",
+            cmd,
+            on_done=lambda job: self._post_report("Fontspector", out),
+            inputs=inputs,
+            output=out,
+        )
 
-        fontspector_report = os.path.join(self.out, "Fontspector", "report.md")
-        if not os.path.isfile(fontspector_report):
+    def _post_report(self, tool, out):
+        report = os.path.join(out, "report.md")
+        if not os.path.isfile(report):
             logger.warning(
-                "Cannot Post Github message because no Fontspector report exists"
+                f"Cannot Post Github message because no {tool} report exists"
             )
             return
-        with open(fontspector_report) as doc:
+        with open(report) as doc:
             msg = doc.read()
             self.post_to_github(msg)
 
-        if process.returncode != 0:
-            self.has_error = True
-
     def googlefonts_upgrade(self, imgs=False):
         self.fontspector()
         self.diffenator3()
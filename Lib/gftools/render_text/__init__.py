@@ -11,12 +11,14 @@ See ``docs/gftools-render-text/spec.md`` for the design spec.
 
 from __future__ import annotations
 
+import hashlib
 import platform
 import re
 import sys
 from pathlib import Path
 from typing import Iterable, Iterator
 
+import numpy as np
 from fontTools.ttLib import TTFont
 from PIL import Image, ImageChops, ImageDraw, ImageFont
 
@@ -64,13 +66,35 @@ def iter_fvar_instances(
 ) -> Iterator[tuple[str, dict[str, float]]]:
     """Yield ``(subfamily_name, {axis_tag: value})`` for each fvar instance."""
     with TTFont(font_path) as font:
-        if "fvar" not in font:
-            return
-        fvar = font["fvar"]
-        name = font["name"]
-        for inst in fvar.instances:
-            label = name.getDebugName(inst.subfamilyNameID) or "Instance"
-            yield label, dict(inst.coordinates)
+        yield from _fvar_instances(font)
+
+
+def _fvar_instances(font: TTFont) -> Iterator[tuple[str, dict[str, float]]]:
+    if "fvar" not in font:
+        return
+    fvar = font["fvar"]
+    name = font["name"]
+    for inst in fvar.instances:
+        label = name.getDebugName(inst.subfamilyNameID) or "Instance"
+        yield label, dict(inst.coordinates)
+
+
+class RenderFont:
+    """A font opened once for rendering any number of waterfalls.
+
+    The font's line metrics and fvar instances are read, and the backend
+    parses the font, only once; every ppem of every waterfall rendered
+    from it (e.g. each instance for ``--all``) reuses them.
+    """
+
+    def __init__(self, font_path: Path, backend: str | None = None):
+        self.path = Path(font_path)
+        self.backend = backend or default_backend()
+        with TTFont(self.path, lazy=True) as font:
+            self.line_metrics = _line_metrics(font)
+            self.is_variable = "fvar" in font
+            self.instances = list(_fvar_instances(font))
+        self.renderer = _load_backend(self.backend).FontRenderer(self.path)
 
 
 _FILENAME_SAFE_RE = re.compile(r"[^A-Za-z0-9._-]+")
@@ -130,17 +154,29 @@ def output_subdir_for_instance(out_dir: Path, instance_name: str) -> Path:
 
 
 def render_waterfall(
-    font_path: Path,
+    font_path: Path | RenderFont,
     text: str,
     *,
     ppems: Iterable[int] = DEFAULT_PPEMS,
     variations: dict[str, float] | None = None,
     backend: str | None = None,
 ) -> Image.Image:
-    """Render ``text`` from ``font_path`` at each ppem and stack vertically."""
-    backend = backend or default_backend()
-    render_row = _load_backend(backend)
-    ascent_du, descent_du, upem = _font_line_metrics(font_path)
+    """Render ``text`` from ``font_path`` at each ppem and stack vertically.
+
+    ``font_path`` may also be a :class:`RenderFont`, to share the parsed
+    font between several waterfalls.
+    """
+    if isinstance(font_path, RenderFont):
+        font = font_path
+        if backend is not None and backend != font.backend:
+            raise ValueError(
+                f"font was opened for the {font.backend!r} backend, not {backend!r}"
+            )
+    else:
+        font = RenderFont(font_path, backend)
+    ascent_du, descent_du, upem = font.line_metrics
+    renderer = font.renderer
+    renderer.set_variations(variations)
     rows = []
     for ppem in ppems:
         ascent_px = int(round(ascent_du * ppem / upem))
@@ -148,33 +184,30 @@ def render_waterfall(
         target_h = ascent_px + descent_px + ROW_VPAD * 2
         baseline_y = ascent_px + ROW_VPAD
         rows.append(
-            render_row(
-                font_path,
+            renderer.render_row(
                 text,
                 ppem,
-                variations,
                 target_height=target_h,
                 baseline_y=baseline_y,
             )
         )
     canvas = _compose_waterfall(rows)
-    _annotate_platform(canvas, backend)
+    _annotate_platform(canvas, font.backend)
     return canvas
 
 
-def _font_line_metrics(font_path: Path) -> tuple[int, int, int]:
+def _line_metrics(font: TTFont) -> tuple[int, int, int]:
     """Return ``(ascent_du, descent_du, upem)`` from OS/2 typo metrics.
 
     All backends use this single source so row heights match across platforms.
     Falls back to ``hhea`` for fonts without an OS/2 table.
     """
-    with TTFont(font_path) as font:
-        upem = font["head"].unitsPerEm
-        os2 = font.get("OS/2")
-        if os2 is not None:
-            return os2.sTypoAscender, -os2.sTypoDescender, upem
-        hhea = font["hhea"]
-        return hhea.ascender, -hhea.descender, upem
+    upem = font["head"].unitsPerEm
+    os2 = font.get("OS/2")
+    if os2 is not None:
+        return os2.sTypoAscender, -os2.sTypoDescender, upem
+    hhea = font["hhea"]
+    return hhea.ascender, -hhea.descender, upem
 
 
 _BACKEND_DISPLAY = {
@@ -199,15 +232,15 @@ def _load_backend(name: str):
     if name == "freetype":
         from . import freetype_backend
 
-        return freetype_backend.render_row
+        return freetype_backend
     if name == "coretext":
         from . import coretext_backend
 
-        return coretext_backend.render_row
+        return coretext_backend
     if name == "directwrite":
         from . import directwrite_backend
 
-        return directwrite_backend.render_row
+        return directwrite_backend
     raise ValueError(f"unknown backend {name!r}")
 
 
@@ -256,6 +289,52 @@ def diff_image(before: Image.Image, after: Image.Image) -> Image.Image:
     return ImageChops.difference(after, before)
 
 
+def raster_digest(im: Image.Image) -> str:
+    """Return a SHA-256 hex digest of an image's mode, size and pixels.
+
+    Two renders with the same digest are identical, so a diff between them
+    can be skipped; CI can also compare digests across runs.
+    """
+    hasher = hashlib.sha256(f"{im.mode} {im.width}x{im.height}\n".encode("ascii"))
+    hasher.update(im.tobytes())
+    return hasher.hexdigest()
+
+
+def diff_stats(before: Image.Image, after: Image.Image) -> dict:
+    """Summarise how two same-sized images differ.
+
+    Returns a dict with the number of ``changed_pixels``, the largest
+    per-channel change (``max_delta``, 0-255) and the ``bbox`` of the
+    changes as ``[left, upper, right, lower]``, or ``None`` if the images
+    are identical.
+    """
+    if before.size != after.size:
+        raise ValueError(
+            f"diff inputs must match in size; got {before.size} vs {after.size}"
+        )
+    a = np.asarray(before, dtype=np.int16)
+    b = np.asarray(after, dtype=np.int16)
+    delta = np.abs(b - a)
+    if delta.ndim == 3:
+        delta = delta.max(axis=2)
+    changed = delta > 0
+    stats = {
+        "changed_pixels": int(changed.sum()),
+        "max_delta": int(delta.max(initial=0)),
+        "bbox": None,
+    }
+    if stats["changed_pixels"]:
+        rows = np.flatnonzero(changed.any(axis=1))
+        cols = np.flatnonzero(changed.any(axis=0))
+        stats["bbox"] = [
+            int(cols[0]),
+            int(rows[0]),
+            int(cols[-1]) + 1,
+            int(rows[-1]) + 1,
+        ]
+    return stats
+
+
 def save_animation(
     frames: list[Image.Image],
     path: Path,
@@ -23,6 +23,59 @@ except ModuleNotFoundError:
     )
 
 PADDING = 2
+# Size of the CTFont which variations are applied to; rows re-scale it
+_BASE_SIZE = 12
+
+
+class FontRenderer:
+    """A font loaded once into a CGFont, rendered at any ppem.
+
+    Variations are applied once when they change; each row copies the
+    resulting CTFont at its size.
+    """
+
+    def __init__(self, font_path: Path):
+        self.font_path = font_path
+        self.cg_font = _load_cg_font(font_path)
+        self.ct_font = CoreText.CTFontCreateWithGraphicsFont(
+            self.cg_font, _BASE_SIZE, None, None
+        )
+        self.variations: dict[str, float] | None = None
+
+    def set_variations(self, variations: dict[str, float] | None) -> None:
+        if variations == self.variations:
+            return
+        ct_font = CoreText.CTFontCreateWithGraphicsFont(
+            self.cg_font, _BASE_SIZE, None, None
+        )
+        if variations:
+            ct_font = _apply_variations(ct_font, variations, _BASE_SIZE)
+        self.ct_font = ct_font
+        self.variations = variations
+
+    def render_row(
+        self, text: str, ppem: int, *, target_height: int, baseline_y: int
+    ) -> Image.Image:
+        ct_font = CoreText.CTFontCreateCopyWithAttributes(
+            self.ct_font, ppem, None, None
+        )
+        line = _make_line(ct_font, text)
+
+        width_d, _ascent, _descent, _leading = _measure(line)
+        width = max(int(width_d) + PADDING * 2, 1)
+        # CG's drawing coords are bottom-left origin; convert baseline-from-top.
+        baseline_y_cg = target_height - baseline_y
+
+        ctx = _gray_bitmap_context(width, target_height)
+        Quartz.CGContextSetGrayFillColor(ctx, 1.0, 1.0)
+        Quartz.CGContextFillRect(ctx, ((0, 0), (width, target_height)))
+        Quartz.CGContextSetGrayFillColor(ctx, 0.0, 1.0)
+        Quartz.CGContextSetTextPosition(ctx, PADDING, baseline_y_cg)
+        CoreText.CTLineDraw(line, ctx)
+
+        pixels = Quartz.CGBitmapContextGetData(ctx).as_buffer(width * target_height)
+        img = Image.frombytes("L", (width, target_height), bytes(pixels))
+        return img.convert("RGB")
 
 
 def render_row(
@@ -34,27 +87,14 @@ def render_row(
     target_height: int,
     baseline_y: int,
 ) -> Image.Image:
-    ct_font = _make_ct_font(font_path, ppem, variations)
-    line = _make_line(ct_font, text)
-
-    width_d, _ascent, _descent, _leading = _measure(line)
-    width = max(int(width_d) + PADDING * 2, 1)
-    # CG's drawing coords are bottom-left origin; convert baseline-from-top.
-    baseline_y_cg = target_height - baseline_y
-
-    ctx = _gray_bitmap_context(width, target_height)
-    Quartz.CGContextSetGrayFillColor(ctx, 1.0, 1.0)
-    Quartz.CGContextFillRect(ctx, ((0, 0), (width, target_height)))
-    Quartz.CGContextSetGrayFillColor(ctx, 0.0, 1.0)
-    Quartz.CGContextSetTextPosition(ctx, PADDING, baseline_y_cg)
-    CoreText.CTLineDraw(line, ctx)
-
-    pixels = Quartz.CGBitmapContextGetData(ctx).as_buffer(width * target_height)
-    img = Image.frombytes("L", (width, target_height), bytes(pixels))
-    return img.convert("RGB")
+    renderer = FontRenderer(font_path)
+    renderer.set_variations(variations)
+    return renderer.render_row(
+        text, ppem, target_height=target_height, baseline_y=baseline_y
+    )
 
 
-def _make_ct_font(font_path: Path, ppem: int, variations: dict[str, float] | None):
+def _load_cg_font(font_path: Path):
     data = NSData.dataWithContentsOfFile_(str(font_path))
     if data is None:
         raise FileNotFoundError(font_path)
@@ -62,10 +102,7 @@ def _make_ct_font(font_path: Path, ppem: int, variations: dict[str, float] | Non
     cg_font = Quartz.CGFontCreateWithDataProvider(provider)
     if cg_font is None:
         raise RuntimeError(f"CoreText could not load font: {font_path}")
-    ct_font = CoreText.CTFontCreateWithGraphicsFont(cg_font, ppem, None, None)
-    if not variations:
-        return ct_font
-    return _apply_variations(ct_font, variations, ppem)
+    return cg_font
 
 
 def _apply_variations(ct_font, variations: dict[str, float], ppem: int):
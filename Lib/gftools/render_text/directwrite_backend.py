@@ -42,6 +42,59 @@ except ModuleNotFoundError:
 PADDING = 4
 
 
+class FontRenderer:
+    """A font loaded once as a Skia typeface, rendered at any ppem.
+
+    Variations are applied by cloning the typeface when they change, not
+    per row.
+    """
+
+    def __init__(self, font_path: Path):
+        self.font_path = font_path
+        self.default_typeface = skia.Typeface.MakeFromFile(str(font_path))
+        if self.default_typeface is None:
+            raise RuntimeError(f"Skia could not load font: {font_path}")
+        self.typeface = self.default_typeface
+        self.variations: dict[str, float] | None = None
+
+    def set_variations(self, variations: dict[str, float] | None) -> None:
+        if variations == self.variations:
+            return
+        if variations:
+            self.typeface = _apply_variations(self.default_typeface, variations)
+        else:
+            self.typeface = self.default_typeface
+        self.variations = variations
+
+    def render_row(
+        self, text: str, ppem: int, *, target_height: int, baseline_y: int
+    ) -> Image.Image:
+        font = skia.Font(self.typeface, float(ppem))
+        font.setSubpixel(True)
+
+        blob = skia.TextBlob.MakeFromString(text, font)
+        bounds = blob.bounds()
+        width = max(int(bounds.width()) + PADDING * 2, 1)
+
+        surface = skia.Surface(width, target_height)
+        with surface as canvas:
+            canvas.clear(skia.ColorWHITE)
+            paint = skia.Paint()
+            paint.setColor(skia.ColorBLACK)
+            paint.setAntiAlias(True)
+            canvas.drawTextBlob(blob, PADDING, baseline_y, paint)
+
+        info = skia.ImageInfo.Make(
+            width, target_height, skia.kRGBA_8888_ColorType, skia.kUnpremul_AlphaType
+        )
+        buffer = bytearray(width * target_height * 4)
+        if not surface.readPixels(info, buffer, width * 4, 0, 0):
+            raise RuntimeError("Skia surface.readPixels failed")
+        return Image.frombytes("RGBA", (width, target_height), bytes(buffer)).convert(
+            "RGB"
+        )
+
+
 def render_row(
     font_path: Path,
     text: str,
@@ -51,34 +104,11 @@ def render_row(
     target_height: int,
     baseline_y: int,
 ) -> Image.Image:
-    typeface = skia.Typeface.MakeFromFile(str(font_path))
-    if typeface is None:
-        raise RuntimeError(f"Skia could not load font: {font_path}")
-    if variations:
-        typeface = _apply_variations(typeface, variations)
-
-    font = skia.Font(typeface, float(ppem))
-    font.setSubpixel(True)
-
-    blob = skia.TextBlob.MakeFromString(text, font)
-    bounds = blob.bounds()
-    width = max(int(bounds.width()) + PADDING * 2, 1)
-
-    surface = skia.Surface(width, target_height)
-    with surface as canvas:
-        canvas.clear(skia.ColorWHITE)
-        paint = skia.Paint()
-        paint.setColor(skia.ColorBLACK)
-        paint.setAntiAlias(True)
-        canvas.drawTextBlob(blob, PADDING, baseline_y, paint)
-
-    info = skia.ImageInfo.Make(
-        width, target_height, skia.kRGBA_8888_ColorType, skia.kUnpremul_AlphaType
+    renderer = FontRenderer(font_path)
+    renderer.set_variations(variations)
+    return renderer.render_row(
+        text, ppem, target_height=target_height, baseline_y=baseline_y
     )
-    buffer = bytearray(width * target_height * 4)
-    if not surface.readPixels(info, buffer, width * 4, 0, 0):
-        raise RuntimeError("Skia surface.readPixels failed")
-    return Image.frombytes("RGBA", (width, target_height), bytes(buffer)).convert("RGB")
 
 
 def _apply_variations(typeface, variations: dict[str, float]):
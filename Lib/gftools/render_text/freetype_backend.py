@@ -6,6 +6,8 @@ in sync on variable fonts by applying the variation coords to both.
 
 from __future__ import annotations
 
+import ctypes
+from functools import lru_cache
 from pathlib import Path
 
 try:
@@ -16,10 +18,118 @@ except ModuleNotFoundError:
         "dependencies, see the ReadMe, "
         "https://github.com/googlefonts/gftools#installation"
     )
+import numpy as np
 import uharfbuzz as hb
-from fontTools.ttLib import TTFont
 from PIL import Image
 
+# Rendered glyph bitmaps kept per font, across rows and instances
+GLYPH_CACHE_SIZE = 4096
+
+
+class FontRenderer:
+    """A font parsed once by HarfBuzz and FreeType, rendered at any ppem.
+
+    Variations are applied to both faces when they change, not per row.
+    Glyphs are rasterised once per (glyph ID, ppem, location) and kept in
+    an LRU cache; glyphs are placed on whole pixels, so there is no
+    subpixel offset to key on.
+    """
+
+    def __init__(self, font_path: Path):
+        self.font_path = font_path
+        blob = hb.Blob.from_file_path(str(font_path))
+        face = hb.Face(blob)
+        self.hb_font = hb.Font(face)
+        self.ft_face = freetype.Face(str(font_path))
+        self.axes = [(axis.tag, axis.default_value) for axis in face.axis_infos]
+        self.variations: dict[str, float] | None = None
+        self.location: tuple[tuple[str, float], ...] = ()
+        self.ppem: int | None = None
+        self.glyph_bitmap = lru_cache(maxsize=GLYPH_CACHE_SIZE)(self._render_glyph)
+
+    def set_variations(self, variations: dict[str, float] | None) -> None:
+        if variations == self.variations:
+            return
+        self.hb_font.set_variations(variations or {})
+        if self.axes:
+            if variations:
+                self.ft_face.set_var_design_coords(
+                    [variations.get(tag, default) for tag, default in self.axes]
+                )
+            else:
+                self.ft_face.set_var_design_coords(None, reset=True)
+        self.variations = variations
+        self.location = tuple(sorted(variations.items())) if variations else ()
+
+    def render_row(
+        self, text: str, ppem: int, *, target_height: int, baseline_y: int
+    ) -> Image.Image:
+        glyph_infos, glyph_positions = self._shape(text, ppem)
+
+        pen_x = 0
+        glyphs: list[tuple[np.ndarray, int, int]] = []
+        for info, pos in zip(glyph_infos, glyph_positions):
+            bitmap, left, top = self.glyph_bitmap(info.codepoint, ppem, self.location)
+            if bitmap is not None:
+                x = pen_x + (pos.x_offset // 64) + left
+                y = baseline_y - (pos.y_offset // 64) - top
+                glyphs.append((bitmap, x, y))
+            pen_x += pos.x_advance // 64
+
+        width = max(pen_x, 1) + 4
+        canvas = np.full((target_height, width), 255, dtype=np.uint8)
+        for bitmap, x, y in glyphs:
+            _composite(canvas, bitmap, x + 2, y)
+        return Image.fromarray(canvas, "L").convert("RGB")
+
+    def _render_glyph(self, gid: int, ppem: int, location):
+        """Rasterise a glyph, returning its bitmap as ink on white and the
+        bitmap's offset from the pen position. ``location`` is only part of the cache key:
+        the face is already at the current variations."""
+        ft_face = self.ft_face
+        if ppem != self.ppem:
+            ft_face.set_pixel_sizes(0, ppem)
+            self.ppem = ppem
+        ft_face.load_glyph(gid, freetype.FT_LOAD_RENDER)
+        slot = ft_face.glyph
+        bm = slot.bitmap
+        if not (bm.width and bm.rows):
+            return None, 0, 0
+        pitch = abs(bm.pitch)
+        # Read the buffer directly; Bitmap.buffer builds a list of every byte
+        data = ctypes.string_at(bm._FT_Bitmap.buffer, bm.rows * pitch)
+        coverage = np.frombuffer(data, dtype=np.uint8).reshape(bm.rows, pitch)
+        # uint16 so that compositing can multiply without overflowing
+        bitmap = 255 - coverage[:, : bm.width].astype(np.uint16)
+        bitmap.flags.writeable = False
+        return bitmap, slot.bitmap_left, slot.bitmap_top
+
+    def _shape(self, text: str, ppem: int):
+        self.hb_font.scale = (ppem * 64, ppem * 64)
+        buf = hb.Buffer()
+        buf.add_str(text)
+        buf.guess_segment_properties()
+        hb.shape(self.hb_font, buf)
+        return buf.glyph_infos, buf.glyph_positions
+
+
+def _composite(canvas: np.ndarray, bitmap: np.ndarray, x: int, y: int) -> None:
+    """Darken ``canvas`` with ``bitmap`` placed at (x, y), clipped to the
+    canvas.
+
+    The two are multiplied, rounding as PIL does when pasting black ink
+    through a coverage mask, so rows are pixel-identical to doing that.
+    """
+    height, width = canvas.shape
+    rows, cols = bitmap.shape
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + cols, width), min(y + rows, height)
+    if x0 >= x1 or y0 >= y1:
+        return
+    region = canvas[y0:y1, x0:x1]
+    blended = region * bitmap[y0 - y : y1 - y, x0 - x : x1 - x] + 127
+    region[...] = blended // 255
+
 
 def render_row(
     font_path: Path,
@@ -30,68 +140,8 @@ def render_row(
     target_height: int,
     baseline_y: int,
 ) -> Image.Image:
-    glyph_infos, glyph_positions = _shape(font_path, text, ppem, variations)
-    ft_face = _make_ft_face(font_path, ppem, variations)
-
-    pen_x = 0
-    glyphs: list[tuple[Image.Image, int, int]] = []
-    for info, pos in zip(glyph_infos, glyph_positions):
-        ft_face.load_glyph(info.codepoint, freetype.FT_LOAD_RENDER)
-        slot = ft_face.glyph
-        bm = slot.bitmap
-        if bm.width and bm.rows:
-            glyph_img = Image.frombytes("L", (bm.width, bm.rows), bytes(bm.buffer))
-            x = pen_x + (pos.x_offset // 64) + slot.bitmap_left
-            y = baseline_y - (pos.y_offset // 64) - slot.bitmap_top
-            glyphs.append((glyph_img, x, y))
-        pen_x += pos.x_advance // 64
-
-    width = max(pen_x, 1) + 4
-    canvas = Image.new("L", (width, target_height), 255)
-    for glyph_img, x, y in glyphs:
-        ink = Image.new("L", glyph_img.size, 0)
-        canvas.paste(ink, (x + 2, y), mask=glyph_img)
-    return canvas.convert("RGB")
-
-
-def _shape(
-    font_path: Path,
-    text: str,
-    ppem: int,
-    variations: dict[str, float] | None,
-):
-    blob = hb.Blob.from_file_path(str(font_path))
-    face = hb.Face(blob)
-    font = hb.Font(face)
-    font.scale = (ppem * 64, ppem * 64)
-    if variations:
-        font.set_variations(variations)
-    buf = hb.Buffer()
-    buf.add_str(text)
-    buf.guess_segment_properties()
-    hb.shape(font, buf)
-    return buf.glyph_infos, buf.glyph_positions
-
-
-def _make_ft_face(
-    font_path: Path, ppem: int, variations: dict[str, float] | None
-) -> freetype.Face:
-    face = freetype.Face(str(font_path))
-    face.set_pixel_sizes(0, ppem)
-    if variations:
-        coords = _design_coords_in_axis_order(font_path, variations)
-        if coords is not None:
-            face.set_var_design_coords(coords)
-    return face
-
-
-def _design_coords_in_axis_order(
-    font_path: Path, variations: dict[str, float]
-) -> list[float] | None:
-    with TTFont(font_path) as font:
-        if "fvar" not in font:
-            return None
-        return [
-            variations.get(axis.axisTag, axis.defaultValue)
-            for axis in font["fvar"].axes
-        ]
+    renderer = FontRenderer(font_path)
+    renderer.set_variations(variations)
+    return renderer.render_row(
+        text, ppem, target_height=target_height, baseline_y=baseline_y
+    )
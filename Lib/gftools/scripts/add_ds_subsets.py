@@ -90,6 +90,13 @@ Example usage:
     parser.add_argument(
         "--json", "-j", action="store_true", help="Use JSON structured UFOs"
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of masters to merge in parallel (default: 1; "
+        "0 for one per CPU)",
+    )
     parser.add_argument(
         "--exclude-codepoints", help="Space-delimited unicodes to exclude"
     )
@@ -165,6 +172,7 @@ Example usage:
         googlefonts=args.googlefonts,
         json=args.json,
         allow_sparse=args.allow_sparse,
+        jobs=args.jobs or None,
     ).add_subsets()
 
 
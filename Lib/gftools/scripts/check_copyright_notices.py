@@ -19,6 +19,7 @@ import os
 import tabulate
 from fontTools import ttLib
 from gftools.constants import NAMEID_COPYRIGHT_NOTICE, PLATID_STR
+from gftools.fontindex import FontIndex
 
 parser = argparse.ArgumentParser(description="Print out copyright" " nameIDs strings")
 parser.add_argument("font", nargs="+")
@@ -28,29 +29,45 @@ parser.add_argument(
     action="store_true",
     help="Output data in comma-separate-values" " (CSV) file format",
 )
+parser.add_argument(
+    "--index",
+    default=False,
+    action="store_true",
+    help="Read the fonts through the gftools font index (see gftools font-index)",
+)
 
 
 def main(args=None):
     args = parser.parse_args(args)
 
     rows = []
-    for font in args.font:
-        ttfont = ttLib.TTFont(font)
-        for name in ttfont["name"].names:
-            if name.nameID != NAMEID_COPYRIGHT_NOTICE:
-                continue
-
-            value = name.string.decode(name.getEncoding()) or ""
-            rows.append(
-                [
-                    os.path.basename(font),
-                    value,
-                    len(value),
-                    "{} ({})".format(
-                        name.platformID, PLATID_STR.get(name.platformID, "?")
-                    ),
-                ]
-            )
+    if args.index:
+        with FontIndex() as index:
+            # Fails on fonts which can't be read, as opening them would
+            index.facts(args.font)
+            notices = [
+                (font, record["string"], record["platform_id"])
+                for font in args.font
+                for record in index.names(font, NAMEID_COPYRIGHT_NOTICE)
+            ]
+    else:
+        notices = []
+        for font in args.font:
+            ttfont = ttLib.TTFont(font)
+            for name in ttfont["name"].names:
+                if name.nameID != NAMEID_COPYRIGHT_NOTICE:
+                    continue
+                value = name.string.decode(name.getEncoding()) or ""
+                notices.append((font, value, name.platformID))
+    for font, value, platform_id in notices:
+        rows.append(
+            [
+                os.path.basename(font),
+                value,
+                len(value),
+                "{} ({})".format(platform_id, PLATID_STR.get(platform_id, "?")),
+            ]
+        )
 
     header = ["filename", "copyright notice", "char length", "platformID"]
 
@@ -33,6 +33,23 @@ parser.add_argument("font", help="Fonts in OpenType (TTF/OTF) format")
 parser.add_argument("language", help="Language to pass to Harfbuzz", nargs="?")
 parser.add_argument("ymin", help="Minimum extent for UI fonts", nargs="?", type=int)
 parser.add_argument("ymax", help="Maximum extent for UI fonts", nargs="?", type=int)
+parser.add_argument(
+    "--variations",
+    help='Location to check a variable font at, e.g. "wght=700 wdth=75"',
+)
+parser.add_argument(
+    "--max-len",
+    type=int,
+    help="Check every combination of the font's characters up to this "
+    "length, instead of the text read from stdin",
+)
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="Number of processes to shape with; 0 for one per CPU. Default: 1.",
+)
 
 __author__ = "roozbeh@google.com (Roozbeh Pournader)"
 
@@ -40,10 +57,16 @@ import itertools
 import os
 import re
 import sys
+import weakref
 import xml.etree.ElementTree
+import numpy as np
 from vharfbuzz import Vharfbuzz
 from fontTools.ttLib import TTFont
 from fontTools.pens.boundsPen import BoundsPen
+from gftools.utils import parallel_map_unordered, parse_axis_dflts
+
+# Number of strings shaped per task when checking in parallel
+CHUNK_SIZE = 1000
 
 
 def _regular_expression_from_set(character_set):
@@ -60,23 +83,59 @@ def _regular_expression_from_set(character_set):
     return re.compile(regexp)
 
 
+class GlyphExtents:
+    """The vertical extents of every glyph of a font at one location,
+    indexed by glyph ID.
+
+    The outlines are only drawn once, here; ``ymin`` and ``ymax`` are NaN
+    for glyphs without outlines.
+    """
+
+    def __init__(self, font, location=None):
+        if location:
+            glyph_set = font.getGlyphSet(location=location)
+        else:
+            glyph_set = font.getGlyphSet()
+        glyph_order = font.getGlyphOrder()
+        self.ymin = np.full(len(glyph_order), np.nan)
+        self.ymax = np.full(len(glyph_order), np.nan)
+        for glyph_id, glyphname in enumerate(glyph_order):
+            pen = BoundsPen(glyph_set, ignoreSinglePoints=True)
+            glyph_set[glyphname].draw(pen)
+            if pen.bounds:
+                self.ymin[glyph_id] = pen.bounds[1]
+                self.ymax[glyph_id] = pen.bounds[3]
+        # Plain lists are faster to index one glyph at a time
+        self._ymin = [None if np.isnan(y) else y for y in self.ymin.tolist()]
+        self._ymax = [None if np.isnan(y) else y for y in self.ymax.tolist()]
+
+    def __getitem__(self, glyph_id):
+        return self._ymin[glyph_id], self._ymax[glyph_id]
+
+
+# GlyphExtents of fonts at their default location
+_font_extents = weakref.WeakKeyDictionary()
+
+
+def _default_extents(font):
+    if font not in _font_extents:
+        _font_extents[font] = GlyphExtents(font)
+    return _font_extents[font]
+
+
 def get_glyph_vertical_extents(glyph_id, font):
-    glyph_order = font.getGlyphOrder()
-    glyf_set = font.getGlyphSet()
-    glyphname = glyph_order[glyph_id]
-    ttglyph = glyf_set[glyphname]
-    pen = BoundsPen(glyf_set, ignoreSinglePoints=True)
-    ttglyph.draw(pen)
-    if not pen.bounds:
-        return None, None
-    return pen.bounds[1], pen.bounds[3]
-
-
-def buf_extents(buf, font):
+    return _default_extents(font)[glyph_id]
+
+
+def buf_extents(buf, extents):
+    """Returns the vertical extents of a shaped buffer, or None if none of
+    its glyphs have outlines. ``extents`` is a GlyphExtents or a TTFont."""
+    if not isinstance(extents, GlyphExtents):
+        extents = _default_extents(extents)
     maxes = []
     mins = []
     for info, pos in zip(buf.glyph_infos, buf.glyph_positions):
-        glyph_ymin, glyph_ymax = get_glyph_vertical_extents(info.codepoint, font)
+        glyph_ymin, glyph_ymax = extents[info.codepoint]
         if glyph_ymax is not None:
             glyph_vertical_offset = pos.position[1]
             maxes.append(glyph_ymax + glyph_vertical_offset)
@@ -85,42 +144,123 @@ def buf_extents(buf, font):
         return min(mins), max(maxes)
 
 
-def test_rendering(data, font_file_name, min_allowed, max_allowed, language=None):
+class _ExtentsChecker:
+    """Shapes strings with one font at one location and collects those
+    which exceed the allowed extents."""
+
+    def __init__(
+        self, font_file_name, min_allowed, max_allowed, language=None, location=None
+    ):
+        self.vhb = Vharfbuzz(font_file_name)
+        if location:
+            self.vhb.hbfont.set_variations(location)
+        # The extents are all drawn up front, so the font isn't needed after
+        with TTFont(font_file_name) as font:
+            self.extents = GlyphExtents(font, location)
+        self.min_allowed = min_allowed
+        self.max_allowed = max_allowed
+        self.params = {"language": language} if language else None
+
+    def check(self, strings):
+        exceeding_lines = []
+        for s in strings:
+            buf = self.vhb.shape(s, self.params)
+            extents = buf_extents(buf, self.extents)
+            if extents is None:
+                continue
+            min_height, max_height = extents
+            if min_height < self.min_allowed or max_height > self.max_allowed:
+                exceeding_lines.append(((min_height, max_height), s))
+        return exceeding_lines
+
+
+# The checker of each worker process
+_checker = None
+
+
+def _init_checker(*args):
+    global _checker
+    _checker = _ExtentsChecker(*args)
+
+
+def _check_in_parallel(func, *iterables, jobs, initargs):
+    """Runs the checks over a process pool, in chunks which are consumed
+    as they are shaped, and returns the exceeding lines in input order."""
+    global _checker
+    try:
+        results = sorted(
+            parallel_map_unordered(
+                func,
+                *iterables,
+                jobs=jobs or None,
+                initializer=_init_checker,
+                initargs=initargs,
+            ),
+            key=lambda result: result[0],
+        )
+    finally:
+        # With jobs=1 the checker lives in this process
+        _checker = None
+    return [line for _, exceeding_lines in results for line in exceeding_lines]
+
+
+def _check_strings(strings):
+    return _checker.check(strings)
+
+
+def _check_combinations(characters, length, first):
+    """Checks every string of the given length starting with
+    ``characters[first]``, generating them as they are shaped."""
+    prefix = characters[first]
+    rest = itertools.product(characters, repeat=length - 1)
+    return _checker.check(prefix + "".join(chars) for chars in rest)
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def test_rendering(
+    data,
+    font_file_name,
+    min_allowed,
+    max_allowed,
+    language=None,
+    location=None,
+    jobs=1,
+):
     """Test the rendering of the input data in a given font.
 
     The input data is first filtered for sequences supported in the font.
+    With ``jobs`` other than 1, chunks of the input are shaped in parallel.
     """
-    vhb = Vharfbuzz(font_file_name)
-    font_characters = set(vhb.ttfont.getBestCmap().keys())
+    with TTFont(font_file_name, lazy=True) as font:
+        font_characters = set(font.getBestCmap().keys())
     # Hack to add ASCII digits, even if the font doesn't have them,
     # to keep potential frequency info in the input intact
     font_characters |= set(range(ord("0"), ord("9") + 1))
 
     supported_chars_regex = _regular_expression_from_set(font_characters)
+    harfbuzz_input = (match.group(0) for match in supported_chars_regex.finditer(data))
 
-    harfbuzz_input = []
-    exceeding_lines = []
-
-    for match in supported_chars_regex.finditer(data):
-        harfbuzz_input.append(match.group(0))
-
-    params = None
-    if language:
-        params = {"language": language}
-
-    for s in harfbuzz_input:
-        buf = vhb.shape(s, params)
-        min_height, max_height = buf_extents(buf, vhb.ttfont)
-        if min_height is None:
-            continue
-        if min_height < min_allowed or max_height > max_allowed:
-            exceeding_lines.append(((min_height, max_height), s))
-
-    return exceeding_lines
+    return _check_in_parallel(
+        _check_strings,
+        _chunked(harfbuzz_input, CHUNK_SIZE),
+        jobs=jobs,
+        initargs=(font_file_name, min_allowed, max_allowed, language, location),
+    )
 
 
 def test_rendering_from_file(
-    file_handle, font_file_name, min_allowed, max_allowed, language=None
+    file_handle,
+    font_file_name,
+    min_allowed,
+    max_allowed,
+    language=None,
+    location=None,
+    jobs=1,
 ):
     """Test the rendering of the contents of a file for vertical extents.
 
@@ -148,27 +288,48 @@ def test_rendering_from_file(
     # Now, input_data is just a long string, with new lines as separators.
 
     return test_rendering(
-        input_data, font_file_name, min_allowed, max_allowed, language
+        input_data,
+        font_file_name,
+        min_allowed,
+        max_allowed,
+        language,
+        location,
+        jobs,
     )
 
 
 def test_all_combinations(
-    max_len, font_file_name, min_allowed, max_allowed, language=None
+    max_len,
+    font_file_name,
+    min_allowed,
+    max_allowed,
+    language=None,
+    location=None,
+    jobs=1,
 ):
-    """Tests the rendering of all combinations up to certain length."""
+    """Tests the rendering of all combinations up to certain length.
 
-    font_characters = coverage.character_set(font_file_name)
+    The combinations are never held in memory together: each task
+    generates the strings of one length which start with one character.
+    """
+    with TTFont(font_file_name, lazy=True) as font:
+        font_characters = set(font.getBestCmap().keys())
     font_characters -= set(range(0x00, 0x20))  # Remove ASCII controls
-    font_characters = [unichr(code) for code in font_characters]
-    font_characters = sorted(font_characters)
-
-    all_strings = []
-    for length in range(1, max_len + 1):
-        all_combinations = itertools.product(font_characters, repeat=length)
-        all_strings += ["".join(comb) for comb in all_combinations]
-
-    test_data = "\n".join(all_strings)
-    return test_rendering(test_data, font_file_name, min_allowed, max_allowed, language)
+    font_characters = "".join(sorted(chr(code) for code in font_characters))
+
+    tasks = [
+        (length, first)
+        for length in range(1, max_len + 1)
+        for first in range(len(font_characters))
+    ]
+    return _check_in_parallel(
+        _check_combinations,
+        [font_characters] * len(tasks),
+        [length for length, _ in tasks],
+        [first for _, first in tasks],
+        jobs=jobs,
+        initargs=(font_file_name, min_allowed, max_allowed, language, location),
+    )
 
 
 def _is_noto_ui_font(font_file_name):
@@ -186,17 +347,33 @@ def main(args=None):
         args.ymax = font["OS/2"].usWinAscent
         if _is_noto_ui_font(args.font):
             args.ymin = max(args.ymin, -555)
-            arg.ymax = min(args.ymax, 2163)
-
-    exceeding_lines = test_rendering_from_file(
-        sys.stdin, args.font, args.ymin, args.ymax, args.language
-    )
+            args.ymax = min(args.ymax, 2163)
+    location = parse_axis_dflts(args.variations) if args.variations else None
+
+    if args.max_len:
+        exceeding_lines = test_all_combinations(
+            args.max_len,
+            args.font,
+            args.ymin,
+            args.ymax,
+            args.language,
+            location,
+            args.jobs,
+        )
+    else:
+        exceeding_lines = test_rendering_from_file(
+            sys.stdin,
+            args.font,
+            args.ymin,
+            args.ymax,
+            args.language,
+            location,
+            args.jobs,
+        )
 
     for line_bounds, text_piece in exceeding_lines:
         print(text_piece, line_bounds)
 
-    # print(test_all_combinations(3, font_file_name, ymin, ymax))
-
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Remove old entries from the gftools user cache.
+
+gftools keeps converted Glyphs sources (glyphs2ds), interpolated subset
+donors (subset-instances), parsed feature files (features), QA reports (qa)
+and HTTP responses (http) in $GFTOOLS_CACHE_DIR, or $XDG_CACHE_HOME/gftools
+(~/.cache/gftools by default). Entries which haven't been used for
+$GFTOOLS_CACHE_MAX_AGE seconds (30 days by default) are pruned
+automatically when a cache is written to; this script prunes them on
+demand.
+
+Examples:
+Remove entries which haven't been used for a week:
+`gftools clean-cache --max-age 7`
+
+Keep each cache under 2GB, removing the least recently used entries:
+`gftools clean-cache --max-size 2000`
+
+Empty the QA and HTTP caches:
+`gftools clean-cache qa http --all`
+"""
+import argparse
+
+from gftools.utils import CACHE_MAX_AGE, gftools_cache_dir, prune_cache
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "cache", nargs="*", help="Caches to clean (default: all of them)"
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=CACHE_MAX_AGE / (24 * 60 * 60),
+        help="Remove entries unused for this many days (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=float,
+        help="Then remove the least recently used entries until each cache "
+        "takes up at most this many megabytes",
+    )
+    parser.add_argument("--all", action="store_true", help="Remove every entry")
+    args = parser.parse_args(args)
+
+    root = gftools_cache_dir()
+    caches = args.cache or sorted(p.name for p in root.iterdir() if p.is_dir())
+    for cache in caches:
+        path = root / cache
+        if not path.is_dir():
+            parser.error(f"There is no {cache} cache in {root}")
+        removed, freed = prune_cache(
+            path,
+            max_age=0 if args.all else args.max_age * 24 * 60 * 60,
+            max_size=None if args.max_size is None else int(args.max_size * 1e6),
+        )
+        print(f"{cache}: removed {removed} entries, {freed / 1e6:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,21 +11,23 @@ gftools fix-family fonts1.ttf fonts2.ttf
 
 # Fix font issues that should be fixed in the source files
 gftools fix-family fonts1.ttf --include-source-fixes
+
+# Fix a large family using 8 processes
+gftools fix-family fonts/*.ttf -j 8
 """
 import argparse
 import logging
 import os
-from fontTools.ttLib import TTFont
 from gftools.fix import *
 from gftools.utils import parse_axis_dflts
 
 logging.basicConfig(level=logging.INFO)
 
 
-def new_filename(font, font_renamed=None):
+def new_filename(path, fixed_filename, font_renamed=None):
     if font_renamed:
-        return fix_filename(font)
-    return os.path.basename(font.reader.file.name)
+        return fixed_filename
+    return os.path.basename(path)
 
 
 def main(args=None):
@@ -48,33 +50,42 @@ def main(args=None):
             "wdth=100 opsz=36"
         ),
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of fonts to fix in parallel; 0 means one per CPU (default: 1)",
+    )
     args = parser.parse_args(args)
 
-    fonts = [TTFont(f) for f in args.fonts]
     if args.fvar_instance_axis_dflts:
         axis_dflts = parse_axis_dflts(args.fvar_instance_axis_dflts)
     else:
         axis_dflts = None
-    fonts = fix_family(fonts, args.include_source_fixes, args.rename_family, axis_dflts)
-
-    if args.inplace:
-        for font in fonts:
-            font.save(font.reader.file.name)
-    elif args.out:
-        if not os.path.isdir(args.out):
-            os.mkdir(args.out)
-        for font in fonts:
-            filename = new_filename(font, args.rename_family)
-            out_path = os.path.join(args.out, filename)
-            font.save(out_path)
-    else:
-        for font in fonts:
-            dir_ = os.path.dirname(font.reader.file.name)
-            filename = os.path.join(dir_, new_filename(font, args.rename_family))
-            if filename == font.reader.file.name:
-                font.save(filename + ".fix")
-            else:
-                font.save(filename)
+
+    if args.out and not os.path.isdir(args.out):
+        os.mkdir(args.out)
+
+    def destination(path, fixed_filename):
+        if args.inplace:
+            return path
+        filename = new_filename(path, fixed_filename, args.rename_family)
+        if args.out:
+            return os.path.join(args.out, filename)
+        filename = os.path.join(os.path.dirname(path), filename)
+        if filename == path:
+            return filename + ".fix"
+        return filename
+
+    fix_family_files(
+        args.fonts,
+        destination,
+        args.include_source_fixes,
+        args.rename_family,
+        axis_dflts,
+        jobs=args.jobs or None,
+    )
 
 
 if __name__ == "__main__":
@@ -11,21 +11,148 @@ gftools fix-font font.ttf
 
 # Fix font issues that should be fixed in the source files
 gftools fix-font font.ttf --include-source-fixes
+
+# Fix many fonts in one go, writing a JSON line per font to stdout
+gftools fix-font --batch "ofl/**/*.ttf" -o fixed
+find . -name "*.ttf" | gftools fix-font --batch -
 """
 import argparse
+import glob
+import json
 import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from fontTools.ttLib import TTFont
 from gftools.fix import *
-from gftools.utils import parse_axis_dflts
+from gftools.utils import parse_axis_dflts, parallel_map
 
 
 logging.basicConfig(level=logging.INFO)
 
 
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def fix_font_file(path, out_path, fix_args):
+    """Fix the font at path and save it to out_path.
+
+    Returns a dict describing the result; in batch mode one is written per
+    font as a JSON line."""
+    # Tables are only decompiled when a fix needs them; the rest are
+    # written back out untouched.
+    font = TTFont(path, lazy=True)
+    font = fix_font(font, **fix_args)
+    modified = font_is_modified(font)
+    # Fonts which needed no fixes are copied as-is, and an output which
+    # already matches is not rewritten at all.
+    written = save_font(font, out_path)
+    return {"font": path, "out": out_path, "modified": modified, "written": written}
+
+
+def _batch_fix_font_file(path, out_path, fix_args):
+    # Collect what the fixes log for the JSON result instead of printing it
+    root = logging.getLogger()
+    levels = {handler: handler.level for handler in root.handlers}
+    for handler in levels:
+        handler.setLevel(max(handler.level, logging.WARNING))
+    collector = _ListHandler()
+    root.addHandler(collector)
+    try:
+        result = fix_font_file(path, out_path, fix_args)
+    except (Exception, SystemExit) as e:
+        result = {"font": path, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        root.removeHandler(collector)
+        for handler, level in levels.items():
+            handler.setLevel(level)
+    result["messages"] = collector.messages
+    return result
+
+
+def batch_paths(patterns):
+    """Expand the fonts given on the command line, reading them from stdin
+    (one per line) if there are none or one of them is "-"."""
+    if not patterns or "-" in patterns:
+        patterns = [p for p in patterns if p != "-"]
+        patterns += [line.strip() for line in sys.stdin if line.strip()]
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            paths.append(pattern)
+    return paths
+
+
+def batch_out_paths(paths, out_dir):
+    """Output paths for a batch: each font keeps its path relative to the
+    directory the inputs have in common, so fonts with the same filename in
+    different directories don't overwrite each other."""
+    if not out_dir:
+        return [p + ".fix" for p in paths]
+    paths = [os.path.abspath(p) for p in paths]
+    root = os.path.commonpath([os.path.dirname(p) for p in paths]) if paths else ""
+    return [os.path.join(out_dir, os.path.relpath(p, root)) for p in paths]
+
+
+def batch_fix_font_files(paths, out_paths, fix_args, jobs=None):
+    """Fix many fonts, yielding a result for each in order.
+
+    A worker process which dies (e.g. in a segfault) breaks the whole pool.
+    The font waited on when that happens is retried alone, and reported as
+    failed if it crashes again; the rest of the batch carries on."""
+    done = 0
+    while done < len(paths):
+        todo = len(paths) - done
+        try:
+            for result in parallel_map(
+                _batch_fix_font_file,
+                paths[done:],
+                out_paths[done:],
+                [fix_args] * todo,
+                jobs=jobs,
+            ):
+                done += 1
+                yield result
+        except BrokenProcessPool:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                future = pool.submit(
+                    _batch_fix_font_file, paths[done], out_paths[done], fix_args
+                )
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    result = {
+                        "font": paths[done],
+                        "error": "The process fixing this font crashed",
+                        "messages": [],
+                    }
+            done += 1
+            yield result
+
+
 def main(args=None):
     parser = argparse.ArgumentParser()
-    parser.add_argument("font", help="Path to font")
-    parser.add_argument("-o", "--out", help="Output path for fixed font")
+    parser.add_argument(
+        "font",
+        nargs="*",
+        help="Path to font. With --batch, any number of paths or globs; "
+        "use - to read paths from stdin",
+    )
+    parser.add_argument(
+        "-o",
+        "--out",
+        help="Output path for fixed font. With --batch, an output directory "
+        "in which the fonts keep their paths relative to their common parent",
+    )
     parser.add_argument(
         "--include-source-fixes",
         action="store_true",
@@ -45,26 +172,53 @@ def main(args=None):
         action="store_false",
         help="don't re-write fvar instances",
     )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Fix many fonts using a pool of processes, writing a JSON line "
+        "per font to stdout. Failures are reported and skipped.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes to use with --batch (default: one per CPU)",
+    )
     args = parser.parse_args(args)
 
-    font = TTFont(args.font)
+    if not args.batch and len(args.font) != 1:
+        parser.error("exactly one font is needed, unless --batch is used")
 
     if args.fvar_instance_axis_dflts:
         axis_dflts = parse_axis_dflts(args.fvar_instance_axis_dflts)
     else:
         axis_dflts = None
-    font = fix_font(
-        font,
-        args.include_source_fixes,
-        args.rename_family,
-        axis_dflts,
-        args.overwrite_fvar_instances,
+    fix_args = dict(
+        include_source_fixes=args.include_source_fixes,
+        new_family_name=args.rename_family,
+        fvar_instance_axis_dflts=axis_dflts,
+        overwrite_fvar_instances=args.overwrite_fvar_instances,
     )
 
-    if args.out:
-        font.save(args.out)
-    else:
-        font.save(font.reader.file.name + ".fix")
+    if not args.batch:
+        path = args.font[0]
+        fix_font_file(path, args.out or path + ".fix", fix_args)
+        return
+
+    paths = batch_paths(args.font)
+    out_paths = batch_out_paths(paths, args.out)
+    for out_dir in set(os.path.dirname(p) for p in out_paths):
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+    failed = []
+    for result in batch_fix_font_files(paths, out_paths, fix_args, args.jobs):
+        if "error" in result:
+            failed.append(result)
+        print(json.dumps(result), flush=True)
+    if failed:
+        report = "\n".join(f"  {r['font']}: {r['error']}" for r in failed)
+        sys.exit(f"{len(failed)} of {len(paths)} fonts could not be fixed:\n{report}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Index the fonts and METADATA.pb files in a google/fonts checkout.
+
+Facts from the name, OS/2, head, post, maxp, fvar and cmap tables of every
+font, and from every METADATA.pb, are kept in an SQLite database (see
+gftools.fontindex for its tables). Only files which changed since the last
+run are read again. Scripts such as list-weightclass can then use the
+index with --index instead of opening each font.
+
+Examples:
+Index a checkout:
+`gftools font-index ~/fonts/ofl ~/fonts/apache ~/fonts/ufl`
+
+Query the index:
+`gftools font-index ~/fonts/ofl --sql "SELECT filename, us_weight_class FROM fonts WHERE us_weight_class < 100"`
+"""
+import argparse
+import csv
+import sys
+
+import tabulate
+
+from gftools.fontindex import FontIndex
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("path", nargs="*", help="Directories to index")
+    parser.add_argument(
+        "--db", help="Index database (default: fontindex.sqlite in the user cache)"
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes to read fonts with (default: one per CPU)",
+    )
+    parser.add_argument("--sql", help="Query to run once the index is up to date")
+    parser.add_argument("--csv", default=False, action="store_true")
+    args = parser.parse_args(args)
+
+    with FontIndex(args.db) as index:
+        for path in args.path:
+            counts = index.update(path, jobs=args.jobs)
+            print(
+                f"{path}: {counts['added']} added, {counts['updated']} updated, "
+                f"{counts['removed']} removed, {counts['unchanged']} unchanged"
+            )
+        if not args.sql:
+            return
+        rows = index.query(args.sql)
+        headers = list(rows[0].keys()) if rows else []
+        if args.csv:
+            writer = csv.writer(sys.stdout)
+            writer.writerow(headers)
+            writer.writerows(rows)
+        else:
+            print(tabulate.tabulate(rows, headers, tablefmt="pipe"))
+
+
+if __name__ == "__main__":
+    main()
@@ -33,20 +33,34 @@ import argparse
 import sys
 from gfsubsets import CodepointsInFont
 
+from gftools.fontindex import FontIndex
+
 
 parser = argparse.ArgumentParser(description="Compare size and coverage of two fonts")
 parser.add_argument("dirpath", help="a directory containing font files.", metavar="DIR")
+parser.add_argument(
+    "--index",
+    default=False,
+    action="store_true",
+    help="Read the fonts through the gftools font index (see gftools font-index)",
+)
 
 
 def main(args=None):
     args = parser.parse_args(args)
 
-    cps = set()
-    for f in _GetFontFiles(args.dirpath):
-        cps.update(CodepointsInFont(os.path.join(args.dirpath, f)))
+    fonts = _GetFontFiles(args.dirpath)
+    paths = [os.path.join(args.dirpath, f) for f in fonts]
+    if args.index:
+        with FontIndex() as index:
+            index.refresh(paths)
+            font_cps = [index.codepoints(path) for path in paths]
+    else:
+        font_cps = [CodepointsInFont(path) for path in paths]
 
-    for f in _GetFontFiles(args.dirpath):
-        diff = cps - CodepointsInFont(os.path.join(args.dirpath, f))
+    cps = set().union(*font_cps)
+    for f, f_cps in zip(fonts, font_cps):
+        diff = cps - f_cps
         if bool(diff):
             print("%s failed" % (f))
             for c in diff:
@@ -19,9 +19,17 @@ import os
 import tabulate
 from fontTools import ttLib
 
+from gftools.fontindex import FontIndex
+
 parser = argparse.ArgumentParser(description="Print out italicAngle of the fonts")
 parser.add_argument("font", nargs="+")
 parser.add_argument("--csv", default=False, action="store_true")
+parser.add_argument(
+    "--index",
+    default=False,
+    action="store_true",
+    help="Read the fonts through the gftools font index (see gftools font-index)",
+)
 
 
 def main(args=None):
@@ -29,9 +37,14 @@ def main(args=None):
 
     headers = ["filename", "italicAngle"]
     rows = []
-    for font in arg.font:
-        ttfont = ttLib.TTFont(font)
-        rows.append([os.path.basename(font), ttfont["post"].italicAngle])
+    if arg.index:
+        with FontIndex() as index:
+            for font, facts in zip(arg.font, index.facts(arg.font)):
+                rows.append([os.path.basename(font), facts["italic_angle"]])
+    else:
+        for font in arg.font:
+            ttfont = ttLib.TTFont(font)
+            rows.append([os.path.basename(font), ttfont["post"].italicAngle])
 
     if arg.csv:
         import csv
@@ -19,9 +19,17 @@ import os
 import tabulate
 from fontTools import ttLib
 
+from gftools.fontindex import FontIndex
+
 parser = argparse.ArgumentParser(description="Print out Panose of the fonts")
 parser.add_argument("font", nargs="+")
 parser.add_argument("--csv", default=False, action="store_true")
+parser.add_argument(
+    "--index",
+    default=False,
+    action="store_true",
+    help="Read the fonts through the gftools font index (see gftools font-index)",
+)
 
 
 def main(args=None):
@@ -29,15 +37,17 @@ def main(args=None):
 
     headers = ["filename"]
     rows = []
-    for i, font in enumerate(args.font):
+    if args.index:
+        with FontIndex() as index:
+            panoses = [facts["panose"] for facts in index.facts(args.font)]
+    else:
+        panoses = [ttLib.TTFont(font)["OS/2"].panose.__dict__ for font in args.font]
+    for i, (font, panose) in enumerate(zip(args.font, panoses)):
         row = [os.path.basename(font)]
-
-        ttfont = ttLib.TTFont(font)
-
-        for k in sorted(ttfont["OS/2"].panose.__dict__.keys()):
+        for k in sorted(panose.keys()):
             if i < 1:
                 headers.append(k)
-            row.append(getattr(ttfont["OS/2"].panose, k, 0))
+            row.append(panose.get(k, 0))
         rows.append(row)
 
     def as_csv(rows):
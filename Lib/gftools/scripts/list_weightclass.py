@@ -19,18 +19,31 @@ import os
 import tabulate
 from fontTools import ttLib
 
+from gftools.fontindex import FontIndex
+
 parser = argparse.ArgumentParser(description="Print out" " usWeightClass of the fonts")
 parser.add_argument("font", nargs="+")
 parser.add_argument("--csv", default=False, action="store_true")
+parser.add_argument(
+    "--index",
+    default=False,
+    action="store_true",
+    help="Read the fonts through the gftools font index (see gftools font-index)",
+)
 
 
 def main(args=None):
     args = parser.parse_args(args)
     headers = ["filename", "usWeightClass"]
     rows = []
-    for font in args.font:
-        ttfont = ttLib.TTFont(font)
-        rows.append([os.path.basename(font), ttfont["OS/2"].usWeightClass])
+    if args.index:
+        with FontIndex() as index:
+            for font, facts in zip(args.font, index.facts(args.font)):
+                rows.append([os.path.basename(font), facts["us_weight_class"]])
+    else:
+        for font in args.font:
+            ttfont = ttLib.TTFont(font)
+            rows.append([os.path.basename(font), ttfont["OS/2"].usWeightClass])
 
     def as_csv(rows):
         import csv
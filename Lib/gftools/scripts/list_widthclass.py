@@ -22,20 +22,31 @@ import sys
 import tabulate
 from fontTools import ttLib
 
+from gftools.fontindex import FontIndex
+
 parser = argparse.ArgumentParser(description="Print out" " usWidthClass of the fonts")
 parser.add_argument("font", nargs="+")
 parser.add_argument("--csv", default=False, action="store_true")
 parser.add_argument("--set", type=int, default=0)
 parser.add_argument("--autofix", default=False, action="store_true")
+parser.add_argument(
+    "--index",
+    default=False,
+    action="store_true",
+    help="Read the fonts through the gftools font index (see gftools font-index)",
+)
 
 
-def print_info(fonts, print_csv=False):
+def print_info(fonts, print_csv=False, use_index=False):
     headers = ["filename", "usWidthClass"]
     rows = []
     warnings = []
-    for font in fonts:
-        ttfont = ttLib.TTFont(font)
-        usWidthClass = ttfont["OS/2"].usWidthClass
+    if use_index:
+        with FontIndex() as index:
+            widths = [facts["us_width_class"] for facts in index.facts(fonts)]
+    else:
+        widths = [ttLib.TTFont(font)["OS/2"].usWidthClass for font in fonts]
+    for font, usWidthClass in zip(fonts, widths):
         rows.append([os.path.basename(font), usWidthClass])
         if usWidthClass != 5:
             warning = "WARNING: {} is {}, expected 5"
@@ -106,7 +117,7 @@ def main(args=None):
     if args.set:
         fix(args.font, value=int(args.set))
         sys.exit(0)
-    print_info(args.font, print_csv=args.csv)
+    print_info(args.font, print_csv=args.csv, use_index=args.index)
 
 
 if __name__ == "__main__":
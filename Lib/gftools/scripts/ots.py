@@ -14,11 +14,116 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-from __future__ import print_function
+"""Run ots-sanitize on every font in a directory, such as a google/fonts
+checkout.
+
+Fonts are checked in parallel, and each result is appended to a JSON Lines
+file as soon as it is known. Results are also kept in a database (by
+default in the gftools user cache), and fonts which passed with the same
+version of OTS, according to the sha256 of their contents, are not checked
+again.
+"""
 import argparse
-import ots
-import sys
+import json
+import logging
 import os
+import sqlite3
+import subprocess
+import time
+
+import ots
+
+from gftools.utils import gftools_cache_dir, hash_path, parallel_map
+
+logger = logging.getLogger(__name__)
+
+
+DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    sha256 TEXT NOT NULL,
+    ots_version TEXT NOT NULL,
+    path TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    output TEXT NOT NULL,
+    checked REAL NOT NULL,
+    PRIMARY KEY (sha256, ots_version)
+)
+"""
+
+
+def find_fonts(path):
+    fonts = []
+    for root, _, files in os.walk(path):
+        fonts.extend(os.path.join(root, f) for f in files if f.endswith(".ttf"))
+    return sorted(fonts)
+
+
+class ResultsDB:
+    """The results of earlier runs, by font hash and OTS version."""
+
+    def __init__(self, path, ots_version=ots.__version__):
+        self.ots_version = ots_version
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(DB_SCHEMA)
+
+    def passed(self):
+        """The hashes of the fonts which passed with this version of OTS."""
+        rows = self.conn.execute(
+            "SELECT sha256 FROM results WHERE ots_version = ? AND passed",
+            (self.ots_version,),
+        )
+        return frozenset(sha256 for (sha256,) in rows)
+
+    def record(self, result):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                result["sha256"],
+                self.ots_version,
+                result["path"],
+                result["passed"],
+                result["output"],
+                time.time(),
+            ),
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+# Set in each worker by _init_worker
+_passed = frozenset()
+
+
+def _init_worker(passed):
+    global _passed
+    _passed = passed
+
+
+def check_font(path):
+    sha256 = hash_path(path).hexdigest()
+    if sha256 in _passed:
+        return {
+            "path": path,
+            "sha256": sha256,
+            "passed": True,
+            "skipped": True,
+            "output": "",
+        }
+    process = ots.sanitize(
+        path, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    return {
+        "path": path,
+        "sha256": sha256,
+        "passed": process.returncode == 0,
+        "skipped": False,
+        "output": process.stdout,
+    }
 
 
 def main(args=None):
@@ -26,29 +131,67 @@ def main(args=None):
         description="Run ots-sanitizer on all fonts in the directory"
     )
     parser.add_argument("path")
+    parser.add_argument(
+        "-o",
+        "--out",
+        default="ots_gf_results.jsonl",
+        help="JSON Lines file to write the results to",
+    )
+    parser.add_argument(
+        "--db",
+        help=(
+            "Database of earlier results (default: ots-results.sqlite in the "
+            "gftools user cache)"
+        ),
+    )
+    parser.add_argument(
+        "--recheck",
+        action="store_true",
+        help="Check fonts even if they passed before",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of fonts to check in parallel (default: one per CPU)",
+    )
     args = parser.parse_args(args)
 
-    results = []
-    for p, i, files in os.walk(args.path):
-        for f in files:
-            if f.endswith(".ttf"):
-                try:
-                    font = os.path.join(p, f)
-                    process = ots.sanitize(font, check=True, capture_output=True)
-                    result = "%s\t%s" % (font, process.stdout)
-                except ots.CalledProcessError as e:
-                    result = "%s\t%s" % (font, e.output)
-
-                results.append(result)
-                print("%s\t%s" % (f, result))
-
-    with open("ots_gf_results.txt", "w") as doc:
-        doc.write("".join(results))
-    print("done!")
+    db = ResultsDB(args.db or gftools_cache_dir() / "ots-results.sqlite")
+    passed = frozenset() if args.recheck else db.passed()
+    fonts = find_fonts(args.path)
+    counts = {"passed": 0, "failed": 0, "skipped": 0}
+    with open(args.out, "w") as out:
+        results = parallel_map(
+            check_font,
+            fonts,
+            jobs=args.jobs,
+            initializer=_init_worker,
+            initargs=(passed,),
+        )
+        for i, result in enumerate(results, 1):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            if result["skipped"]:
+                counts["skipped"] += 1
+                continue
+            db.record(result)
+            if result["passed"]:
+                counts["passed"] += 1
+            else:
+                counts["failed"] += 1
+                print(f"{result['path']}\t{result['output']}")
+            # Keep the progress of interrupted runs
+            if i % 100 == 0:
+                db.commit()
+    db.close()
+    print(
+        f"Checked {len(fonts)} fonts: {counts['passed']} passed, "
+        f"{counts['failed']} failed, {counts['skipped']} unchanged since they "
+        f"last passed. Results written to {args.out}"
+    )
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("ERROR: Include path to OFL dir")
-    else:
-        main(sys.argv[-1])
+    main()
@@ -48,6 +48,13 @@ def family_name_from_fonts(fonts):
     return list(results)[0]
 
 
+def tool_jobs(value):
+    tool, _, jobs = value.partition("=")
+    if not tool or not jobs.isdigit() or int(jobs) < 1:
+        raise argparse.ArgumentTypeError(f"expected TOOL=N, got {value!r}")
+    return tool, int(jobs)
+
+
 def main(args=None):
     parser = argparse.ArgumentParser(
         description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
@@ -139,6 +146,45 @@ def main(args=None):
         ),
     )
     parser.add_argument("--rust", action="store_true", help="Use Rust tooling")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=0,
+        help="Number of QA tool runs to run at once (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--tool-jobs",
+        type=tool_jobs,
+        action="append",
+        default=[],
+        metavar="TOOL=N",
+        help=(
+            "Run at most N runs of a tool at once, e.g. diffenator3=2 "
+            "(can be given multiple times)"
+        ),
+    )
+    parser.add_argument(
+        "--diff-unchanged",
+        action="store_true",
+        help=(
+            "Diff fonts even if their outlines, layout and metrics are the "
+            "same as the fonts before"
+        ),
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=(
+            "Always run the QA tools, rather than reusing the reports of "
+            "earlier runs on the same fonts"
+        ),
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Stop any QA tool run which takes longer than this many seconds",
+    )
     check_group.add_argument(
         "--extra-fontbakery-args",
         help="Additional arguments to Fontbakery",
@@ -248,38 +294,46 @@ def main(args=None):
     elif args.out_github and args.github_dir:
         url = args.github_dir
 
+    qa_args = dict(
+        out=args.out,
+        url=url,
+        rust=args.rust,
+        jobs=args.jobs or None,
+        tool_jobs=dict(args.tool_jobs),
+        timeout=args.timeout,
+        skip_unchanged=not args.diff_unchanged,
+        use_cache=not args.no_cache,
+    )
     if fonts_before:
         dfonts_before = [
             DFont(f)
             for f in fonts_before
             if f.endswith((".ttf", ".otf")) and "static" not in f
         ]
-        qa = FontQA(dfonts, dfonts_before, args.out, url=url)
+        qa = FontQA(dfonts, dfonts_before, **qa_args)
     else:
-        qa = FontQA(dfonts, out=args.out, url=url)
+        qa = FontQA(dfonts, **qa_args)
 
     if args.auto_qa and family_on_gf:
-        qa.googlefonts_upgrade(args.imgs, args.rust)
+        qa.googlefonts_upgrade(args.imgs)
     elif args.auto_qa and not family_on_gf:
-        qa.googlefonts_new(args.imgs, args.rust)
+        qa.googlefonts_new(args.imgs)
     if args.render:
-        qa.render(args.imgs, args.rust)
+        qa.render(args.imgs)
     if args.fontbakery:
         if args.rust:
             qa.fontspector(extra_args=args.extra_fontspector_args)
         else:
             qa.fontbakery(extra_args=args.extra_fontbakery_args)
     if args.diffenator:
-        if args.rust:
-            qa.diffenator3()
-        else:
-            qa.diffenator()
+        qa.diffenator3()
     if args.diffbrowsers:
-        qa.diffbrowsers(args.imgs, rust=args.rust)
+        qa.diffbrowsers(args.imgs)
     if args.proof:
-        qa.proof(rust=args.rust)
+        qa.proof()
     if args.interpolations:
-        qa.interpolations(rust=args.rust)
+        qa.interpolations()
+    qa.wait()
 
     if qa.has_error:
         logger.fatal("QA tools have raised a fatal error. Please fix!")
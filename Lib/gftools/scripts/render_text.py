@@ -17,7 +17,8 @@
 
 Subcommands:
   proof  Render a single font as a waterfall PNG.
-  diff   Render before+after waterfalls plus difference image and animated GIF.
+  diff   Render before+after waterfalls plus difference image and animated GIF,
+         skipping renders which are identical, and write a JSON summary.
 
 Backend defaults to the platform-native rasterizer (CoreText on macOS,
 DirectWrite on Windows, FreeType on Linux). Override with ``--backend``.
@@ -25,13 +26,18 @@ DirectWrite on Windows, FreeType on Linux). Override with ``--backend``.
 
 from __future__ import annotations
 
+import json
 import sys
 from argparse import ArgumentParser
 from pathlib import Path
 
+from PIL import Image
+
 from gftools.render_text import (
+    RenderFont,
     default_backend,
     diff_image,
+    diff_stats,
     is_variable,
     iter_fvar_instances,
     output_dir_for_all,
@@ -41,9 +47,11 @@ from gftools.render_text import (
     output_subdir_for_instance,
     pad_to_match,
     parse_variations,
+    raster_digest,
     render_waterfall,
     save_animation,
 )
+from gftools.utils import hash_path, parallel_map
 
 
 BACKENDS = ("coretext", "directwrite", "freetype")
@@ -80,6 +88,7 @@ def main(args=None):
         default=None,
         help="Rendering backend. Defaults to the platform-native backend.",
     )
+    _add_jobs_argument(proof)
     proof.set_defaults(func=_run_proof)
 
     diff = subs.add_parser(
@@ -110,16 +119,52 @@ def main(args=None):
         default=None,
         help="Rendering backend. Defaults to the platform-native backend.",
     )
+    _add_jobs_argument(diff)
     diff.set_defaults(func=_run_diff)
 
     opts = parser.parse_args(args)
     opts.func(opts)
 
 
+def _add_jobs_argument(parser) -> None:
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "Number of processes to render instances (and the before and "
+            "after fonts) with; 0 for one per CPU. Default: 1."
+        ),
+    )
+
+
+# The fonts opened by each rendering process, by path
+_fonts: dict[Path, RenderFont] = {}
+
+
+def _open_fonts(font_paths: list[Path], backend: str) -> None:
+    _fonts.clear()
+    for path in font_paths:
+        _fonts[path] = RenderFont(path, backend)
+
+
+def _render(
+    font_path: Path, text: str, variations: dict | None, out: Path | None = None
+):
+    """Render a waterfall from one of this process's fonts, saving it to
+    ``out`` if given and returning it otherwise."""
+    img = render_waterfall(_fonts[font_path], text, variations=variations)
+    if out is None:
+        return img
+    img.save(out)
+    return out
+
+
 def _run_proof(opts) -> None:
     backend = opts.backend or default_backend()
     if opts.all:
-        _render_all(opts.font, opts.text, opts.output, backend)
+        _render_all(opts.font, opts.text, opts.output, backend, opts.jobs)
         return
     variations = parse_variations(opts.variations) if opts.variations else None
     out = output_path_for(opts.font, variations=variations, output=opts.output)
@@ -128,24 +173,34 @@ def _run_proof(opts) -> None:
     print(out)
 
 
-def _render_all(font: Path, text: str, output: str | None, backend: str) -> None:
-    if not is_variable(font):
+def _render_all(
+    font_path: Path, text: str, output: str | None, backend: str, jobs: int = 1
+) -> None:
+    if not is_variable(font_path):
         print(
-            f"warning: {font} is a static font — rendering default style only.",
+            f"warning: {font_path} is a static font — rendering default style only.",
             file=sys.stderr,
         )
-        out = output_path_for(font, output=output)
-        img = render_waterfall(font, text, backend=backend)
+        out = output_path_for(font_path, output=output)
+        img = render_waterfall(font_path, text, backend=backend)
         img.save(out)
         print(out)
         return
 
-    out_dir = output_dir_for_all(font, output_dir=output)
+    out_dir = output_dir_for_all(font_path, output_dir=output)
     out_dir.mkdir(parents=True, exist_ok=True)
-    for instance_name, location in iter_fvar_instances(font):
-        out = output_path_for_instance(font, instance_name, out_dir)
-        img = render_waterfall(font, text, variations=location, backend=backend)
-        img.save(out)
+    instances = list(iter_fvar_instances(font_path))
+    outs = parallel_map(
+        _render,
+        [font_path] * len(instances),
+        [text] * len(instances),
+        [location for _, location in instances],
+        [output_path_for_instance(font_path, name, out_dir) for name, _ in instances],
+        jobs=jobs or None,
+        initializer=_open_fonts,
+        initargs=([font_path], backend),
+    )
+    for out in outs:
         print(out)
 
 
@@ -161,36 +216,85 @@ def _run_diff(opts) -> None:
         )
 
     if opts.all and is_variable(opts.after):
-        for instance_name, location in iter_fvar_instances(opts.after):
-            subdir = output_subdir_for_instance(out_dir, instance_name)
-            subdir.mkdir(parents=True, exist_ok=True)
-            _emit_diff_bundle(
-                opts.before, opts.after, opts.text, location, backend, subdir
+        bundles = [
+            (
+                instance_name,
+                location,
+                output_subdir_for_instance(out_dir, instance_name),
             )
+            for instance_name, location in iter_fvar_instances(opts.after)
+        ]
     else:
         variations = parse_variations(opts.variations) if opts.variations else None
-        _emit_diff_bundle(
-            opts.before, opts.after, opts.text, variations, backend, out_dir
+        bundles = [(None, variations, out_dir)]
+
+    if hash_path(opts.before).digest() == hash_path(opts.after).digest():
+        # Byte-identical fonts render identically; there is nothing to render
+        results = [
+            dict(_IDENTICAL, before_digest=None, after_digest=None, output=None)
+            for _ in bundles
+        ]
+    else:
+        # Render the before and after waterfalls of every bundle as separate
+        # tasks, each process opening both fonts once
+        fonts = [opts.before, opts.after]
+        images = parallel_map(
+            _render,
+            fonts * len(bundles),
+            [opts.text] * len(bundles) * 2,
+            [location for _, location, _ in bundles for _ in fonts],
+            jobs=opts.jobs or None,
+            initializer=_open_fonts,
+            initargs=(fonts, backend),
+        )
+        results = [
+            _emit_diff_bundle(next(images), next(images), subdir)
+            for _, _, subdir in bundles
+        ]
+
+    summary = {
+        "before": str(opts.before),
+        "after": str(opts.after),
+        "backend": backend,
+        "text": opts.text,
+        "instances": [
+            {"instance": instance_name, "location": location, **result}
+            for (instance_name, location, _), result in zip(bundles, results)
+        ],
+    }
+    identical = sum(result["identical"] for result in results)
+    if identical:
+        print(
+            f"{identical} of {len(results)} renders are identical before and "
+            "after; no images written for them.",
+            file=sys.stderr,
         )
+    summary_path = out_dir / "summary.json"
+    with open(summary_path, "w") as fp:
+        json.dump(summary, fp, indent=2)
+    print(summary_path)
+
+
+_IDENTICAL = {"identical": True, "changed_pixels": 0, "max_delta": 0, "bbox": None}
 
 
 def _emit_diff_bundle(
-    before_path: Path,
-    after_path: Path,
-    text: str,
-    variations: dict | None,
-    backend: str,
-    out_dir: Path,
-) -> None:
-    before_img = render_waterfall(
-        before_path, text, variations=variations, backend=backend
-    )
-    after_img = render_waterfall(
-        after_path, text, variations=variations, backend=backend
-    )
+    before_img: Image.Image, after_img: Image.Image, out_dir: Path
+) -> dict:
+    """Write the diff bundle for a pair of renders, unless they are
+    identical. Returns the pair's entry for the JSON summary."""
+    result = {
+        "before_digest": raster_digest(before_img),
+        "after_digest": raster_digest(after_img),
+    }
+    if result["before_digest"] == result["after_digest"]:
+        return dict(_IDENTICAL, **result, output=None)
+
     before_pad, after_pad = pad_to_match([before_img, after_img])
+    result.update(identical=False, **diff_stats(before_pad, after_pad))
     diff_img = diff_image(before_pad, after_pad)
 
+    out_dir.mkdir(parents=True, exist_ok=True)
     before_pad.save(out_dir / "before.png")
     after_pad.save(out_dir / "after.png")
     diff_img.save(out_dir / "diff.png")
@@ -202,6 +306,8 @@ def _emit_diff_bundle(
 
     for name in ("before.png", "after.png", "diff.png", "anim.gif"):
         print(out_dir / name)
+    result["output"] = str(out_dir)
+    return result
 
 
 if __name__ == "__main__":
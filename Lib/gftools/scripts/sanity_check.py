@@ -24,8 +24,10 @@ import os
 import re
 import sys
 
+import numpy as np
 from fontTools import ttLib
 from absl import flags, app
+from gftools.glyphmetrics import GlyphMetrics
 from gftools.util import google_fonts as fonts
 
 FLAGS = flags.FLAGS
@@ -444,18 +446,18 @@ def _CheckLSB0ForEmptyGlyphs(path, font, ttf):
     results = []
     if "loca" not in ttf:
         return results
-    for glyph_index, glyph_name in enumerate(ttf.getGlyphOrder()):
-        is_empty = ttf["loca"][glyph_index] == ttf["loca"][glyph_index + 1]
-        lsb = ttf["hmtx"][glyph_name][1]
-        if is_empty and lsb != 0:
-            results.append(
-                _SadResult(
-                    "%s %s/%d ['hmtx']['%s'][1] (lsb) should be 0 but is %d"
-                    % (font.name, font.style, font.weight, glyph_name, lsb),
-                    os.path.join(path, font.filename),
-                    _FixEmptyGlyphLsb(glyph_name),
-                )
+    metrics = GlyphMetrics(ttf)
+    for glyph_index in np.flatnonzero(metrics.is_empty & (metrics.lsb != 0)):
+        glyph_name = metrics.glyph_order[glyph_index]
+        lsb = metrics.lsb[glyph_index]
+        results.append(
+            _SadResult(
+                "%s %s/%d ['hmtx']['%s'][1] (lsb) should be 0 but is %d"
+                % (font.name, font.style, font.weight, glyph_name, lsb),
+                os.path.join(path, font.filename),
+                _FixEmptyGlyphLsb(glyph_name),
             )
+        )
     return results
 
 
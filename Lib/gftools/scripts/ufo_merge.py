@@ -75,6 +75,12 @@ layout.add_argument(
     help="Don't try to parse the layout rules",
 )
 
+parser.add_argument(
+    "--cache-features",
+    action="store_true",
+    help="Keep the parsed layout rules of UFO 2 in the gftools cache "
+    "directory, to speed up merging from it again",
+)
 parser.add_argument("ufo1", help="UFO font file to merge into")
 parser.add_argument("ufo2", help="UFO font file to merge")
 parser.add_argument("--output", "-o", help="Output UFO font file")
@@ -140,6 +146,7 @@ def main(args):
         codepoints=codepoints,
         layout_handling=layout_handling,
         existing_handling=existing_handling,
+        cache_features_on_disk=args.cache_features,
     )
     ufo1.save(args.output, overwrite=True)
 
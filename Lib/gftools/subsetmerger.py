@@ -1,16 +1,22 @@
+import hashlib
+import json
 import logging
 import os
+import pickle
+import posixpath
 import re
 import shutil
+import tempfile
 import typing
 from dataclasses import dataclass, field
-from functools import cached_property
+from functools import cached_property, lru_cache
 from pathlib import Path
-from tempfile import TemporaryDirectory
 from typing import Any, Literal, NamedTuple, Union
 from zipfile import ZipFile
 from filelock import FileLock
 
+import fontmake
+import requests
 import ufoLib2
 import yaml
 from fontmake.font_project import FontProject
@@ -24,9 +30,22 @@ from glyphsLib.builder.constants import WIDTH_CLASS_TO_VALUE
 from strictyaml import Enum, HexInt, Int, Map, Optional, Seq, Str
 from ufomerge import merge_ufos
 
+from gftools.glyphscache import glyphs_to_designspace
 from gftools.gfgithub import GitHubClient
 from gftools.util.styles import STYLE_NAMES
-from gftools.utils import download_file, open_ufo, parse_codepoint, read_glyph_names
+from gftools.utils import (
+    download_file,
+    gftools_cache_dir,
+    hash_path,
+    http_session,
+    maybe_prune_cache,
+    open_ufo,
+    parallel_map,
+    parse_codepoint,
+    read_glyph_names,
+    save_ufo,
+    touch_cache_entry,
+)
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -214,7 +233,9 @@ class InputDescriptor(BaseDescriptor):
 
 @dataclass
 class DonorMasterDescriptor(BaseDescriptor):
-    pass
+    # Only opened once the master is known to match, see
+    # SubsetMerger.find_source_for_location
+    ufo: typing.Optional[ufoLib2.Font] = None
 
 
 @dataclass
@@ -242,19 +263,70 @@ class DonorInstanceDescriptor:
         """Returns the name of the instance"""
         return self.instance.name or self.filename
 
+    @property
+    def cache_key(self) -> str:
+        """Returns a key which changes whenever the interpolated instance
+        could: the contents of the donor, the location and the versions of
+        the tools involved"""
+        location = self.ds.normalizeLocation(
+            self.instance.getFullDesignLocation(self.ds)
+        )
+        return hashlib.sha256(
+            json.dumps(
+                {
+                    "donor": _donor_digest(self.ds.path),
+                    "instance": self.instance.name,
+                    "location": sorted(location.items()),
+                    "fontmake": fontmake.__version__,
+                    "ufoLib2": ufoLib2.__version__,
+                },
+            ).encode("utf-8")
+        ).hexdigest()
+
     @cached_property
     def ufo(self) -> ufoLib2.Font:
-        logger.info(
-            f"Generate UFO instance for {self.instance.familyName} {self.instance.name}"
-        )
         self.instance.path = str(
             Path(self.ds.path).resolve().parent / Path(self.instance.filename).name
         )
+        # Interpolating is slow, and sibling builds (and the next run) often
+        # need the same instance, so keep a copy in the user cache
+        key = self.cache_key
+        cache_dir = gftools_cache_dir("subset-instances")
+        cache_path = cache_dir / f"{key}.pickle"
+        with FileLock(str(cache_dir / f"{key}.lock")):
+            if cache_path.exists():
+                logger.info(
+                    f"Using cached UFO instance for {self.instance.familyName} {self.instance.name}"
+                )
+                ufo = pickle.loads(cache_path.read_bytes())
+                ufo._path = self.instance.path
+                touch_cache_entry(cache_path)
+                return ufo
 
-        ufos = FontProject().interpolate_instance_ufos(
-            self.ds, include=self.instance.name
-        )
-        return next(ufos)
+            logger.info(
+                f"Generate UFO instance for {self.instance.familyName} {self.instance.name}"
+            )
+            ufos = FontProject().interpolate_instance_ufos(
+                self.ds, include=self.instance.name
+            )
+            ufo = next(ufos)
+            with open(f"{cache_path}.part", "wb") as f:
+                pickle.dump(ufo, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f"{cache_path}.part", cache_path)
+        maybe_prune_cache(cache_dir)
+        return ufo
+
+
+@lru_cache(maxsize=None)
+def _donor_digest(ds_path: str) -> str:
+    """Returns a hash of a donor designspace and all of its sources. Donors
+    don't change during a run, so this is only worked out once for each."""
+    hasher = hash_path(ds_path)
+    ds = DesignSpaceDocument.fromfile(ds_path)
+    for source_path in sorted({source.path for source in ds.sources}):
+        hasher.update(os.path.basename(source_path).encode("utf-8"))
+        hash_path(source_path, hasher)
+    return hasher.hexdigest()
 
 
 def is_compatible(
@@ -293,6 +365,7 @@ class SubsetMerger:
         cache="../subset-files",
         json=False,
         allow_sparse=False,
+        jobs=1,
     ):
         self.input = input_ds
         self.output = output_ds
@@ -303,6 +376,13 @@ class SubsetMerger:
         self.cache_dir = cache
         self.subset_instances = {}
         self.allow_sparse = allow_sparse
+        self.jobs = jobs
+        # Per-run caches of donor sources, so that each upstream is resolved,
+        # and each donor designspace and UFO read, at most once however many
+        # masters and subsets use it
+        self.upstream_paths: dict[str, tuple[str, str]] = {}
+        self.donor_designspaces: dict[str, DesignSpaceDocument] = {}
+        self.donor_ufos: dict[str, bytes] = {}
 
     def add_subsets(self):
         """Adds the specified subsets to the designspace file and saves it to the output path"""
@@ -313,31 +393,38 @@ class SubsetMerger:
         else:
             input_ds = DesignSpaceDocument.fromfile(self.input)
         outpath = Path(self.output).parent
-        added_subsets = False
-        for input_master in input_ds.sources:
-            newpath = os.path.join(outpath, os.path.basename(input_master.path))
-            target_ufo = open_ufo(input_master.path)
-            assert target_ufo is not None, (
-                "Could not open UFO at %s" % input_master.path
-            )
-            input_master.path = newpath
-
-            if input_master.layerName is not None:
-                continue
-
-            input_descriptor = InputDescriptor(input_ds, input_master, target_ufo)
-
-            for subset in self.subsets:
-                added_subsets |= self.add_subset(input_descriptor, subset)
-
-            if self.json or input_master.path.endswith(".json"):
-                if not input_master.path.endswith(".json"):
-                    input_master.path += ".json"
-                    if input_master.filename:
-                        input_master.filename += ".json"
-                target_ufo.json_dump(open(input_master.path, "wb"))
+        masters = []
+        for index, input_master in enumerate(input_ds.sources):
+            if input_master.layerName is None:
+                masters.append(index)
             else:
-                target_ufo.save(input_master.path, overwrite=True)
+                # Sparse layers are saved along with the master UFO they
+                # live in
+                input_master.path = os.path.join(
+                    outpath, os.path.basename(input_master.path)
+                )
+
+        if self.jobs != 1:
+            # Fetch, convert and read the donors once, up front, so the
+            # worker processes share them rather than each doing it again
+            self.load_donors(input_ds, masters)
+        added_subsets = False
+        results = parallel_map(
+            _merge_master,
+            masters,
+            jobs=self.jobs,
+            initializer=_init_merge_worker,
+            initargs=(self, input_ds),
+        )
+        try:
+            for index, (added, path, filename) in zip(masters, results):
+                added_subsets |= added
+                input_ds.sources[index].path = path
+                input_ds.sources[index].filename = filename
+        finally:
+            # With jobs=1 the "worker" is this process; don't keep the
+            # merger and its donors alive after we're done
+            _init_merge_worker(None, None)
 
         if not added_subsets:
             raise ValueError("Could not match *any* subsets for this font")
@@ -349,6 +436,47 @@ class SubsetMerger:
 
         input_ds.write(self.output)
 
+    def merge_master(
+        self, input_ds: DesignSpaceDocument, index: int
+    ) -> tuple[bool, str, typing.Optional[str]]:
+        """Adds the subsets to one master of the input designspace and saves
+        it to the output directory.
+
+        Returns whether any subsets were added, and the new path and
+        filename of the master."""
+        input_master = input_ds.sources[index]
+        outpath = Path(self.output).parent
+        path = os.path.join(outpath, os.path.basename(input_master.path))
+        filename = input_master.filename
+        target_ufo = open_ufo(input_master.path)
+        assert target_ufo is not None, "Could not open UFO at %s" % input_master.path
+
+        input_descriptor = InputDescriptor(input_ds, input_master, target_ufo)
+        added_subsets = False
+        for subset in self.subsets:
+            added_subsets |= self.add_subset(input_descriptor, subset)
+
+        if self.json or path.endswith(".json"):
+            if not path.endswith(".json"):
+                path += ".json"
+                if filename:
+                    filename += ".json"
+        save_ufo(target_ufo, path)
+        return added_subsets, path, filename
+
+    def load_donors(self, input_ds: DesignSpaceDocument, masters: list[int]):
+        """Resolves every upstream and reads the donor masters which the
+        given input masters will take glyphs from"""
+        for subset in self.subsets:
+            donor_ds, _font_name = self.upstream_designspace(subset["from"])
+            for index in masters:
+                input_descriptor = InputDescriptor(
+                    input_ds, input_ds.sources[index], None
+                )
+                source = self.find_donor_master(donor_ds, input_descriptor)
+                if source is not None:
+                    self.donor_snapshot(source.path)
+
     def add_subset(
         self, input_descriptor: InputDescriptor, subset: dict[str, Any]
     ) -> bool:
@@ -384,10 +512,30 @@ class SubsetMerger:
     def obtain_upstream(
         self, upstream: Union[str, dict[str, Any]], input_descriptor: InputDescriptor
     ) -> typing.Optional[ufoLib2.Font]:
+        # Now we have an appropriate designspace containing the subset;
+        # find the actual UFO that corresponds to the location we are
+        # trying to add to.
+        donor_ds, font_name = self.upstream_designspace(upstream)
+        return self.find_source_for_location(donor_ds, input_descriptor, font_name)
+
+    def upstream_designspace(
+        self, upstream: Union[str, dict[str, Any]]
+    ) -> tuple[DesignSpaceDocument, str]:
+        key = yaml.dump(upstream)
+        if key not in self.upstream_paths:
+            self.upstream_paths[key] = self.resolve_upstream(upstream)
+        path, font_name = self.upstream_paths[key]
+        return self.open_donor_designspace(path), font_name
+
+    def resolve_upstream(self, upstream: Union[str, dict[str, Any]]) -> tuple[str, str]:
+        """Returns the path to the designspace of an upstream donor font,
+        downloading and converting it as necessary, and a name to refer to
+        it by"""
         # Either the upstream is a string, in which case we try looking
         # it up in the SUBSET_SOURCES table, or it's a dict, in which
         # case it's a repository / path pair.
 
+        repo = None
         if isinstance(upstream, str) and upstream not in SUBSET_SOURCES:
             # Maybe it's a path to a local DS/Glyphs file?
             if os.path.exists(upstream):
@@ -416,32 +564,77 @@ class SubsetMerger:
                         ).get_latest_release_tag()
                 path = upstream["path"]
                 font_name = f"{repo}/{ref}/{path}"
-            path = os.path.join(self.cache_dir, repo, ref, path)
-
-            lockfile_path = os.path.join(
-                self.cache_dir,
-                f".gftools_subsetmerger_{repo.replace('/', '_')}_{ref.replace('/', '_')}.lock",
-            )
-            with FileLock(lockfile_path):
-                if os.path.exists(path):
-                    logger.info("Subset files present on disk, skipping download")
-                else:
-                    self.download_for_subsetting(repo, ref)
+            path = self.obtain_subset_source(repo, self.resolve_ref(repo, ref), path)
 
         # We're doing a UFO-UFO merge, so Glyphs files will need to be converted
         if path.endswith((".glyphs", ".glyphspackage")):
-            ds_path = re.sub(r".glyphs(package)?", ".designspace", path)
-            if os.path.exists(ds_path):
+            ds_path = re.sub(r"\.glyphs(package)?$", ".designspace", path)
+            if repo is not None:
+                path = self.cached_glyphs_to_ufo(repo, path, ds_path, font_name)
+            elif os.path.exists(ds_path):
                 path = ds_path
             else:
                 logger.info("Building UFO file for subset font " + font_name)
                 path = self.glyphs_to_ufo(path)
 
-        # Now we have an appropriate designspace containing the subset;
-        # find the actual UFO that corresponds to the location we are
-        # trying to add to.
-        donor_ds = DesignSpaceDocument.fromfile(path)
-        return self.find_source_for_location(donor_ds, input_descriptor, font_name)
+        return path, font_name
+
+    def cached_glyphs_to_ufo(
+        self, repo: str, path: str, ds_path: str, font_name: str
+    ) -> str:
+        """Converts a Glyphs source in the cache directory, which concurrent
+        builds may share, to a designspace and UFOs alongside it.
+
+        The conversion is written to a temporary directory and moved into
+        place under the repository's cache lock, designspace last, so other
+        builds never see a half-written UFO."""
+        with self.cache_lock(repo):
+            if os.path.exists(ds_path):
+                return ds_path
+            logger.info("Building UFO file for subset font " + font_name)
+            directory = os.path.dirname(os.path.abspath(path))
+            staging = tempfile.mkdtemp(dir=directory, prefix=".tmp-")
+            try:
+                output = self.glyphs_to_ufo(path, Path(staging))
+                names = sorted(
+                    os.listdir(staging), key=lambda n: n.endswith(".designspace")
+                )
+                for name in names:
+                    target = os.path.join(directory, name)
+                    if os.path.isdir(target):
+                        # Left behind by a conversion which was interrupted
+                        shutil.rmtree(target)
+                    os.replace(os.path.join(staging, name), target)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+            return os.path.join(directory, os.path.basename(output))
+
+    def open_donor_designspace(self, path: str) -> DesignSpaceDocument:
+        key = os.path.realpath(path)
+        if key not in self.donor_designspaces:
+            self.donor_designspaces[key] = DesignSpaceDocument.fromfile(path)
+        return self.donor_designspaces[key]
+
+    def open_donor_ufo(self, path: str) -> ufoLib2.Font:
+        """Returns a copy of the donor UFO at path, which is read from disk
+        at most once per run.
+
+        merge_ufos modifies the donor it is given (scaling it to the target's
+        UPM, pruning its kerning groups and moving its glyph objects into the
+        target), so every merge needs a fresh copy. Unpickling a snapshot of
+        the donor is several times quicker than parsing the UFO again."""
+        ufo = pickle.loads(self.donor_snapshot(path))
+        # merge_ufos resolves feature file includes relative to the donor
+        ufo._path = path
+        return ufo
+
+    def donor_snapshot(self, path: str) -> bytes:
+        key = os.path.realpath(path)
+        if key not in self.donor_ufos:
+            self.donor_ufos[key] = pickle.dumps(
+                open_ufo(path), protocol=pickle.HIGHEST_PROTOCOL
+            )
+        return self.donor_ufos[key]
 
     def glyphs_to_ufo(
         self, source_str: str, directory: typing.Optional[Path] = None
@@ -449,16 +642,10 @@ class SubsetMerger:
         source = Path(source_str)
         if directory is None:
             directory = source.resolve().parent
-        output = str(Path(directory) / source.with_suffix(".designspace").name)
-        FontProject().run_from_glyphs(
-            str(source.resolve()),
-            **{
-                "format": ["ufo"],
-                "output": ["ufo"],
-                "output_dir": directory,
-                "master_dir": directory,
-                "designspace_path": output,
-            },
+        output = glyphs_to_designspace(
+            str(source),
+            str(directory),
+            designspace_name=source.with_suffix(".designspace").name,
         )
         if self.googlefonts:
             ds = DesignSpaceDocument.fromfile(output)
@@ -473,15 +660,14 @@ class SubsetMerger:
         input_descriptor: InputDescriptor,
         font_name: str,
     ) -> typing.Optional[ufoLib2.Font]:
-        for source in donor_ds.sources:
-            donor_descriptor = DonorMasterDescriptor(
-                donor_ds, source, open_ufo(source.path)
+        source = self.find_donor_master(donor_ds, input_descriptor)
+        if source is not None:
+            donor_descriptor = DonorMasterDescriptor(donor_ds, source)
+            logger.info(
+                f"Adding master {donor_descriptor.filename or donor_descriptor.name} for location {input_descriptor.userspace_location}"
             )
-            if is_compatible(donor_descriptor, input_descriptor):
-                logger.info(
-                    f"Adding master {donor_descriptor.filename or donor_descriptor.name} for location {input_descriptor.userspace_location}"
-                )
-                return donor_descriptor.ufo
+            donor_descriptor.ufo = self.open_donor_ufo(source.path)
+            return donor_descriptor.ufo
 
         logger.info(
             f"Couldn't find a master from {font_name} for location {input_descriptor.userspace_location}, trying instances"
@@ -501,37 +687,217 @@ class SubsetMerger:
             f"Could not find master in {font_name} for location {input_descriptor.userspace_location}"
         )
 
-    def download_for_subsetting(self, fullrepo: str, ref: str) -> None:
-        """Downloads a GitHub repository at a given reference"""
-        dest = os.path.join(self.cache_dir, f"{fullrepo}/{ref}")
-        if os.path.exists(dest):
-            # Assume sources exist & are up-to-date (we have no good way of
-            # checking this); do nothing
-            logger.info("Subset files present on disk, skipping download")
-            return
-        # Make the parent folder to dest but not dest itself. This means that
-        # the shutil.move at the end of this function won't create
-        # dest/repo-ref, instead having dest contain the contents of repo-ref
-        os.makedirs(os.path.join(self.cache_dir, fullrepo), exist_ok=True)
-
-        # This URL scheme doesn't appear to be 100% official for tags &
-        # branches, but it seems to accept any valid git reference
-        # See https://stackoverflow.com/a/13636954 and
-        # https://docs.github.com/en/repositories/working-with-files/using-files/downloading-source-code-archives#source-code-archive-urls
-        repo_zipball = f"https://github.com/{fullrepo}/archive/{ref}.zip"
-        logger.info(f"Downloading {fullrepo} {ref}")
-
-        repo_zip = ZipFile(download_file(repo_zipball))
-        _user, repo = fullrepo.split("/", 1)
-        # If the tag name began with a "v" and looked like a version (i.e. has a
-        # digit immediately afterwards), the "v" is stripped by GitHub. We have
-        # to match this behaviour to get the correct name of the top-level
-        # directory within the zip file
-        if re.match(r"^v\d", ref):
-            ref = ref[1:]
-        with TemporaryDirectory() as temp_dir:
-            repo_zip.extractall(temp_dir)
-            shutil.move(os.path.join(temp_dir, f"{repo}-{ref}"), dest)
+    def find_donor_master(
+        self, donor_ds: DesignSpaceDocument, input_descriptor: InputDescriptor
+    ) -> typing.Optional[SourceDescriptor]:
+        # Matching only needs the designspace locations; the UFO is only
+        # opened for the master we end up using
+        for source in donor_ds.sources:
+            if is_compatible(DonorMasterDescriptor(donor_ds, source), input_descriptor):
+                return source
+        return None
+
+    def cache_lock(self, repo: str) -> FileLock:
+        """Returns the lock guarding the cached files of a repository, which
+        may be shared by concurrent builds"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return FileLock(
+            os.path.join(
+                self.cache_dir, f".gftools_subsetmerger_{repo.replace('/', '_')}.lock"
+            )
+        )
+
+    def resolve_ref(self, repo: str, ref: str) -> str:
+        """Resolves a branch, tag or commit of a GitHub repository to a
+        commit SHA.
+
+        The answer is remembered in the cache directory so that a build can
+        still use the last known commit when GitHub can't be reached."""
+        refs_path = os.path.join(self.cache_dir, repo, "refs.json")
+        try:
+            sha = resolve_github_ref(repo, ref)
+        except requests.RequestException as e:
+            with self.cache_lock(repo):
+                known = _read_json(refs_path, {})
+            if ref not in known:
+                raise
+            logger.warning(
+                f"Could not resolve {repo}@{ref} ({e}); using {known[ref]}, "
+                "the last commit it was known to point to"
+            )
+            return known[ref]
+        with self.cache_lock(repo):
+            known = _read_json(refs_path, {})
+            if known.get(ref) != sha:
+                known[ref] = sha
+                _write_json(refs_path, known)
+        return sha
+
+    def obtain_subset_source(self, repo: str, sha: str, path: str) -> str:
+        """Makes sure a font source, and the files it refers to, from the
+        given commit of a GitHub repository are in the cache directory, and
+        returns the path to it"""
+        dest = os.path.join(self.cache_dir, repo, sha)
+        manifest_path = os.path.join(dest, ".gftools_subset_sources.json")
+        with self.cache_lock(repo):
+            extracted = _read_json(manifest_path, [])
+            if posixpath.normpath(path) in extracted:
+                logger.info("Subset files present on disk, skipping download")
+            else:
+                extracted += self.download_for_subsetting(
+                    repo, sha, path, present=extracted
+                )
+                _write_json(manifest_path, extracted)
+        return os.path.join(dest, path)
+
+    def download_for_subsetting(
+        self, fullrepo: str, sha: str, path: str, present: typing.Collection[str] = ()
+    ) -> list[str]:
+        """Downloads a font source and the files it refers to from a commit of
+        a GitHub repository, returning the paths extracted. Paths which are
+        already present in the cache are left alone."""
+        dest = os.path.join(self.cache_dir, fullrepo, sha)
+        os.makedirs(dest, exist_ok=True)
+
+        # GitHub has no way to download part of a repository, so fetch the
+        # archive of the whole commit but only extract the files we need.
+        # See https://docs.github.com/en/repositories/working-with-files/using-files/downloading-source-code-archives#source-code-archive-urls
+        repo_zipball = f"https://github.com/{fullrepo}/archive/{sha}.zip"
+
+        # Stream the archive to disk next to its destination; an interrupted
+        # download is resumed the next time round. The archive is kept, so
+        # other paths from the same commit are extracted from it rather than
+        # downloaded again. download_file only moves a complete download
+        # into place, so an archive which is there can be used as it is.
+        zip_path = f"{dest}.zip"
+        if os.path.exists(zip_path):
+            logger.info(f"Using the downloaded archive of {fullrepo} {sha}")
+        else:
+            logger.info(f"Downloading {fullrepo} {sha}")
+            download_file(repo_zipball, zip_path)
+        with ZipFile(zip_path) as repo_zip:
+            extracted = extract_subset_source(repo_zip, path, dest, present)
+        if posixpath.normpath(path) not in extracted:
+            raise ValueError(f"{path} not found in {fullrepo} at {sha}")
+        return extracted
+
+
+def resolve_github_ref(repo: str, ref: str) -> str:
+    """Returns the SHA of the commit a branch, tag or commit of a GitHub
+    repository points to"""
+    if re.fullmatch(r"[0-9a-f]{40}", ref):
+        return ref
+    # https://docs.github.com/en/rest/commits/commits#get-a-commit
+    headers = {"Accept": "application/vnd.github.sha"}
+    if "GH_TOKEN" in os.environ:
+        headers["Authorization"] = f"bearer {os.environ['GH_TOKEN']}"
+    response = http_session().get(
+        f"https://api.github.com/repos/{repo}/commits/{ref}",
+        headers=headers,
+        timeout=30,
+    )
+    response.raise_for_status()
+    return response.text.strip()
+
+
+FEATURE_INCLUDE_RE = re.compile(rb"include\s*\(\s*([^)\s]+)\s*\)")
+
+
+def extract_subset_source(
+    archive: ZipFile, path: str, dest: str, present: typing.Collection[str] = ()
+) -> list[str]:
+    """Extracts a font source from a GitHub archive of a repository into dest.
+
+    Along with the source go the files it refers to: the masters of a
+    designspace, feature files included by a UFO and, for a Glyphs source,
+    a designspace of the same name if there is one. Paths listed in present
+    have been extracted before and are skipped. Returns the paths extracted,
+    relative to the root of the repository."""
+    # Everything in a GitHub archive lives in a single top-level directory
+    root = archive.namelist()[0].split("/", 1)[0] + "/"
+    members = {
+        info.filename[len(root) :]: info
+        for info in archive.infolist()
+        if info.filename.startswith(root) and not info.is_dir()
+    }
+
+    wanted = [(path, posixpath.dirname(path))]
+    if path.endswith((".glyphs", ".glyphspackage")):
+        ds_path = re.sub(r"\.glyphs(package)?$", ".designspace", path)
+        wanted.append((ds_path, posixpath.dirname(ds_path)))
+    extracted = []
+    while wanted:
+        wanted_path, include_dir = wanted.pop()
+        wanted_path = posixpath.normpath(wanted_path)
+        if wanted_path in extracted or wanted_path in present:
+            continue
+        names = [
+            name
+            for name in members
+            if name == wanted_path or name.startswith(wanted_path + "/")
+        ]
+        if not names:
+            continue
+        extracted.append(wanted_path)
+        for name in names:
+            target = os.path.join(dest, *name.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Other builds may be reading the cache, so never leave a file
+            # half written
+            with (
+                archive.open(members[name]) as src,
+                open(target + ".part", "wb") as dst,
+            ):
+                shutil.copyfileobj(src, dst)
+            os.replace(target + ".part", target)
+            if name.endswith((".fea", ".glyphs", "fontinfo.plist")):
+                # Feature code includes are relative to the directory of
+                # the source which includes them
+                with archive.open(members[name]) as src:
+                    for include in FEATURE_INCLUDE_RE.findall(src.read()):
+                        include = posixpath.join(include_dir, include.decode())
+                        wanted.append((include, include_dir))
+        if wanted_path.endswith(".designspace"):
+            ds = DesignSpaceDocument.fromfile(os.path.join(dest, wanted_path))
+            for source in ds.sources:
+                if source.filename:
+                    source_path = posixpath.join(
+                        posixpath.dirname(wanted_path), source.filename
+                    )
+                    wanted.append((source_path, posixpath.dirname(source_path)))
+    return extracted
+
+
+def _read_json(path: str, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path: str, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+# State of a SubsetMerger.add_subsets worker process, set up once by
+# _init_merge_worker rather than pickled along with every master
+_merger: typing.Optional[SubsetMerger] = None
+_input_ds: typing.Optional[DesignSpaceDocument] = None
+
+
+def _init_merge_worker(
+    merger: typing.Optional[SubsetMerger],
+    input_ds: typing.Optional[DesignSpaceDocument],
+):
+    global _merger, _input_ds
+    _merger, _input_ds = merger, input_ds
+
+
+def _merge_master(index: int) -> tuple[bool, str, typing.Optional[str]]:
+    return _merger.merge_master(_input_ds, index)
 
 
 def ufo_to_ds(ufo_path: str) -> DesignSpaceDocument:
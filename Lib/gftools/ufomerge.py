@@ -1,11 +1,115 @@
 from fontFeatures import FontFeatures, Routine, Substitution
 from fontFeatures.feaLib import FeaParser
+from collections import defaultdict
 from pathlib import Path
+import hashlib
+import importlib.metadata
 import logging
+import os
+import pickle
+import re
+import tempfile
+
+from gftools.utils import gftools_cache_dir, maybe_prune_cache, touch_cache_entry
 
 logger = logging.getLogger("ufomerge")
 logging.basicConfig(level=logging.INFO)
 
+# Parsed feature files, pickled, keyed on what went into parsing them
+_parsed_features = {}
+
+
+_INCLUDE = re.compile(r"\binclude\s*\(\s*([^)]*?)\s*\)")
+
+
+def _included_files(text, include_dir, base_dir, seen):
+    """The paths of the feature files included from some feature code, and
+    from the files they include, resolved as feaLib does: relative to
+    include_dir if there is one, otherwise to the including file."""
+    for match in _INCLUDE.finditer(text):
+        path = os.path.realpath(os.path.join(include_dir or base_dir, match[1]))
+        if path in seen:
+            continue
+        seen.add(path)
+        yield path
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                yield from _included_files(
+                    f.read(), include_dir, os.path.dirname(path), seen
+                )
+
+
+def _features_key(ufo):
+    path = getattr(ufo, "_path", None)
+    include_dir = str(Path(path).parent) if path else None
+    hasher = hashlib.sha256()
+    for part in (
+        importlib.metadata.version("fontFeatures"),
+        os.path.realpath(path) if path else "",
+        ufo.features.text,
+        *ufo.keys(),
+    ):
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    for included in _included_files(ufo.features.text, include_dir, os.getcwd(), set()):
+        hasher.update(included.encode("utf-8"))
+        hasher.update(b"\0")
+        if os.path.isfile(included):
+            with open(included, "rb") as f:
+                hasher.update(hashlib.sha256(f.read()).digest())
+    return hasher.hexdigest()
+
+
+def _parse_features(ufo):
+    path = getattr(ufo, "_path", None)
+    includeDir = Path(path).parent if path else None
+    ff = FeaParser(
+        ufo.features.text, includeDir=includeDir, glyphNames=list(ufo.keys())
+    ).parse()
+    # The features each routine is used in, in the order of ff.routines
+    features_by_routine = defaultdict(list)
+    for feature_name, routines in ff.features.items():
+        for routine_ref in routines:
+            features_by_routine[id(routine_ref.routine)].append(feature_name)
+    routine_features = [features_by_routine[id(r)] for r in ff.routines]
+    return ff, routine_features
+
+
+def parse_features(ufo, cache_on_disk=False):
+    """Parse the feature file of a UFO, memoizing the result.
+
+    Returns the parsed FontFeatures and a list of the names of the features
+    which use each of its routines, in the same order as ``ff.routines``.
+    Both are new copies each time, which callers are free to modify.
+
+    Parsing a large donor's feature code is slow, and merging subsets into
+    every master of a family parses the same donors over and over. Results
+    are kept in memory for the rest of the process, keyed on the UFO's path
+    and the contents of its feature file, the files it includes and its
+    glyph set. With ``cache_on_disk``, they are also pickled into the
+    gftools user cache so later runs can skip parsing too.
+    """
+    key = _features_key(ufo)
+    if key in _parsed_features:
+        return pickle.loads(_parsed_features[key])
+    cache_path = None
+    if cache_on_disk:
+        cache_path = gftools_cache_dir("features") / f"{key}.pickle"
+    if cache_path and cache_path.exists():
+        _parsed_features[key] = cache_path.read_bytes()
+        touch_cache_entry(cache_path)
+    else:
+        _parsed_features[key] = pickle.dumps(
+            _parse_features(ufo), protocol=pickle.HIGHEST_PROTOCOL
+        )
+        if cache_path:
+            # Write atomically, other processes may be reading the cache
+            with tempfile.NamedTemporaryFile(dir=cache_path.parent, delete=False) as f:
+                f.write(_parsed_features[key])
+            os.replace(f.name, cache_path)
+            maybe_prune_cache(cache_path.parent)
+    return pickle.loads(_parsed_features[key])
+
 
 def merge_ufos(
     ufo1,
@@ -15,6 +119,7 @@ def merge_ufos(
     codepoints=None,
     layout_handling="subset",
     existing_handling="replace",
+    cache_features_on_disk=False,
 ):
     if glyphs is None:
         glyphs = []
@@ -52,12 +157,21 @@ def merge_ufos(
     if layout_handling == "ignore":
         pass
     else:
-        path = getattr(ufo2, "_path", None)
-        includeDir = Path(ufo2._path).parent if path else None
-        ff = FeaParser(
-            ufo2.features.text, includeDir=includeDir, glyphNames=list(ufo2.keys())
-        ).parse()
-        for routine in ff.routines:
+        ff, routine_features = parse_features(
+            ufo2, cache_on_disk=cache_features_on_disk
+        )
+
+        # Glyph classes are shared between many rules, so only intersect
+        # each one with the glyph set once (until the glyph set grows)
+        filtered_classes = {}
+
+        def in_glyphset(glyphclass):
+            key = tuple(glyphclass)
+            if key not in filtered_classes:
+                filtered_classes[key] = [g for g in set(key) if g in newglyphset]
+            return list(filtered_classes[key])
+
+        for routine, feature_names in zip(ff.routines, routine_features):
             newroutine = Routine(name=routine.name, flags=routine.flags)
             for rule in routine.rules:
                 if not isinstance(rule, Substitution):
@@ -65,11 +179,9 @@ def merge_ufos(
                 flat_outputs = [
                     item for sublist in rule.replacement for item in sublist
                 ]
-                true_inputs = [list(set(r) & newglyphset) for r in rule.input]
-                rule.precontext = [list(set(r) & newglyphset) for r in rule.precontext]
-                rule.postcontext = [
-                    list(set(r) & newglyphset) for r in rule.postcontext
-                ]
+                true_inputs = [in_glyphset(r) for r in rule.input]
+                rule.precontext = [in_glyphset(r) for r in rule.precontext]
+                rule.postcontext = [in_glyphset(r) for r in rule.postcontext]
                 if (
                     any(not g for g in true_inputs)
                     or any(not g for g in rule.precontext)
@@ -83,7 +195,9 @@ def merge_ufos(
                     rule.input = true_inputs
                     for glyph in flat_outputs:
                         glyphs[glyph] = True
-                        newglyphset.add(glyph)
+                        if glyph not in newglyphset:
+                            newglyphset.add(glyph)
+                            filtered_classes.clear()
                 else:
                     # Any rules with new glyphs on the right hand side and glyphs
                     # we have on the left hand side need to be copied into UFO1
@@ -102,19 +216,13 @@ def merge_ufos(
                         rule.replacement[0] = [r[1] for r in mapping]
                     else:
                         rule.input = true_inputs
-                        rule.replacement = [
-                            list(set(r) & newglyphset) for r in rule.replacement
-                        ]
-                    logging.debug("Adding rule '%s'", rule.asFea())
+                        rule.replacement = [in_glyphset(r) for r in rule.replacement]
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Adding rule '%s'", rule.asFea())
                 newroutine.rules.append(rule)
             if newroutine.rules:
                 # Was it in a feature?
-                add_to = []
-                for feature_name, routines in ff.features.items():
-                    for routine_ref in routines:
-                        if routine_ref.routine == routine:
-                            add_to.append(feature_name)
-                for feature_name in add_to:
+                for feature_name in feature_names:
                     new_layout_rules.addFeature(feature_name, [newroutine])
 
     # Kerning!!
@@ -131,39 +239,60 @@ def merge_ufos(
     for g in ufo2.groups.keys():
         ufo2.groups[g] = [g for g in ufo2.groups[g] if g in glyphs]
 
+    # Whether a kerning pair side (a glyph or a group) survives the merge.
+    # Many pairs share a side, so only check each one once.
+    side_in_glyphset = {}
+
+    def kerning_side_ok(side):
+        if side not in side_in_glyphset:
+            members = ufo2.groups.get(side, [side])
+            side_in_glyphset[side] = bool(members) and all(
+                member in newglyphset for member in members
+            )
+        return side_in_glyphset[side]
+
+    merged_groups = set()
+
+    def merge_group(name):
+        if not name.startswith("public.kern") or name in merged_groups:
+            return
+        merged_groups.add(name)
+        if name not in ufo1.groups:
+            ufo1.groups[name] = ufo2.groups[name]
+        else:
+            ufo1.groups[name] = list(set(ufo1.groups[name] + ufo2.groups[name]))
+
     for (l, r), value in ufo2.kerning.items():
-        lg = ufo2.groups.get(l, [l])
-        rg = ufo2.groups.get(r, [r])
-        if not lg or not rg:
-            continue
-        if any(lglyph not in newglyphset for lglyph in lg) or any(
-            rglyph not in newglyphset for rglyph in rg
-        ):
+        if not kerning_side_ok(l) or not kerning_side_ok(r):
             continue
         # Just add for now. We should get fancy later
         ufo1.kerning[(l, r)] = value
-        if l.startswith("public.kern"):
-            if l not in ufo1.groups:
-                ufo1.groups[l] = ufo2.groups[l]
-            else:
-                ufo1.groups[l] = list(set(ufo1.groups[l] + ufo2.groups[l]))
-        if r.startswith("public.kern"):
-            if r not in ufo1.groups:
-                ufo1.groups[r] = ufo2.groups[r]
-            else:
-                ufo1.groups[r] = list(set(ufo1.groups[r] + ufo2.groups[r]))
+        merge_group(l)
+        merge_group(r)
+
+    # Routines for merging font lib keys. The list-valued keys (e.g.
+    # public.glyphOrder) are indexed with sets so that membership tests
+    # don't scan the whole list for every glyph.
+    lib_indexes = {}
+
+    def lib_index(ufo, name):
+        key = (id(ufo), name)
+        if key not in lib_indexes:
+            lib_indexes[key] = set(ufo.lib[name])
+        return lib_indexes[key]
 
-    # Routines for merging font lib keys
     def merge_set(ufo1, ufo2, name, g, create_if_not_in_ufo1=False):
-        if name not in ufo2.lib or g not in ufo2.lib[name]:
+        if name not in ufo2.lib or g not in lib_index(ufo2, name):
             return
         if name not in ufo1.lib:
             if create_if_not_in_ufo1:
                 ufo1.lib[name] = []
             else:
                 return
-        if g not in ufo1.lib[name]:
+        index = lib_index(ufo1, name)
+        if g not in index:
             ufo1.lib[name].append(g)
+            index.add(g)
 
     def merge_dict(ufo1, ufo2, name, g, create_if_not_in_ufo1=False):
         if name not in ufo2.lib or g not in ufo2.lib[name]:
@@ -176,7 +305,12 @@ def merge_ufos(
         ufo1.lib[name][g] = ufo2.lib[name][g]
 
     # Check the glyphs for components
+    closed = set()
+
     def close_components(glyphs, g):
+        if g in closed:
+            return
+        closed.add(g)
         if not ufo2[g].components:
             return
         for comp in ufo2[g].components:
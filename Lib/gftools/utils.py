@@ -14,14 +14,18 @@
 # limitations under the License.
 #
 from __future__ import annotations
-from typing import Union
+from typing import Dict, List, Optional, Tuple, Union
+import hashlib
+import logging
 import requests
+import time
 from urllib.parse import urljoin
 from io import BytesIO
 from zipfile import ZipFile
 import sys
 import os
 import shutil
+import tempfile
 import ufoLib2
 import unicodedata
 from unidecode import unidecode
@@ -47,11 +51,16 @@ if sys.version_info[0] == 3:
 else:
     from ConfigParser import ConfigParser
 from bs4 import BeautifulSoup
+from filelock import FileLock, Timeout
+from gftools import ufojson
+
+log = logging.getLogger(__name__)
 
 # =====================================
 # HELPER FUNCTIONS
 
 PROD_FAMILY_DOWNLOAD = "https://fonts.google.com/download?family={}"
+PROD_METADATA = "https://fonts.google.com/metadata/fonts"
 
 
 def download_family_from_Google_Fonts(
@@ -61,7 +70,7 @@ def download_family_from_Google_Fonts(
     # TODO (M Foley) update all dl_urls in .ini files.
     dl_url = dl_url.replace("download?family=", "download/list?family=")
     url = dl_url.format(family.replace(" ", "%20"))
-    data = json.loads(requests.get(url, auth=auth).text[5:])
+    data = json.loads(cached_get(url, auth=auth)[5:])
     res = []
     for item in data["manifest"]["fileRefs"]:
         filename = item["filename"]
@@ -70,25 +79,31 @@ def download_family_from_Google_Fonts(
             continue
         if not filename.endswith(("otf", "ttf")):
             continue
+        content = cached_get(dl_url, auth=auth)
         if dst:
             target = os.path.join(dst, filename)
-            download_file(dl_url, target, auth=auth)
+            with open(target, "wb") as doc:
+                doc.write(content)
             res.append(target)
         else:
-            res.append(download_file(dl_url, auth=auth))
+            res.append(BytesIO(content))
     return res
 
 
 def Google_Fonts_has_family(name):
     """Check if Google Fonts has the specified font family"""
-    # This endpoint is private and may change at some point
-    # TODO (MF) if another function needs this data, refactor it into a
-    # function and use a lru cache
-    data = requests.get("https://fonts.google.com/metadata/fonts").json()
-    family_names = set(i["family"] for i in data["familyMetadataList"])
+    family_names = set(
+        i["family"] for i in Google_Fonts_metadata()["familyMetadataList"]
+    )
     return name in family_names
 
 
+def Google_Fonts_metadata():
+    """Return the metadata of every family served by Google Fonts"""
+    # This endpoint is private and may change at some point
+    return json.loads(cached_get(PROD_METADATA))
+
+
 def load_Google_Fonts_api_key():
     config = ConfigParser()
     config_filepath = os.path.expanduser("~/.gf-api-key")
@@ -227,25 +242,227 @@ def download_files_in_github_dir(orig_url, dst, filter_files=[], overwrite=True)
 
 
 def download_files_from_archive(url, dst):
-    zip_io = download_file(url)
-    with ZipFile(zip_io) as zip_file:
+    with download_file(url) as zip_io, ZipFile(zip_io) as zip_file:
         return fonts_from_zip(zip_file, dst)
 
 
-def download_file(url, dst_path=None, auth=None):
-    """Download a file from a url. If no dst_path is specified, store the file
-    as a BytesIO object"""
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# Downloads smaller than this stay in memory when no dst_path is given
+DOWNLOAD_SPOOL_SIZE = 32 << 20
+DOWNLOAD_RETRIES = 3
+
+_http_session = None
+
+
+def http_session() -> requests.Session:
+    """Return the requests Session shared by gftools' downloads, so that
+    connections to the same host are pooled and reused."""
+    global _http_session
+    # A forked worker process must not share its parent's connections
+    if _http_session is None or _http_session[0] != os.getpid():
+        _http_session = (os.getpid(), requests.Session())
+    return _http_session[1]
+
+
+def download_file(url, dst_path=None, auth=None, size=None, sha256=None):
+    """Download a file from a url, streaming it in chunks.
+
+    If dst_path is specified the file is written there, by way of a
+    dst_path + ".part" file; if a previous download was interrupted the
+    partial file is resumed with an HTTP Range request, provided the
+    resource's ETag or Last-Modified date hasn't changed. Otherwise the file
+    is returned as a seekable temporary file object, which is kept in
+    memory unless it is large.
+
+    The download is checked against the server's Content-Length and,
+    when given, the expected size in bytes and sha256 hex digest. A
+    ValueError is raised if they don't match."""
+    headers = {"Accept-Encoding": "identity"}
     if os.environ.get("GH_TOKEN") and re.match(r"^https://(\w+\.)?github.com", url):
-        headers = {"Authorization": f"token {os.environ['GH_TOKEN']}"}
-    else:
-        headers = {}
+        headers["Authorization"] = f"token {os.environ['GH_TOKEN']}"
 
-    request = requests.get(url, stream=True, headers=headers, auth=auth)
-    request.raise_for_status()
     if not dst_path:
-        return BytesIO(request.content)
-    with open(dst_path, "wb") as downloaded_file:
-        downloaded_file.write(request.content)
+        downloaded_file = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_SIZE)
+        try:
+            _download_to(downloaded_file, url, headers, auth, size, sha256)
+        except Exception:
+            downloaded_file.close()
+            raise
+        downloaded_file.seek(0)
+        return downloaded_file
+
+    part_path = f"{dst_path}.part"
+    # The ETag or Last-Modified date of the resource the partial file came
+    # from, so that it is only resumed if the resource hasn't changed
+    validator_path = f"{part_path}.validator"
+    with open(part_path, "a+b") as downloaded_file:
+        try:
+            _download_to(
+                downloaded_file, url, headers, auth, size, sha256, validator_path
+            )
+        except ValueError:
+            # Corrupt, so don't try to resume it next time
+            downloaded_file.close()
+            os.remove(part_path)
+            if os.path.exists(validator_path):
+                os.remove(validator_path)
+            raise
+    os.replace(part_path, dst_path)
+    if os.path.exists(validator_path):
+        os.remove(validator_path)
+
+
+def _response_validator(response):
+    # A weak ETag can't be used with If-Range
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _download_to(fp, url, headers, auth, size, sha256, validator_path=None):
+    total = None
+    validator = None
+    if validator_path and os.path.exists(validator_path):
+        with open(validator_path) as f:
+            validator = f.read().strip() or None
+    attempt = 0
+    while True:
+        fp.seek(0, os.SEEK_END)
+        offset = fp.tell()
+        if offset and validator is None:
+            # Nothing to tell whether the partial data is still current
+            fp.seek(0)
+            fp.truncate()
+            offset = 0
+        request_headers = dict(headers)
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+            request_headers["If-Range"] = validator
+        try:
+            with http_session().get(
+                url, stream=True, headers=request_headers, auth=auth
+            ) as response:
+                if offset and response.status_code == 416:
+                    # The partial file is longer than the resource, which
+                    # must have changed; start again
+                    log.warning(f"Restarting the download of {url}")
+                    fp.seek(0)
+                    fp.truncate()
+                    validator = None
+                    continue
+                response.raise_for_status()
+                if response.status_code == 206:
+                    total = int(response.headers["Content-Range"].split("/")[-1])
+                else:
+                    # A fresh download, or the resource changed, or the
+                    # server ignored our Range
+                    fp.seek(0)
+                    fp.truncate()
+                    validator = _response_validator(response)
+                    if validator_path:
+                        with open(validator_path, "w") as f:
+                            f.write(validator or "")
+                    if "Content-Length" in response.headers:
+                        total = int(response.headers["Content-Length"])
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    fp.write(chunk)
+            break
+        except (
+            requests.exceptions.ChunkedEncodingError,
+            requests.exceptions.ConnectionError,
+        ) as e:
+            if attempt == DOWNLOAD_RETRIES:
+                raise
+            attempt += 1
+            log.warning(f"Downloading {url} was interrupted ({e}), resuming")
+
+    fp.seek(0, os.SEEK_END)
+    got = fp.tell()
+    for expected in (total, size):
+        if expected is not None and got != expected:
+            raise ValueError(f"Downloaded {got} bytes from {url}, expected {expected}")
+    if sha256:
+        fp.seek(0)
+        hasher = hashlib.sha256()
+        for chunk in iter(lambda: fp.read(DOWNLOAD_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+        if hasher.hexdigest() != sha256.lower():
+            raise ValueError(
+                f"sha256 of {url} is {hasher.hexdigest()}, expected {sha256}"
+            )
+
+
+# How long a cached response is used before asking the server whether it
+# has changed. Override with $GFTOOLS_HTTP_CACHE_TTL (in seconds).
+HTTP_CACHE_TTL = 6 * 60 * 60
+
+
+def cached_get(url, auth=None, ttl=None) -> bytes:
+    """Fetch a url through gftools' on-disk HTTP cache.
+
+    Responses younger than ttl seconds are returned without touching the
+    network. Older ones are revalidated with their ETag or Last-Modified
+    date, so an unchanged resource is not downloaded again. If the server
+    can't be reached, a stale response is returned rather than failing."""
+    if ttl is None:
+        ttl = float(os.environ.get("GFTOOLS_HTTP_CACHE_TTL", HTTP_CACHE_TTL))
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    cache_dir = gftools_cache_dir("http")
+    body_path = cache_dir / f"{key}.body"
+    meta_path = cache_dir / f"{key}.json"
+
+    with FileLock(str(cache_dir / f"{key}.lock")):
+        meta = None
+        if meta_path.is_file() and body_path.is_file():
+            meta = json.loads(meta_path.read_text())
+            if time.time() - meta["fetched"] < ttl:
+                touch_cache_entry(body_path)
+                return body_path.read_bytes()
+
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            response = http_session().get(url, headers=headers, auth=auth)
+            if response.status_code != 304:
+                response.raise_for_status()
+        except requests.RequestException as e:
+            if meta is None:
+                raise
+            log.warning(f"Couldn't revalidate {url} ({e}), using cached copy")
+            touch_cache_entry(body_path)
+            return body_path.read_bytes()
+
+        if response.status_code == 304:
+            content = body_path.read_bytes()
+        else:
+            content = response.content
+            _write_atomically(body_path, content)
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag") or (meta or {}).get("etag"),
+            "last_modified": response.headers.get("Last-Modified")
+            or (meta or {}).get("last_modified"),
+            "fetched": time.time(),
+        }
+        # The body goes first: metadata is only ever paired with a complete
+        # body, even if gftools is killed in between.
+        _write_atomically(meta_path, json.dumps(meta).encode("utf-8"))
+    maybe_prune_cache(cache_dir)
+    return content
+
+
+def _write_atomically(path, data: bytes):
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as fp:
+        fp.write(data)
+    try:
+        os.replace(fp.name, path)
+    except BaseException:
+        os.remove(fp.name)
+        raise
 
 
 def fonts_from_zip(zipfile, dst=None, ignore_static=True):
@@ -652,16 +869,227 @@ def is_google_fonts_repo(fp: "Path | str"):
     return True
 
 
+def gftools_cache_dir(*parts) -> Path:
+    """Return a directory inside the gftools user cache, creating it if needed.
+
+    The cache lives in $GFTOOLS_CACHE_DIR if set, otherwise in
+    $XDG_CACHE_HOME/gftools (defaulting to ~/.cache/gftools)."""
+    root = os.environ.get("GFTOOLS_CACHE_DIR")
+    if not root:
+        xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+        root = os.path.join(xdg_cache, "gftools")
+    path = Path(root, *parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+# Cache entries which haven't been used for this long are removed the next
+# time their cache is written to. Override with $GFTOOLS_CACHE_MAX_AGE (in
+# seconds), or clear the caches with `gftools clean-cache`.
+CACHE_MAX_AGE = 30 * 24 * 60 * 60
+# Caches are pruned at most this often
+CACHE_PRUNE_INTERVAL = 24 * 60 * 60
+
+
+def touch_cache_entry(path: "Path | str"):
+    """Mark a cache entry as used, so that pruning keeps it."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _cache_entries(cache_dir: Path) -> Dict[str, List[Path]]:
+    """The entries of a cache directory: the files and directories which
+    share a key, e.g. <key>, <key>.body and <key>.json. Lock files aren't
+    part of an entry, and the names of leftover temporary files (starting
+    with a dot) are entries of their own."""
+    entries = defaultdict(list)
+    for path in cache_dir.iterdir():
+        if path.name.endswith(".lock"):
+            continue
+        key = path.name if path.name.startswith(".") else path.name.split(".")[0]
+        entries[key].append(path)
+    return entries
+
+
+def _disk_usage(path: Path) -> int:
+    if not path.is_dir():
+        return path.stat().st_size
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def prune_cache(
+    cache_dir: "Path | str",
+    max_age: Optional[float] = None,
+    max_size: Optional[int] = None,
+) -> Tuple[int, int]:
+    """Remove entries from a directory of the gftools user cache.
+
+    Entries last used more than ``max_age`` seconds ago are removed, then
+    the least recently used ones until the rest take up at most
+    ``max_size`` bytes. An entry another process holds the lock of is left
+    alone. Returns the number of entries removed and the bytes freed."""
+    cache_dir = Path(cache_dir)
+    entries = []
+    for key, paths in _cache_entries(cache_dir).items():
+        try:
+            used = max(path.stat().st_mtime for path in paths)
+            size = sum(_disk_usage(path) for path in paths)
+        except FileNotFoundError:
+            continue  # Being replaced right now
+        entries.append((used, size, key, paths))
+    entries.sort()
+    total = sum(size for _, size, _, _ in entries)
+    now = time.time()
+    removed = freed = 0
+    for used, size, key, paths in entries:
+        if key.startswith(".") and now - used < CACHE_PRUNE_INTERVAL:
+            continue  # A temporary file which may still be in use
+        expired = max_age is not None and now - used > max_age
+        too_big = max_size is not None and total - freed > max_size
+        if not (expired or too_big):
+            continue
+        try:
+            with FileLock(str(cache_dir / f"{key}.lock"), timeout=0):
+                for path in paths:
+                    if path.is_dir():
+                        shutil.rmtree(path, ignore_errors=True)
+                    elif path.exists():
+                        path.unlink()
+        except Timeout:
+            continue
+        removed += 1
+        freed += size
+    return removed, freed
+
+
+def maybe_prune_cache(cache_dir: "Path | str"):
+    """Prune entries which haven't been used for $GFTOOLS_CACHE_MAX_AGE
+    seconds from a cache directory, if it hasn't been pruned recently.
+    Called by the caches whenever they add an entry."""
+    max_age = float(os.environ.get("GFTOOLS_CACHE_MAX_AGE", CACHE_MAX_AGE))
+    if max_age <= 0:
+        return
+    marker = Path(cache_dir) / ".last-pruned"
+    try:
+        if time.time() - marker.stat().st_mtime < CACHE_PRUNE_INTERVAL:
+            return
+    except FileNotFoundError:
+        pass
+    marker.touch()
+    try:
+        removed, freed = prune_cache(cache_dir, max_age=max_age)
+    except OSError as e:
+        log.warning(f"Couldn't prune {cache_dir}: {e}")
+        return
+    if removed:
+        log.info(f"Removed {removed} unused entries ({freed} bytes) from {cache_dir}")
+
+
+def hash_path(path: "Path | str", hasher=None):
+    """Feed the contents of a file, or of every file inside a directory
+    (e.g. a .glyphspackage or .ufo), into a hashlib object.
+
+    Directory entries are visited in a stable order and their relative
+    paths are hashed too, so renaming a file changes the digest. Returns
+    the hasher; a new sha256 is created if none is given."""
+    if hasher is None:
+        hasher = hashlib.sha256()
+    path = Path(path)
+    if path.is_dir():
+        for child in sorted(p for p in path.rglob("*") if p.is_file()):
+            hasher.update(child.relative_to(path).as_posix().encode("utf-8"))
+            hash_path(child, hasher)
+        return hasher
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher
+
+
+def parallel_map(func, *iterables, jobs=None, initializer=None, initargs=()):
+    """Like map(), but fan the calls out over a process pool.
+
+    Results are yielded in input order. With jobs=1 everything runs in
+    this process, which keeps tracebacks and debuggers simple; jobs=None
+    uses one worker per CPU. func must be a picklable, module level
+    callable. If given, initializer(*initargs) is called once in each
+    worker before it runs any calls, which is cheaper than passing large
+    shared data along with every call."""
+    if jobs == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        yield from map(func, *iterables)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=initializer, initargs=initargs
+    ) as pool:
+        yield from pool.map(func, *iterables)
+
+
+def parallel_map_unordered(
+    func, *iterables, jobs=None, initializer=None, initargs=(), window=None
+):
+    """Like parallel_map(), but yield (index, result) pairs as the calls
+    complete rather than in input order.
+
+    At most ``window`` calls (by default twice the number of workers) are
+    submitted at a time, so long or endless inputs are consumed as they
+    are processed instead of all being queued up front."""
+    if jobs == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        yield from enumerate(map(func, *iterables))
+        return
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    window = window or 2 * (jobs or os.cpu_count() or 1)
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=initializer, initargs=initargs
+    ) as pool:
+        pending = {}
+        for index, args in enumerate(zip(*iterables)):
+            while len(pending) >= window:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+            pending[pool.submit(func, *args)] = index
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+
 def open_ufo(path):
     if os.path.isdir(path):
         return ufoLib2.Font.open(path)
     elif path.endswith(".json"):
-        return ufoLib2.Font.json_load(open(path, "rb"))
+        return ufojson.load(path)
     else:  # Maybe a .ufoz
         return ufoLib2.Font.open(path)
     return False
 
 
+def save_ufo(ufo, path):
+    """Save a UFO as a .ufo.json file, a .ufoz or a UFO package, depending
+    on the path's extension."""
+    if path.endswith(".json"):
+        ufojson.dump(ufo, path)
+    elif path.endswith(".ufoz"):
+        ufo.save(path, overwrite=True, structure="zip")
+    else:
+        ufo.save(path, overwrite=True)
+
+
 # https://github.com/googlefonts/nanoemoji/blob/fb4b0b3e10f7197e7fe33c4ae6949841e4440397/src/nanoemoji/util.py#L167-L176
 def shell_quote(s: Union[str, Path]) -> str:
     """Quote a string or pathlib.Path for use in a shell command."""
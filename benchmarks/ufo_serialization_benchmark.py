@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Benchmark the formats UFOs are passed between builder steps in
+
+Writes and reads a large master as a UFO package, a .ufoz, a .ufo.json
+through ufoLib2 and a .ufo.json through gftools.ufojson, reporting the
+time taken and the size on disk of each. By default the master is
+synthesised in memory (a CJK-sized master of outlined glyphs); pass a UFO
+to measure that instead:
+
+    python benchmarks/ufo_serialization_benchmark.py
+    python benchmarks/ufo_serialization_benchmark.py NotoSansCJK.ufo
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import ufoLib2
+
+from gftools import ufojson
+
+
+def _draw_glyph(glyph, contours, points):
+    pen = glyph.getPen()
+    for c in range(contours):
+        pen.moveTo((c * 10, 0))
+        for p in range(1, points // 4):
+            pen.lineTo((c * 10 + p, p * 3))
+            pen.curveTo((c + p, p * 5), (c + p * 2, p * 6), (c * 10 + p * 3, p * 7))
+        pen.closePath()
+
+
+def make_master(num_glyphs=20000, contours=5, points=16):
+    ufo = ufoLib2.Font()
+    names = [f"uni{cp:04X}" for cp in range(0x4E00, 0x4E00 + num_glyphs)]
+    for name in names:
+        glyph = ufo.newGlyph(name)
+        glyph.width = 1000
+        glyph.unicodes = [int(name[3:], 16)]
+        _draw_glyph(glyph, contours, points)
+    ufo.lib["public.glyphOrder"] = names
+    return ufo
+
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(path)
+        for f in files
+    )
+
+
+FORMATS = {
+    "package": (
+        ".ufo",
+        lambda ufo, path: ufo.save(path, overwrite=True),
+        lambda path: ufoLib2.Font.open(path, lazy=False),
+    ),
+    "zip": (
+        ".ufoz",
+        lambda ufo, path: ufo.save(path, overwrite=True, structure="zip"),
+        lambda path: ufoLib2.Font.open(path, lazy=False),
+    ),
+    "json (ufoLib2)": (
+        ".ufo.json",
+        lambda ufo, path: ufo.json_dump(path),
+        lambda path: ufoLib2.Font.json_load(path),
+    ),
+    "json (gftools.ufojson)": (
+        ".ufo.json",
+        ufojson.dump,
+        ufojson.load,
+    ),
+}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("ufo", nargs="?", help="UFO to serialize")
+    parser.add_argument("--glyphs", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--format",
+        action="append",
+        choices=list(FORMATS),
+        help="Format to measure (can be given multiple times; default: all)",
+    )
+    args = parser.parse_args(args)
+
+    if args.ufo:
+        ufo = ufoLib2.Font.open(args.ufo, lazy=False)
+    else:
+        ufo = make_master(args.glyphs)
+    print(f"{len(ufo)} glyphs")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.format or FORMATS:
+            extension, write, read = FORMATS[name]
+            path = os.path.join(tmp, "Master" + extension)
+            writes, reads = [], []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                write(ufo, path)
+                writes.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                read(path)
+                reads.append(time.perf_counter() - start)
+            print(
+                f"{name:24} write {min(writes):6.2f}s  read {min(reads):6.2f}s  "
+                f"size {_size(path) / 1e6:7.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Benchmark gftools.ufomerge.merge_ufos
+
+Merges a Latin-Greek-Cyrillic donor into a CJK master. By default both
+UFOs are synthesised in memory with roughly the shape of the real thing
+(a 20k glyph master; a donor with composites, kerning groups and pairs and
+a few thousand substitution rules). Pass real UFOs to measure those
+instead:
+
+    python benchmarks/ufomerge_benchmark.py
+    python benchmarks/ufomerge_benchmark.py NotoSansCJK.ufo NotoSans.ufo
+"""
+import argparse
+import logging
+import time
+
+import ufoLib2
+from fontTools.pens.recordingPen import RecordingPen
+
+from gftools.ufomerge import merge_ufos
+
+
+def _draw_box(glyph):
+    pen = glyph.getPen()
+    pen.moveTo((0, 0))
+    pen.lineTo((0, 500))
+    pen.lineTo((500, 500))
+    pen.closePath()
+
+
+def make_master(num_glyphs=20000):
+    ufo = ufoLib2.Font()
+    names = [".notdef", "space"] + [
+        f"uni{cp:04X}" for cp in range(0x4E00, 0x4E00 + num_glyphs)
+    ]
+    for name in names:
+        glyph = ufo.newGlyph(name)
+        glyph.width = 1000
+        if name.startswith("uni"):
+            glyph.unicodes = [int(name[3:], 16)]
+            _draw_box(glyph)
+    ufo.lib["public.glyphOrder"] = list(names)
+    return ufo
+
+
+def make_donor(num_bases=1200, marks=12):
+    ufo = ufoLib2.Font()
+    bases = [f"base{i:04d}" for i in range(num_bases)]
+    mark_names = [f"mark{i:02d}comb" for i in range(marks)]
+    for i, name in enumerate(bases + mark_names):
+        glyph = ufo.newGlyph(name)
+        glyph.width = 600
+        glyph.unicodes = [0x0100 + i]
+        _draw_box(glyph)
+    # Precomposed glyphs built from components
+    composites = []
+    for base in bases[:600]:
+        for mark in mark_names[:4]:
+            name = f"{base}_{mark}"
+            glyph = ufo.newGlyph(name)
+            glyph.width = 600
+            pen = glyph.getPen()
+            pen.addComponent(base, (1, 0, 0, 1, 0, 0))
+            pen.addComponent(mark, (1, 0, 0, 1, 100, 0))
+            composites.append(name)
+    alternates = [f"{base}.ss01" for base in bases]
+    for name in alternates:
+        _draw_box(ufo.newGlyph(name))
+    all_glyphs = bases + mark_names + composites + alternates
+    ufo.lib["public.glyphOrder"] = list(all_glyphs)
+
+    # Kerning: large classes, many pairs between them and some exceptions
+    for i in range(40):
+        members = all_glyphs[i * 60 : (i + 1) * 60]
+        ufo.groups[f"public.kern1.L{i}"] = members
+        ufo.groups[f"public.kern2.R{i}"] = members
+    for i in range(40):
+        for j in range(40):
+            ufo.kerning[(f"public.kern1.L{i}", f"public.kern2.R{j}")] = -10
+    for a in bases[:300]:
+        for b in bases[:30]:
+            ufo.kerning[(a, b)] = 5
+
+    # Features: a big single substitution, plus contextual rules sharing
+    # large glyph classes
+    lines = [
+        "@BASES = [%s];" % " ".join(bases),
+        "@MARKS = [%s];" % " ".join(mark_names),
+    ]
+    lines.append("lookup ss01_sub {")
+    lines += [f"    sub {b} by {b}.ss01;" for b in bases]
+    lines.append("} ss01_sub;")
+    lines.append("feature ss01 { lookup ss01_sub; } ss01;")
+    lines.append("lookup contextual {")
+    for i, base in enumerate(bases):
+        lines.append(f"    sub @BASES {base}' @MARKS by {base}.ss01;")
+    lines.append("} contextual;")
+    lines.append("feature calt { lookup contextual; } calt;")
+    ufo.features.text = "\n".join(lines)
+    return ufo
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("master", nargs="?", help="UFO to merge into")
+    parser.add_argument("donor", nargs="?", help="UFO to merge from")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(args)
+    logging.getLogger("ufomerge").setLevel(logging.WARNING)
+    logging.getLogger("fontTools").setLevel(logging.ERROR)
+
+    timings = []
+    for _ in range(args.repeat):
+        if args.master:
+            master = ufoLib2.Font.open(args.master, lazy=False)
+            donor = ufoLib2.Font.open(args.donor, lazy=False)
+        else:
+            master, donor = make_master(), make_donor()
+        glyphs = list(donor.keys())
+        start = time.perf_counter()
+        merge_ufos(master, donor, glyphs=glyphs, existing_handling="skip")
+        timings.append(time.perf_counter() - start)
+    print(
+        f"merge_ufos: best {min(timings):.2f}s, "
+        f"mean {sum(timings) / len(timings):.2f}s over {len(timings)} runs "
+        f"({len(glyphs)} glyphs merged into {len(master)})"
+    )
+
+
+if __name__ == "__main__":
+    main()
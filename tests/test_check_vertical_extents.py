@@ -0,0 +1,48 @@
+import os
+
+from fontTools.pens.boundsPen import BoundsPen
+from fontTools.subset import Options, Subsetter
+from fontTools.ttLib import TTFont
+
+from gftools.scripts.check_vertical_extents import (
+    GlyphExtents,
+    test_all_combinations as check_all_combinations,
+    test_rendering as check_rendering,
+)
+
+
+CWD = os.path.dirname(__file__)
+VF_FONT = os.path.join(CWD, "..", "data", "test", "Lora-Roman-VF.ttf")
+
+
+def test_glyph_extents_per_location():
+    font = TTFont(VF_FONT)
+    glyph_set = font.getGlyphSet(location={"wght": 700})
+    extents = GlyphExtents(font, {"wght": 700})
+    gid = font.getGlyphID("f")
+    pen = BoundsPen(glyph_set, ignoreSinglePoints=True)
+    glyph_set["f"].draw(pen)
+    assert extents[gid] == (pen.bounds[1], pen.bounds[3])
+    assert extents[font.getGlyphID("space")] == (None, None)
+    assert extents[gid] != GlyphExtents(font)[gid]
+
+
+def test_check_in_parallel(tmp_path):
+    text = "Hamburgefonstiv\nÀÉÎõü\ngjpqy\n" * 50
+    serial = check_rendering(text, VF_FONT, -200, 700)
+    assert serial
+    assert check_rendering(text, VF_FONT, -200, 700, jobs=2) == serial
+
+    font = TTFont(VF_FONT)
+    subsetter = Subsetter(Options(layout_features=["*"]))
+    subsetter.populate(text="Hafgjy")
+    subsetter.subset(font)
+    small_font = str(tmp_path / "Small.ttf")
+    font.save(small_font)
+    combinations = check_all_combinations(
+        2, small_font, -250, 700, location={"wght": 700}, jobs=2
+    )
+    assert combinations == check_all_combinations(
+        2, small_font, -250, 700, location={"wght": 700}
+    )
+    assert {len(text) for _, text in combinations} == {1, 2}
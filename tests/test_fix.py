@@ -281,3 +281,105 @@ def test_ofl_license_strings(static_font):
     fix_license_strings(static_font)
     for id, expected in ((13, OFL_LICENSE_INFO), (14, OFL_LICENSE_URL)):
         assert expected == static_font["name"].getName(id, 3, 1, 0x409).toUnicode()
+
+
+def test_fix_font_leaves_source_untouched():
+    from gftools.utils import font_familyname
+
+    font = TTFont(os.path.join(TEST_DATA, "Lora-Regular.ttf"), lazy=True)
+    fixed = fix_font(font, include_source_fixes=True, new_family_name="Foo Bar")
+    assert font_familyname(fixed) == "Foo Bar"
+    assert font_familyname(font) == "Lora"
+    assert "gasp" in fixed and "gasp" not in font
+
+
+def test_fix_font_only_decompiles_needed_tables(var_font):
+    from io import BytesIO
+
+    fixed = fix_font(var_font, include_source_fixes=True)
+    # Large tables no fixer looks at must never be decompiled...
+    for tag in ("glyf", "gvar", "GPOS", "GSUB"):
+        assert not fixed.isLoaded(tag)
+    # ...and tables which were only read are saved as their original bytes
+    assert set(fixed.tables) <= {"name", "OS/2", "head", "fvar", "hhea", "post"}
+    fixed.save(BytesIO())
+    assert fixed.getTableData("STAT") == var_font.getTableData("STAT")
+
+
+def test_fix_font_saves_stat_renumbered_by_name_fixes(tmp_path):
+    from fontTools.otlLib.builder import buildStatTable
+
+    # A static font whose STAT uses the WWS name IDs, which fix_nametable
+    # removes; axisregistry gives the STAT entries new name IDs
+    font = TTFont(os.path.join(TEST_DATA, "Lora-Regular.ttf"))
+    font["name"].setName("Lora", 21, 3, 1, 0x409)
+    font["name"].setName("Regular", 22, 3, 1, 0x409)
+    buildStatTable(
+        font,
+        [
+            {
+                "tag": "wght",
+                "name": "Weight",
+                "values": [{"value": 400, "name": "Regular", "flags": 2}],
+            }
+        ],
+    )
+    stat = font["STAT"].table
+    stat.DesignAxisRecord.Axis[0].AxisNameID = 21
+    stat.AxisValueArray.AxisValue[0].ValueNameID = 22
+    path = str(tmp_path / "Lora-Regular.ttf")
+    font.save(path)
+
+    fixed = fix_font(TTFont(path, lazy=True), include_source_fixes=True)
+    save_font(fixed, path)
+    font = TTFont(path)
+    stat = font["STAT"].table
+    name_ids = [
+        stat.DesignAxisRecord.Axis[0].AxisNameID,
+        stat.AxisValueArray.AxisValue[0].ValueNameID,
+    ]
+    assert not {21, 22} & set(name_ids)
+    assert all(font["name"].getDebugName(name_id) for name_id in name_ids)
+
+
+@pytest.mark.parametrize("family", ["mavenpro", "cabin_multi"])
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_fix_family_files_matches_fix_family(tmp_path, monkeypatch, jobs, family):
+    import gftools.fix
+
+    monkeypatch.setattr(gftools.fix, "Google_Fonts_has_family", lambda name: False)
+    paths = sorted(glob(os.path.join("data", "test", family, "*.ttf")))
+    expected = fix_family([TTFont(p) for p in paths], include_source_fixes=True)
+    out_paths = fix_family_files(
+        paths,
+        lambda path, filename: str(tmp_path / filename),
+        include_source_fixes=True,
+        jobs=jobs,
+    )
+    assert len(out_paths) == len(paths)
+    for font, out_path in zip(expected, out_paths):
+        fixed = TTFont(out_path)
+        assert os.path.basename(out_path) == fix_filename(font)
+        tags = ["OS/2", "hhea", "name"]
+        if family == "cabin_multi":
+            # The family wide fixes rebuild STAT and the fvar instances
+            tags += ["STAT", "fvar"]
+        for tag in tags:
+            assert fixed[tag].compile(fixed) == font[tag].compile(font)
+
+
+def test_save_font_skips_unchanged_fonts(tmp_path):
+    fixed_path = str(tmp_path / "fixed.ttf")
+    fixed = fix_font(TTFont(os.path.join(TEST_DATA, "Lora-Regular.ttf"), lazy=True))
+    assert font_is_modified(fixed)
+    assert save_font(fixed, fixed_path)
+
+    # Fixing an already fixed font is a no-op...
+    refixed = fix_font(TTFont(fixed_path, lazy=True))
+    assert not font_is_modified(refixed)
+    # ...so it is written out as the original bytes, and not at all when
+    # the destination already holds them
+    assert save_font(refixed, str(tmp_path / "refixed.ttf"))
+    with open(fixed_path, "rb") as a, open(tmp_path / "refixed.ttf", "rb") as b:
+        assert a.read() == b.read()
+    assert not save_font(refixed, str(tmp_path / "refixed.ttf"))
@@ -0,0 +1,98 @@
+import os
+import shutil
+
+import pytest
+from fontTools.ttLib import TTFont
+
+from gftools.fontindex import FontIndex
+
+
+CWD = os.path.dirname(__file__)
+TEST_DIR = os.path.join(CWD, "..", "data", "test")
+
+
+@pytest.fixture
+def checkout(tmp_path, monkeypatch):
+    monkeypatch.setenv("GFTOOLS_CACHE_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "ofl"
+    shutil.copytree(os.path.join(TEST_DIR, "mock_googlefonts", "ofl"), root)
+    shutil.copytree(os.path.join(TEST_DIR, "mavenpro"), root / "mavenpro")
+    shutil.copy(os.path.join(TEST_DIR, "Lora-Roman-VF.ttf"), root / "abel")
+    return root
+
+
+def test_index_is_updated_incrementally(checkout):
+    abel = checkout / "abel"
+    with FontIndex() as index:
+        counts = index.update(str(checkout), jobs=2)
+        assert counts["added"] > 3
+        assert counts["updated"] == counts["removed"] == counts["unchanged"] == 0
+        assert index.update(str(checkout))["unchanged"] == counts["added"]
+
+        lora = index.font(abel / "Lora-Roman-VF.ttf")
+        assert lora["family_name"] == "Lora"
+        assert lora["us_weight_class"] == 400
+        assert lora["axes"] == [
+            {"tag": "wght", "min": 400.0, "default": 400.0, "max": 700.0}
+        ]
+        font = TTFont(abel / "Lora-Roman-VF.ttf")
+        assert index.codepoints(abel / "Lora-Roman-VF.ttf") == set(
+            font["cmap"].getBestCmap()
+        )
+        metadata = index.metadata(abel)
+        assert metadata["name"] == "Abel"
+        assert metadata["subsets"][0] == "latin"
+        assert [f["filename"] for f in metadata["fonts"]] == ["Abel-Regular.ttf"]
+
+        font["OS/2"].usWeightClass = 700
+        font.save(abel / "Lora-Roman-VF.ttf")
+        (abel / "Broken.ttf").write_bytes(b"not a font")
+        os.remove(abel / "Abel-Regular.ttf")
+        counts = index.update(str(checkout))
+        assert (counts["added"], counts["updated"], counts["removed"]) == (1, 1, 1)
+        assert index.font(abel / "Lora-Roman-VF.ttf")["us_weight_class"] == 700
+        assert index.font(abel / "Abel-Regular.ttf") is None
+        assert index.names(abel / "Abel-Regular.ttf") == []
+        broken = index.font(abel / "Broken.ttf")
+        assert broken["error"] and broken["family_name"] is None
+
+
+@pytest.mark.parametrize(
+    "script", ["list_weightclass", "list_panose", "check_copyright_notices"]
+)
+def test_scripts_read_the_index(checkout, capsys, script):
+    main = __import__(f"gftools.scripts.{script}", fromlist=["main"]).main
+    fonts = sorted(str(p) for p in checkout.glob("*/*.ttf"))
+    with pytest.raises(SystemExit):
+        main(fonts + ["--csv"])
+    expected = capsys.readouterr().out
+    for _ in range(2):
+        with pytest.raises(SystemExit):
+            main(fonts + ["--csv", "--index"])
+        assert capsys.readouterr().out == expected
+
+
+def test_weights_coverage_reads_the_index(checkout, capsys):
+    from gftools.scripts.font_weights_coverage import main
+
+    main([str(checkout / "mavenpro")])
+    expected = capsys.readouterr().out
+    main([str(checkout / "mavenpro"), "--index"])
+    assert capsys.readouterr().out == expected
+
+
+def test_facts_rejects_unreadable_fonts(checkout):
+    from gftools.scripts.list_panose import main
+
+    broken = checkout / "abel" / "Broken.ttf"
+    broken.write_bytes(b"not a font")
+    lora = str(checkout / "abel" / "Lora-Roman-VF.ttf")
+    with FontIndex() as index:
+        with pytest.raises(ValueError, match="Broken.ttf"):
+            index.facts([lora, str(broken)])
+        assert index.font(broken)["error"]
+        with pytest.raises(ValueError, match="Broken.ttf"):
+            index.codepoints(broken)
+        assert index.facts([lora])[0]["family_name"] == "Lora"
+    with pytest.raises(ValueError, match="Broken.ttf"):
+        main([lora, str(broken), "--index"])
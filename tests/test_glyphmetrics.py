@@ -0,0 +1,76 @@
+import os
+
+import pytest
+from fontTools.ttLib import TTFont
+
+from gftools.glyphmetrics import GlyphMetrics
+
+
+TEST_DATA = os.path.join("data", "test")
+
+
+@pytest.mark.parametrize(
+    "filename", ["Lora-Regular.ttf", "Raleway[wght].ttf", "Inconsolata[wdth,wght].ttf"]
+)
+def test_glyph_metrics_match_fonttools(filename):
+    font = TTFont(os.path.join(TEST_DATA, filename))
+    # Read from the binary tables...
+    metrics = GlyphMetrics(font)
+    assert not font.isLoaded("glyf")
+    assert not font.isLoaded("hmtx")
+
+    glyf = font["glyf"]
+    for gid, name in enumerate(font.getGlyphOrder()):
+        glyph = glyf[name]
+        assert (metrics.advance[gid], metrics.lsb[gid]) == font["hmtx"][name]
+        assert metrics.num_contours[gid] == glyph.numberOfContours
+        assert metrics.is_composite[gid] == glyph.isComposite()
+        if glyph.numberOfContours:
+            expected = [glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax]
+            assert metrics.bbox[gid].tolist() == expected
+
+    # ...and from the decompiled ones, which may hold unsaved changes
+    font["hmtx"]["A"] = (1234, 0)
+    decompiled = GlyphMetrics(font)
+    assert decompiled.advance[decompiled.index("A")] == 1234
+    assert (decompiled.bbox == metrics.bbox).all()
+
+
+def test_glyph_metrics_cff(tmp_path):
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.pens.t2CharStringPen import T2CharStringPen
+
+    def charstring(draw):
+        pen = T2CharStringPen(500, None)
+        draw(pen)
+        return pen.getCharString()
+
+    def triangles(pen):
+        for x in (10, 300):
+            pen.moveTo((x, 0))
+            pen.lineTo((x + 100, 700))
+            pen.lineTo((x + 200, 0))
+            pen.closePath()
+
+    fb = FontBuilder(1000, isTTF=False)
+    fb.setupGlyphOrder([".notdef", "A", "space"])
+    fb.setupCharacterMap({65: "A", 32: "space"})
+    fb.setupCFF(
+        "Test",
+        {},
+        {
+            ".notdef": charstring(triangles),
+            "A": charstring(triangles),
+            "space": charstring(lambda pen: None),
+        },
+        {},
+    )
+    fb.setupHorizontalMetrics({".notdef": (500, 10), "A": (500, 10), "space": (250, 0)})
+    fb.setupHorizontalHeader()
+    fb.save(str(tmp_path / "Test.otf"))
+
+    metrics = GlyphMetrics(TTFont(str(tmp_path / "Test.otf")))
+    assert metrics.num_contours.tolist() == [2, 2, 0]
+    assert metrics.is_empty.tolist() == [False, False, True]
+    assert metrics.bbox[1].tolist() == [10, 0, 500, 700]
+    assert metrics.advance.tolist() == [500, 500, 250]
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from gftools import glyphscache
+
+
+CWD = os.path.dirname(__file__)
+GLYPHS_SOURCE = os.path.join(
+    CWD, "..", "data", "test", "builder", "basic_family_glyphs_0", "TestFamily.glyphs"
+)
+
+
+def test_glyphs_to_designspace_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv("GFTOOLS_CACHE_DIR", str(tmp_path / "cache"))
+
+    first = glyphscache.glyphs_to_designspace(GLYPHS_SOURCE, str(tmp_path / "one"))
+    assert os.path.basename(first) == "TestFamily.designspace"
+    assert os.path.exists(first)
+
+    # A second conversion of the same source must come from the cache
+    def fail(*args, **kwargs):
+        raise AssertionError("Conversion should have been cached")
+
+    monkeypatch.setattr(glyphscache, "_convert", fail)
+    second = glyphscache.glyphs_to_designspace(GLYPHS_SOURCE, str(tmp_path / "two"))
+    assert os.path.basename(second) == "TestFamily.designspace"
+    assert sorted(os.listdir(tmp_path / "one")) == sorted(os.listdir(tmp_path / "two"))
+    # Restored files are as new as a fresh conversion, so that ninja
+    # doesn't see them as older than their source
+    source_mtime = os.path.getmtime(GLYPHS_SOURCE)
+    for root, dirs, files in os.walk(tmp_path / "cache"):
+        for name in dirs + files:
+            os.utime(os.path.join(root, name), (source_mtime - 100,) * 2)
+    glyphscache.glyphs_to_designspace(GLYPHS_SOURCE, str(tmp_path / "four"))
+    for root, dirs, files in os.walk(tmp_path / "four"):
+        for name in dirs + files:
+            assert os.path.getmtime(os.path.join(root, name)) > source_mtime
+
+    # ...but a different designspace name is a different conversion
+    with pytest.raises(AssertionError):
+        glyphscache.glyphs_to_designspace(
+            GLYPHS_SOURCE, str(tmp_path / "three"), designspace_name="Other.designspace"
+        )
+
+
+def test_cache_key_depends_on_glyph_data(tmp_path):
+    glyph_data = tmp_path / "GlyphData.xml"
+    glyph_data.write_text("<glyphData></glyphData>")
+    plain = glyphscache.cache_key(GLYPHS_SOURCE)
+    with_data = glyphscache.cache_key(GLYPHS_SOURCE, [str(glyph_data)])
+    assert plain != with_data
+    glyph_data.write_text("<glyphData><glyph name='foo'/></glyphData>")
+    assert glyphscache.cache_key(GLYPHS_SOURCE, [str(glyph_data)]) != with_data
@@ -0,0 +1,49 @@
+import json
+import os
+import shutil
+
+from gftools.scripts.ots import main
+
+
+CWD = os.path.dirname(__file__)
+TEST_DIR = os.path.join(CWD, "..", "data", "test")
+
+
+def _results(path):
+    with open(path) as fp:
+        return {os.path.basename(r["path"]): r for r in map(json.loads, fp)}
+
+
+def test_ots_skips_fonts_which_passed(tmp_path):
+    fonts = tmp_path / "ofl"
+    (fonts / "lora").mkdir(parents=True)
+    (fonts / "maven").mkdir()
+    shutil.copy(os.path.join(TEST_DIR, "Lora-Regular.ttf"), fonts / "lora")
+    shutil.copy(os.path.join(TEST_DIR, "MavenPro[wght].ttf"), fonts / "maven")
+    with open(os.path.join(TEST_DIR, "Lora-Regular.ttf"), "rb") as fp:
+        (fonts / "lora" / "Broken.ttf").write_bytes(fp.read()[:5000])
+    db = str(tmp_path / "results.sqlite")
+
+    out = str(tmp_path / "first.jsonl")
+    main([str(fonts), "-o", out, "--db", db, "-j", "2"])
+    results = _results(out)
+    assert {name: r["passed"] for name, r in results.items()} == {
+        "Broken.ttf": False,
+        "Lora-Regular.ttf": True,
+        "MavenPro[wght].ttf": True,
+    }
+    assert "Failed to sanitize" in results["Broken.ttf"]["output"]
+    assert not any(r["skipped"] for r in results.values())
+
+    out = str(tmp_path / "second.jsonl")
+    main([str(fonts), "-o", out, "--db", db, "-j", "1"])
+    results = _results(out)
+    assert {name: r["skipped"] for name, r in results.items()} == {
+        "Broken.ttf": False,
+        "Lora-Regular.ttf": True,
+        "MavenPro[wght].ttf": True,
+    }
+
+    out = str(tmp_path / "third.jsonl")
+    main([str(fonts), "-o", out, "--db", db, "--recheck"])
+    assert not any(r["skipped"] for r in _results(out).values())
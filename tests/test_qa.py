@@ -0,0 +1,277 @@
+import json
+import os
+import stat
+import sys
+import time
+
+import pytest
+from fontTools.ttLib import TTFont
+
+from gftools.qa import (
+    FontQA,
+    QAJob,
+    QAScheduler,
+    _tool_version,
+    font_fingerprint,
+)
+
+
+CWD = os.path.dirname(__file__)
+TEST_FONT = os.path.join(CWD, "..", "data", "test", "Lora-Roman-VF.ttf")
+
+
+# Stands in for diffenator3, diff3proof, fontspector and interpolatable:
+# sleeps for a moment, then writes the fonts it was given into the
+# output directory, diff3proof-style.
+FAKE_TOOL = """#!{python}
+import os, sys, time
+args = sys.argv[1:]
+if args == ["--version"]:
+    print("{version}")
+    sys.exit()
+with open(os.path.join(os.path.dirname(sys.argv[0]), "runs.log"), "a") as fp:
+    fp.write(os.path.basename(sys.argv[0]) + "\\n")
+time.sleep({delay})
+if "--output" in args:
+    out = args[args.index("--output") + 1]
+    fonts = [a for a in args if a.endswith(".ttf")]
+    with open(os.path.join(out, "diff3proof.html"), "w") as fp:
+        fp.write(" ".join(fonts))
+sys.exit({returncode})
+"""
+
+
+class FakeFont:
+    def __init__(self, path):
+        self.path = path
+
+    def is_variable(self):
+        return True
+
+
+def _fake_tool(bin_dir, name, delay=0.3, returncode=0, version="1.0"):
+    path = bin_dir / name
+    path.write_text(
+        FAKE_TOOL.format(
+            python=sys.executable, delay=delay, returncode=returncode, version=version
+        )
+    )
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("GFTOOLS_CACHE_DIR", str(tmp_path / "cache"))
+    _tool_version.cache_clear()
+
+
+@pytest.fixture
+def fake_tools(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name in ("diffenator3", "diff3proof", "fontspector", "interpolatable"):
+        _fake_tool(bin_dir, name)
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ["PATH"])
+    return bin_dir
+
+
+def _fonts(tmp_path, kind, count=4, widen=0):
+    """Copies of TEST_FONT, each with a different "a" width"""
+    font = TTFont(TEST_FONT)
+    width, lsb = font["hmtx"]["a"]
+    fonts = []
+    for i in range(count):
+        font["hmtx"]["a"] = (width + i + widen, lsb)
+        path = str(tmp_path / f"{kind}-{i}.ttf")
+        font.save(path)
+        fonts.append(FakeFont(path))
+    return fonts
+
+
+def test_tools_run_concurrently(tmp_path, fake_tools):
+    out = tmp_path / "out"
+    qa = FontQA(
+        _fonts(tmp_path, "after", widen=10),
+        _fonts(tmp_path, "before"),
+        out=str(out),
+        rust=True,
+        jobs=8,
+    )
+    start = time.monotonic()
+    qa.googlefonts_upgrade()
+    summary = qa.wait()
+    elapsed = time.monotonic() - start
+
+    # 13 runs of 0.3s each
+    assert sum(t["jobs"] for t in summary["tools"].values()) == 13
+    assert elapsed < 13 * 0.3 / 2
+    assert not qa.has_error
+    assert json.loads((out / "timings.json").read_text()) == summary
+
+    # Each diff3proof run wrote into its own directory
+    diffbrowsers = out / "Diffbrowsers"
+    assert sorted(os.listdir(diffbrowsers)) == [
+        f"diff3proof-after-{i}.html" for i in range(4)
+    ]
+    for i in range(4):
+        html = (diffbrowsers / f"diff3proof-after-{i}.html").read_text()
+        assert html == f"{tmp_path}/before-{i}.ttf {tmp_path}/after-{i}.ttf"
+
+
+def test_tool_limits_and_timeouts(tmp_path, fake_tools):
+    _fake_tool(fake_tools, "slowtool", delay=5)
+    scheduler = QAScheduler(jobs=4, tool_jobs={"diff3proof": 1}, timeout=1)
+    for i in range(3):
+        scheduler.submit(QAJob("diff3proof", ["diff3proof"], str(i)))
+    scheduler.submit(QAJob("fontspector", ["fontspector"]))
+    scheduler.submit(QAJob("slowtool", ["slowtool"]))
+    finished = scheduler.wait()
+
+    proofs = sorted(
+        (job for job in finished if job.tool == "diff3proof"), key=lambda j: j.start
+    )
+    assert all(a.end <= b.start for a, b in zip(proofs, proofs[1:]))
+    (fontspector,) = [job for job in finished if job.tool == "fontspector"]
+    assert fontspector.start < proofs[1].start
+    (slow,) = [job for job in finished if job.tool == "slowtool"]
+    assert slow.timed_out and slow.failed
+    assert slow.duration < 3
+
+
+def test_failures_set_has_error(tmp_path, fake_tools):
+    _fake_tool(fake_tools, "diff3proof", returncode=1)
+    qa = FontQA(_fonts(tmp_path, "after", 2), out=str(tmp_path / "out"), jobs=2)
+    qa.proof()
+    qa.wait()
+    assert qa.has_error
+
+
+def test_font_fingerprint_ignores_metadata(tmp_path):
+    font = TTFont(TEST_FONT)
+    font["head"].fontRevision += 1
+    font["head"].modified += 100
+    font["name"].setName("Version 9.000", 5, 3, 1, 0x409)
+    metadata_only = str(tmp_path / "metadata.ttf")
+    font.save(metadata_only)
+    assert font_fingerprint(metadata_only) == font_fingerprint(TEST_FONT)
+
+    font["OS/2"].sTypoAscender += 1
+    metrics = str(tmp_path / "metrics.ttf")
+    font.save(metrics)
+    assert font_fingerprint(metrics) != font_fingerprint(TEST_FONT)
+
+
+def test_unchanged_fonts_are_not_diffed(tmp_path, fake_tools):
+    before = _fonts(tmp_path, "before")
+    after = _fonts(tmp_path, "after")
+    # Only after-3 has changed, the others differ only in their version
+    for font in after[:3]:
+        ttfont = TTFont(font.path)
+        ttfont["head"].fontRevision += 1
+        ttfont.save(font.path)
+    ttfont = TTFont(after[3].path)
+    ttfont["hmtx"]["a"] = (0, 0)
+    ttfont.save(after[3].path)
+
+    out = tmp_path / "out"
+    qa = FontQA(after, before, out=str(out), jobs=4)
+    qa.diffenator3()
+    qa.diffbrowsers()
+    summary = qa.wait()
+    assert summary["unchanged"] == [f.path for f in after[:3]]
+    for tool in ("diffenator3", "diffbrowsers"):
+        assert summary["tools"][tool]["jobs"] == 1
+        assert summary["tools"][tool]["skipped"] == 3
+        assert summary["tools"][tool]["saved_time"] > 0
+    assert summary["skip_saved_time"] > 0
+    assert summary["cache_saved_time"] == 0
+    assert os.listdir(out / "Diffbrowsers") == ["diff3proof-after-3.html"]
+
+    # With nothing diffed, there's no telling how long the diffs would take
+    qa = FontQA(after[:3], before[:3], out=str(tmp_path / "none"))
+    qa.diffbrowsers()
+    summary = qa.wait()
+    assert summary["tools"]["diffbrowsers"]["saved_time"] is None
+    assert summary["skip_saved_time"] is summary["saved_time"] is None
+    timings = json.loads((tmp_path / "none" / "timings.json").read_text())
+    assert timings["saved_time"] is None
+
+    qa = FontQA(after, before, out=str(tmp_path / "all"), skip_unchanged=False)
+    qa.diffbrowsers()
+    assert qa.wait()["tools"]["diffbrowsers"]["jobs"] == 4
+
+
+def _runs(fake_tools):
+    runs = (fake_tools / "runs.log").read_text().split()
+    (fake_tools / "runs.log").unlink()
+    return sorted(runs)
+
+
+def test_results_are_cached(tmp_path, fake_tools):
+    before = _fonts(tmp_path, "before", 2)
+    after = _fonts(tmp_path, "after", 2, widen=10)
+
+    def run_qa(out, fonts=after):
+        qa = FontQA(fonts, before, out=str(tmp_path / out), rust=True, jobs=4)
+        qa.googlefonts_upgrade()
+        return qa.wait()
+
+    run_qa("first")
+    assert (
+        _runs(fake_tools)
+        == ["diff3proof"] * 2
+        + ["diffenator3"] * 2
+        + ["fontspector"]
+        + ["interpolatable"] * 2
+    )
+    summary = run_qa("second")
+    assert not (fake_tools / "runs.log").exists()
+    assert all(t["cached"] == t["jobs"] for t in summary["tools"].values())
+    assert summary["saved_time"] > 0
+    first, second = tmp_path / "first", tmp_path / "second"
+    for report in (
+        "Diffbrowsers/diff3proof-after-0.html",
+        "Diffbrowsers/diff3proof-after-1.html",
+    ):
+        assert (first / report).read_text() == (second / report).read_text()
+
+    # Only the runs on a changed font, and those on all the fonts, run again
+    ttfont = TTFont(after[1].path)
+    ttfont["hmtx"]["a"] = (0, 0)
+    ttfont.save(after[1].path)
+    run_qa("third")
+    assert _runs(fake_tools) == [
+        "diff3proof",
+        "diffenator3",
+        "fontspector",
+        "interpolatable",
+    ]
+
+    # As does everything after a tool upgrade
+    _fake_tool(fake_tools, "diff3proof", version="2.0")
+    _tool_version.cache_clear()
+    run_qa("fourth")
+    assert _runs(fake_tools) == ["diff3proof"] * 2
+
+
+def test_cache_keys_cover_metadata_and_extra_args(tmp_path, fake_tools):
+    _fake_tool(fake_tools, "fontbakery")
+    fonts = _fonts(tmp_path, "after", 1)
+    config = tmp_path / "config.toml"
+    config.write_text("a = 1")
+
+    def run_fontbakery(out, extra_args=None):
+        qa = FontQA(fonts, out=str(tmp_path / out), jobs=1)
+        qa.fontbakery(extra_args=extra_args)
+        return qa.wait()["tools"]["fontbakery"]["cached"]
+
+    assert run_fontbakery("first") == 0
+    assert run_fontbakery("second") == 1
+    (tmp_path / "METADATA.pb").write_text('name: "After"')
+    assert run_fontbakery("third") == 0
+    assert run_fontbakery("fourth", ["--config", str(config)]) == 0
+    assert run_fontbakery("fifth", ["--config", str(config)]) == 1
+    config.write_text("a = 2")
+    assert run_fontbakery("sixth", ["--config", str(config)]) == 0
+    assert run_fontbakery("seventh", ["--config", str(tmp_path)]) == 0
+    assert run_fontbakery("eighth", ["--config", str(tmp_path)]) == 0
@@ -0,0 +1,141 @@
+import json
+import os
+
+import pytest
+from fontTools.ttLib import TTFont
+
+pytest.importorskip("freetype")
+
+from gftools.render_text import (
+    RenderFont,
+    diff_stats,
+    freetype_backend,
+    render_waterfall,
+)
+
+
+CWD = os.path.dirname(__file__)
+VF_FONT = os.path.join(CWD, "..", "data", "test", "Lora-Roman-VF.ttf")
+
+
+@pytest.fixture
+def changed_font(tmp_path):
+    """A copy of VF_FONT with a wider "a" """
+    font = TTFont(VF_FONT)
+    width, lsb = font["hmtx"]["a"]
+    font["hmtx"]["a"] = (width + 200, lsb)
+    path = str(tmp_path / "Lora-Changed.ttf")
+    font.save(path)
+    return path
+
+
+def test_render_font_is_parsed_once(monkeypatch):
+    opened = []
+
+    class CountingRenderer(freetype_backend.FontRenderer):
+        def __init__(self, font_path):
+            opened.append(font_path)
+            super().__init__(font_path)
+
+    expected = [
+        render_waterfall(VF_FONT, "Hamburg", variations=location, backend="freetype")
+        for location in (None, {"wght": 700}, None)
+    ]
+
+    monkeypatch.setattr(freetype_backend, "FontRenderer", CountingRenderer)
+    font = RenderFont(VF_FONT, "freetype")
+    rendered = [
+        render_waterfall(font, "Hamburg", variations=location)
+        for location in (None, {"wght": 700}, None)
+    ]
+    assert len(opened) == 1
+    assert [im.tobytes() for im in rendered] == [im.tobytes() for im in expected]
+    assert rendered[0].tobytes() != rendered[1].tobytes()
+
+    with pytest.raises(ValueError):
+        render_waterfall(font, "Hamburg", backend="coretext")
+
+
+def test_glyph_bitmaps_are_cached():
+    renderer = freetype_backend.FontRenderer(VF_FONT)
+    renderer.render_row("aaaa", 16, target_height=30, baseline_y=20)
+    assert renderer.glyph_bitmap.cache_info().misses == 1
+    assert renderer.glyph_bitmap.cache_info().hits == 3
+
+    # A new size or location is rasterised afresh, and again only once
+    renderer.render_row("aa", 20, target_height=30, baseline_y=20)
+    renderer.set_variations({"wght": 700})
+    bold = renderer.render_row("aa", 20, target_height=30, baseline_y=20)
+    assert renderer.glyph_bitmap.cache_info().misses == 3
+    renderer.set_variations(None)
+    regular = renderer.render_row("aa", 20, target_height=30, baseline_y=20)
+    assert renderer.glyph_bitmap.cache_info().misses == 3
+    assert bold.tobytes() != regular.tobytes()
+
+
+def test_render_all_in_parallel(tmp_path, capsys, changed_font):
+    from gftools.scripts.render_text import main
+
+    for jobs in ("1", "2"):
+        main(
+            ["diff", VF_FONT, changed_font, "Hamburg", "--all", "--backend"]
+            + ["freetype", "-o", str(tmp_path / jobs), "-j", jobs]
+        )
+    printed = capsys.readouterr().out.splitlines()
+    serial, parallel = printed[: len(printed) // 2], printed[len(printed) // 2 :]
+    assert [p.replace(str(tmp_path / "1"), "") for p in serial] == [
+        p.replace(str(tmp_path / "2"), "") for p in parallel
+    ]
+    for path in serial:
+        if path.endswith(".json"):
+            continue
+        other = path.replace(str(tmp_path / "1"), str(tmp_path / "2"))
+        assert open(path, "rb").read() == open(other, "rb").read()
+
+
+def test_diff_skips_identical_renders(tmp_path, capsys, changed_font):
+    from gftools.scripts.render_text import main
+
+    # "a" is not in the text, so the renders are identical
+    main(["diff", VF_FONT, changed_font, "Hxyz", "--backend", "freetype"])
+    out_dir = tmp_path / "Lora-Changed_diff"
+    (instance,) = json.loads((out_dir / "summary.json").read_text())["instances"]
+    assert instance["identical"] is True
+    assert instance["before_digest"] == instance["after_digest"]
+    assert instance["output"] is None
+    assert os.listdir(out_dir) == ["summary.json"]
+
+    main(["diff", VF_FONT, changed_font, "Habc", "--backend", "freetype"])
+    (instance,) = json.loads((out_dir / "summary.json").read_text())["instances"]
+    assert instance["identical"] is False
+    assert instance["changed_pixels"] > 0
+    assert instance["output"] == str(out_dir)
+    assert (out_dir / "diff.png").exists()
+
+    # The same font is not even rendered
+    main(["diff", VF_FONT, VF_FONT, "Habc", "-o", str(tmp_path / "same")])
+    (instance,) = json.loads((tmp_path / "same" / "summary.json").read_text())[
+        "instances"
+    ]
+    assert instance["identical"] is True
+    assert instance["before_digest"] is None
+    assert os.listdir(tmp_path / "same") == ["summary.json"]
+
+
+def test_diff_stats():
+    from PIL import Image
+
+    before = Image.new("RGB", (10, 8), "white")
+    after = before.copy()
+    assert diff_stats(before, after) == {
+        "changed_pixels": 0,
+        "max_delta": 0,
+        "bbox": None,
+    }
+    after.putpixel((2, 3), (255, 200, 255))
+    after.putpixel((6, 4), (250, 250, 250))
+    assert diff_stats(before, after) == {
+        "changed_pixels": 2,
+        "max_delta": 55,
+        "bbox": [2, 3, 7, 5],
+    }
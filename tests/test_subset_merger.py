@@ -1,3 +1,10 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+import requests
 from fontTools.designspaceLib import DesignSpaceDocument
 from gftools import subsetmerger
 from gftools.subsetmerger import DonorMasterDescriptor, InputDescriptor
@@ -35,3 +42,256 @@ def test_descriptor_compatibility():
         DonorMasterDescriptor(donor_ds_incompat, master, Font()),
         input_descriptor,
     )
+
+
+AXES = {
+    "Weight": dict(tag="wght", minimum=400, maximum=700, default=400),
+    "Width": dict(tag="wdth", minimum=75, maximum=100, default=100),
+}
+
+
+def _write_family(directory, name, locations, glyphs, upm=1000):
+    ds = DesignSpaceDocument()
+    for axis in locations[0]:
+        ds.addAxisDescriptor(name=axis, **AXES[axis])
+    for location in locations:
+        filename = "-".join([name, *map(str, location.values())]) + ".ufo"
+        ufo = Font()
+        ufo.info.unitsPerEm = upm
+        ufo.info.ascender, ufo.info.descender = upm * 0.8, upm * -0.2
+        ufo.info.capHeight, ufo.info.xHeight = upm * 0.7, upm * 0.5
+        for glyph_name, codepoint in glyphs.items():
+            glyph = ufo.newGlyph(glyph_name)
+            glyph.unicodes = [codepoint]
+            glyph.width = 500
+        ufo.groups["public.kern1.AB"] = list(glyphs)
+        ufo.kerning[("public.kern1.AB", list(glyphs)[0])] = -100
+        ufo.save(directory / filename)
+        ds.addSourceDescriptor(filename=filename, location=location)
+    ds.write(directory / f"{name}.designspace")
+    return str(directory / f"{name}.designspace")
+
+
+def test_donor_ufos_are_opened_once(tmp_path, monkeypatch):
+    input_ds = _write_family(
+        tmp_path,
+        "Input",
+        [{"Weight": 400, "Width": 100}, {"Weight": 700, "Width": 100}],
+        {"space": 0x20},
+    )
+    # A donor without a weight axis, so both input masters take glyphs from
+    # its normal width master. The condensed master never matches, so should
+    # never be opened.
+    donor_ds = _write_family(
+        tmp_path,
+        "Donor",
+        [{"Width": 100}, {"Width": 75}],
+        {"A": 0x41, "B": 0x42},
+        upm=2000,
+    )
+
+    opened = []
+
+    def open_ufo(path):
+        opened.append(os.path.basename(path))
+        return Font.open(path)
+
+    monkeypatch.setattr(subsetmerger, "open_ufo", open_ufo)
+    # Two merges per master from the same donor
+    subsets = [
+        {"from": donor_ds, "glyphNames": ["A"]},
+        {"from": donor_ds, "glyphNames": ["B"], "layoutHandling": "ignore"},
+    ]
+    output_ds = tmp_path / "out" / "Input.designspace"
+    subsetmerger.SubsetMerger(input_ds, str(output_ds), subsets).add_subsets()
+
+    assert [name for name in opened if name.startswith("Donor")] == ["Donor-100.ufo"]
+    for weight in (400, 700):
+        merged = Font.open(tmp_path / "out" / f"Input-{weight}-100.ufo")
+        # Every merge gets its own copy of the donor, unaffected by the
+        # scaling and kerning group pruning done by earlier merges
+        assert merged["A"].width == merged["B"].width == 250
+        assert merged.kerning[("public.kern1.AB", "A")] == -50
+
+
+def test_add_subsets_in_parallel(tmp_path):
+    masters = [{"Weight": 400}, {"Weight": 550}, {"Weight": 700}]
+    input_ds = _write_family(tmp_path, "Input", masters, {"space": 0x20})
+    donor_ds = _write_family(tmp_path, "Donor", masters, {"A": 0x41, "B": 0x42})
+    subsets = [{"from": donor_ds, "glyphNames": ["A", "B"]}]
+
+    for jobs in (1, 2):
+        output_ds = tmp_path / f"out{jobs}" / "Input.designspace"
+        subsetmerger.SubsetMerger(
+            input_ds, str(output_ds), subsets, jobs=jobs
+        ).add_subsets()
+        # Nothing is left behind by the in-process "worker" of jobs=1
+        assert subsetmerger._merger is subsetmerger._input_ds is None
+
+    serial = DesignSpaceDocument.fromfile(tmp_path / "out1" / "Input.designspace")
+    parallel = DesignSpaceDocument.fromfile(tmp_path / "out2" / "Input.designspace")
+    assert [s.filename for s in parallel.sources] == [
+        s.filename for s in serial.sources
+    ]
+    for source in parallel.sources:
+        merged = Font.open(source.path)
+        assert set(merged.keys()) == {"space", "A", "B"}
+        assert merged.kerning == Font.open(tmp_path / "out1" / source.filename).kerning
+
+
+def test_subset_sources_are_cached_by_commit(tmp_path, monkeypatch):
+    # A GitHub archive of a repository: a designspace whose master includes
+    # a feature file, next to files we don't need
+    sha = "0123456789abcdef0123456789abcdef01234567"
+    repo = tmp_path / f"repo-{sha}"
+    (repo / "sources").mkdir(parents=True)
+    _write_family(repo / "sources", "Donor", [{"Weight": 400}], {"A": 0x41})
+    features = repo / "sources" / "Donor-400.ufo" / "features.fea"
+    features.write_text("include(../features/kern.fea);")
+    (repo / "features").mkdir()
+    (repo / "features" / "kern.fea").write_text("# kerning")
+    (repo / "fonts").mkdir()
+    (repo / "fonts" / "Donor.ttf").write_bytes(b"\0" * 100)
+    (repo / "sources" / "Other").mkdir()
+    _write_family(repo / "sources" / "Other", "Other", [{"Weight": 400}], {"A": 0x41})
+    archive = shutil.make_archive(
+        str(tmp_path / "archive"), "zip", root_dir=tmp_path, base_dir=repo.name
+    )
+
+    downloads = []
+
+    def download_file(url, dst_path):
+        downloads.append(url)
+        shutil.copy(archive, dst_path)
+
+    monkeypatch.setattr(subsetmerger, "download_file", download_file)
+    monkeypatch.setattr(subsetmerger, "resolve_github_ref", lambda repo, ref: sha)
+
+    cache = tmp_path / "cache"
+    checkout = cache / "owner" / "repo" / sha
+    upstream = {"repo": "owner/repo@main", "path": "sources/Donor.designspace"}
+
+    def resolve_upstream(upstream):
+        merger = subsetmerger.SubsetMerger(
+            "Input.designspace",
+            str(tmp_path / "out" / "Input.designspace"),
+            [],
+            cache=str(cache),
+        )
+        return merger.resolve_upstream(upstream)[0]
+
+    path = resolve_upstream(upstream)
+    assert path == str(checkout / "sources" / "Donor.designspace")
+    assert downloads == [f"https://github.com/owner/repo/archive/{sha}.zip"]
+    assert (checkout / "sources" / "Donor-400.ufo" / "fontinfo.plist").exists()
+    assert (checkout / "features" / "kern.fea").exists()
+    assert not (checkout / "fonts").exists()
+
+    # Another ref pointing to the same commit shares the same files
+    resolve_upstream({**upstream, "repo": "owner/repo@v1.0"})
+    assert len(downloads) == 1
+
+    # Another path from the same commit comes from the archive already on disk
+    assert not (checkout / "sources" / "Other").exists()
+    other = resolve_upstream({**upstream, "path": "sources/Other/Other.designspace"})
+    assert other == str(checkout / "sources" / "Other" / "Other.designspace")
+    assert len(downloads) == 1
+    refs = json.loads((cache / "owner" / "repo" / "refs.json").read_text())
+    assert refs == {"main": sha, "v1.0": sha}
+
+    # Offline, the last known commit of a ref is used
+    def offline(repo, ref):
+        raise requests.ConnectionError("offline")
+
+    monkeypatch.setattr(subsetmerger, "resolve_github_ref", offline)
+    assert resolve_upstream(upstream) == path
+    with pytest.raises(requests.ConnectionError):
+        resolve_upstream({**upstream, "repo": "owner/repo@dev"})
+
+
+def test_interpolated_donor_instances_are_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv("GFTOOLS_CACHE_DIR", str(tmp_path / "cache"))
+    input_ds = _write_family(tmp_path, "Input", [{"Weight": 550}], {"space": 0x20})
+    donor_ds = _write_family(
+        tmp_path, "Donor", [{"Weight": 400}, {"Weight": 700}], {"A": 0x41}
+    )
+    # The donor has no master at the input's location, only an instance
+    ds = DesignSpaceDocument.fromfile(donor_ds)
+    ds.addInstanceDescriptor(
+        name="Donor Medium",
+        familyName="Donor",
+        styleName="Medium",
+        filename="instances/Donor-Medium.ufo",
+        location={"Weight": 550},
+    )
+    ds.write(donor_ds)
+    subsets = [{"from": donor_ds, "glyphNames": ["A"]}]
+
+    subsetmerger.SubsetMerger(
+        input_ds, str(tmp_path / "out1" / "Input.designspace"), subsets
+    ).add_subsets()
+
+    # A second build at the same location needn't interpolate again
+    def interpolate(*args, **kwargs):
+        raise AssertionError("Instance should have been cached")
+
+    monkeypatch.setattr(
+        subsetmerger.FontProject, "interpolate_instance_ufos", interpolate
+    )
+    subsetmerger.SubsetMerger(
+        input_ds, str(tmp_path / "out2" / "Input.designspace"), subsets
+    ).add_subsets()
+    first = Font.open(tmp_path / "out1" / "Input-550.ufo")
+    second = Font.open(tmp_path / "out2" / "Input-550.ufo")
+    assert "A" in second
+    assert first["A"] == second["A"]
+
+
+def test_cached_glyphs_sources_are_converted_under_the_lock(tmp_path, monkeypatch):
+    from filelock import FileLock, Timeout
+
+    sha = "0123456789abcdef0123456789abcdef01234567"
+    repo = tmp_path / f"repo-{sha}"
+    (repo / "sources").mkdir(parents=True)
+    (repo / "sources" / "Donor.glyphs").write_text("{}")
+    archive = shutil.make_archive(
+        str(tmp_path / "archive"), "zip", root_dir=tmp_path, base_dir=repo.name
+    )
+    monkeypatch.setattr(
+        subsetmerger, "download_file", lambda url, dst: shutil.copy(archive, dst)
+    )
+    monkeypatch.setattr(subsetmerger, "resolve_github_ref", lambda repo, ref: sha)
+
+    cache = tmp_path / "cache"
+    sources = cache / "owner" / "repo" / sha / "sources"
+    conversions = []
+
+    def glyphs_to_designspace(source, directory, designspace_name):
+        lock = cache / ".gftools_subsetmerger_owner_repo.lock"
+        with pytest.raises(Timeout):
+            FileLock(str(lock), timeout=0).acquire()
+        assert directory != str(sources)
+        conversions.append(source)
+        _write_family(Path(directory), "Donor", [{"Weight": 400}], {"A": 0x41})
+        return os.path.join(directory, designspace_name)
+
+    monkeypatch.setattr(subsetmerger, "glyphs_to_designspace", glyphs_to_designspace)
+    upstream = {"repo": "owner/repo@main", "path": "sources/Donor.glyphs"}
+    for _ in range(2):
+        merger = subsetmerger.SubsetMerger(
+            "Input.designspace",
+            str(tmp_path / "out" / "Input.designspace"),
+            [],
+            cache=str(cache),
+        )
+        path = merger.resolve_upstream(upstream)[0]
+        assert path == str(sources / "Donor.designspace")
+    assert len(conversions) == 1
+    assert sorted(os.listdir(sources)) == [
+        "Donor-400.ufo",
+        "Donor.designspace",
+        "Donor.glyphs",
+    ]
+    assert DesignSpaceDocument.fromfile(path).sources[0].path == str(
+        sources / "Donor-400.ufo"
+    )
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+import ufoLib2
+from ufoLib2.objects import Anchor, Guideline, Image
+
+from gftools import ufojson
+from gftools.utils import open_ufo, save_ufo
+
+
+CWD = os.path.dirname(__file__)
+TEST_UFO = os.path.join(
+    CWD,
+    "..",
+    "data",
+    "test",
+    "builder",
+    "check_compatibility_ufo_1",
+    "TestFamily-Black.ufo",
+)
+
+
+def _decorated_ufo():
+    ufo = ufoLib2.Font.open(TEST_UFO, lazy=False)
+    glyph = next(g for g in ufo if g.contours)
+    points = glyph.contours[0].points
+    points[0].smooth = True
+    points[0].name = "start"
+    points[1].identifier = "pt1"
+    glyph.contours[0].identifier = "c0"
+    glyph.anchors.append(Anchor(10, 20, "top"))
+    glyph.guidelines.append(Guideline(x=5, name="g"))
+    glyph.image = Image("sketch.png")
+    glyph.lib["com.example"] = {"a": [1, 2.5, "b"]}
+    glyph.getPen().addComponent("A", (1, 0, 0, 1, 10, 0))
+    background = ufo.newLayer("public.background", color="1,0,0,1")
+    background.newGlyph(glyph.name).width = 100
+    background.lib["x"] = 1
+    ufo.data["com.example/blob.bin"] = b"\x00\x01"
+    return ufo
+
+
+def test_json_matches_ufolib2():
+    ufo = _decorated_ufo()
+    data = ufojson.dumps(ufo)
+    assert data == ufo.json_dumps()
+
+    loaded = ufojson.loads(data)
+    expected = ufoLib2.Font.json_loads(data)
+    assert loaded == expected
+    assert ufojson.dumps(loaded) == expected.json_dumps()
+
+
+def test_unknown_point_attributes_are_rejected():
+    ufo = ufoLib2.Font()
+    pen = ufo.newGlyph("a").getPen()
+    pen.moveTo((0, 0))
+    pen.lineTo((0, 10))
+    pen.closePath()
+    data = ufojson.dumps(ufo).replace(b'"x"', b'"wat":1,"x"')
+    with pytest.raises(Exception):
+        ufojson.loads(data)
+
+
+def test_save_and_open_ufo(tmp_path):
+    ufo = _decorated_ufo()
+    for name in ("Master.ufo", "Master.ufoz", "Master.ufo.json"):
+        path = str(tmp_path / name)
+        save_ufo(ufo, path)
+        assert open_ufo(path) == ufo
+    assert (tmp_path / "Master.ufoz").is_file()
@@ -0,0 +1,110 @@
+import ufoLib2
+
+from gftools import ufomerge
+from gftools.ufomerge import merge_ufos
+
+
+def _font(glyph_names):
+    ufo = ufoLib2.Font()
+    for name in glyph_names:
+        glyph = ufo.newGlyph(name)
+        pen = glyph.getPen()
+        pen.moveTo((0, 0))
+        pen.lineTo((0, 100))
+        pen.lineTo((100, 100))
+        pen.closePath()
+    ufo.lib["public.glyphOrder"] = list(glyph_names)
+    return ufo
+
+
+def test_merge_ufos():
+    ufo1 = _font(["space", "A"])
+    ufo2 = _font(["A", "B", "C", "acutecomb", "B.alt", "C.alt"])
+    ufo2["B"].clearContours()
+    ufo2["B"].getPen().addComponent("acutecomb", (1, 0, 0, 1, 0, 0))
+    ufo2.groups["public.kern1.BC"] = ["B", "C"]
+    ufo2.groups["public.kern2.BC"] = ["B", "C"]
+    ufo2.kerning[("public.kern1.BC", "public.kern2.BC")] = -20
+    ufo2.kerning[("B", "A")] = -10
+    # C isn't merged, so neither is any pair which needs it
+    ufo2.kerning[("C", "A")] = -30
+    ufo2.features.text = """
+        @ALTS = [B C];
+        lookup alts { sub @ALTS by B.alt; } alts;
+        lookup single { sub B by B.alt; sub C by C.alt; } single;
+        feature ss01 { lookup single; } ss01;
+        feature ss02 { lookup alts; } ss02;
+    """
+
+    merge_ufos(ufo1, ufo2, glyphs=["B", "B.alt"], existing_handling="skip")
+
+    assert ufo1.lib["public.glyphOrder"] == [
+        "space",
+        "A",
+        "B",
+        "B.alt",
+        "acutecomb",
+    ]
+    assert set(ufo1.keys()) == {"space", "A", "B", "B.alt", "acutecomb"}
+    assert ufo1.groups["public.kern1.BC"] == ["B"]
+    assert ufo1.kerning[("public.kern1.BC", "public.kern2.BC")] == -20
+    assert ufo1.kerning[("B", "A")] == -10
+    assert ("C", "A") not in ufo1.kerning
+    assert "sub B by B.alt;" in ufo1.features.text
+    assert "C.alt" not in ufo1.features.text
+    assert "feature ss01" in ufo1.features.text
+    assert "feature ss02" in ufo1.features.text
+
+
+def test_parsed_features_are_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv("GFTOOLS_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ufomerge, "_parsed_features", {})
+    parsed = []
+    parse = ufomerge._parse_features
+    monkeypatch.setattr(
+        ufomerge, "_parse_features", lambda ufo: parsed.append(ufo) or parse(ufo)
+    )
+    donor = _font(["A", "A.alt"])
+    donor.features.text = "feature ss01 { sub A by A.alt; } ss01;"
+
+    merged = []
+    for _ in range(2):
+        ufo1 = _font(["space"])
+        merge_ufos(ufo1, donor, glyphs=["A", "A.alt"], cache_features_on_disk=True)
+        merged.append(ufo1.features.text)
+    # Parsed once, and the first merge didn't affect the second
+    assert len(parsed) == 1
+    assert merged[0] == merged[1]
+    assert "sub A by A.alt;" in merged[0]
+
+    # A later run reads the parsed features back from disk...
+    monkeypatch.setattr(ufomerge, "_parsed_features", {})
+    ff, routine_features = ufomerge.parse_features(donor, cache_on_disk=True)
+    assert len(parsed) == 1
+    assert routine_features == [["ss01"]]
+    # ...but any change to the feature code means parsing it again
+    donor.features.text += "\nfeature ss02 { sub A by A.alt; } ss02;"
+    ufomerge.parse_features(donor)
+    assert len(parsed) == 2
+
+
+def test_parsed_features_cache_follows_includes(tmp_path, monkeypatch):
+    monkeypatch.setenv("GFTOOLS_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(ufomerge, "_parsed_features", {})
+    donor = _font(["A", "A.alt", "B", "B.alt"])
+    donor.features.text = "include(features/ss01.fea);"
+    (tmp_path / "features").mkdir()
+    (tmp_path / "features" / "ss01.fea").write_text("include(features/ss02.fea);")
+    included = tmp_path / "features" / "ss02.fea"
+    included.write_text("feature ss02 { sub A by A.alt; } ss02;")
+    donor.save(tmp_path / "Donor.ufo")
+
+    def routines():
+        # Each run starts with an empty memory cache, as a new process would
+        monkeypatch.setattr(ufomerge, "_parsed_features", {})
+        ff, routine_features = ufomerge.parse_features(donor, cache_on_disk=True)
+        return routine_features
+
+    assert routines() == [["ss02"]]
+    included.write_text("feature ss03 { sub B by B.alt; } ss03;")
+    assert routines() == [["ss03"]]
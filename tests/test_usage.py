@@ -180,6 +180,59 @@ class TestGFToolsScripts(unittest.TestCase):
 
         main([self.example_font])
 
+    def test_fix_font_batch(self):
+        import contextlib
+        import io
+        import json
+        from gftools.scripts.fix_font import main
+
+        missing = os.path.join(self.example_dir, "Missing.ttf")
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), self.assertRaises(SystemExit):
+            main(["--batch", "-j", "1", self.example_font, missing])
+        results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([r["font"] for r in results], [self.example_font, missing])
+        self.assertEqual(results[0]["out"], self.example_font + ".fix")
+        self.assertIn("error", results[1])
+
+    def test_fix_font_batch_survives_crashes(self):
+        import contextlib
+        import io
+        import json
+        import shutil
+        import tempfile
+        from unittest import mock
+        from gftools.scripts import fix_font
+
+        real_fix = fix_font.fix_font_file
+
+        def crashing_fix(path, out_path, fix_args):
+            if "crash" in path:
+                os._exit(1)
+            return real_fix(path, out_path, fix_args)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            fonts = []
+            for family in ("a", "b", "crash"):
+                os.mkdir(os.path.join(tmp, family))
+                fonts.append(os.path.join(tmp, family, "Cabin-Regular.ttf"))
+                shutil.copy(self.example_font, fonts[-1])
+            out = os.path.join(tmp, "out")
+            stdout = io.StringIO()
+            with (
+                contextlib.redirect_stdout(stdout),
+                mock.patch.object(fix_font, "fix_font_file", crashing_fix),
+                self.assertRaises(SystemExit),
+            ):
+                fix_font.main(["--batch", "-j", "2", "-o", out] + fonts[::-1])
+            results = [json.loads(l) for l in stdout.getvalue().splitlines()]
+            self.assertEqual([r["font"] for r in results], fonts[::-1])
+            self.assertIn("crashed", results[0]["error"])
+            self.assertEqual(
+                sorted(r["out"] for r in results[1:]),
+                [os.path.join(out, f, "Cabin-Regular.ttf") for f in ("a", "b")],
+            )
+
     def test_fix_family(self):
         from gftools.scripts.fix_family import main
 
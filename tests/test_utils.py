@@ -98,3 +98,219 @@ def test_supported_languages():
     langs = [l.id for l in SupportedLanguages(ttfont)]
     assert len(langs) >= 350
     assert "en_Latn" in langs
+
+
+def test_cached_get(tmp_path, monkeypatch):
+    import requests
+    from gftools import utils
+
+    monkeypatch.setenv("GFTOOLS_CACHE_DIR", str(tmp_path))
+    calls = []
+
+    class Response:
+        def __init__(self, status_code, content=b"", headers=None):
+            self.status_code = status_code
+            self.content = content
+            self.headers = headers or {}
+
+        def raise_for_status(self):
+            pass
+
+    def fake_get(url, headers=None, auth=None):
+        calls.append(headers)
+        if headers.get("If-None-Match") == '"v1"':
+            return Response(304)
+        return Response(200, b"payload", {"ETag": '"v1"'})
+
+    class Session:
+        get = staticmethod(fake_get)
+
+    monkeypatch.setattr(utils, "http_session", Session)
+    url = "https://fonts.google.com/metadata/fonts"
+    assert utils.cached_get(url) == b"payload"
+    # Fresh responses don't touch the network
+    assert utils.cached_get(url) == b"payload"
+    assert len(calls) == 1
+    # Stale ones are revalidated with their ETag
+    assert utils.cached_get(url, ttl=0) == b"payload"
+    assert calls[-1] == {"If-None-Match": '"v1"'}
+
+    # An unreachable server falls back to the stale copy
+    def offline(url, headers=None, auth=None):
+        raise requests.ConnectionError("offline")
+
+    Session.get = staticmethod(offline)
+    assert utils.cached_get(url, ttl=0) == b"payload"
+    with pytest.raises(requests.ConnectionError):
+        utils.cached_get("https://fonts.google.com/other", ttl=0)
+
+
+def test_download_file(tmp_path):
+    import hashlib
+    import os
+    import threading
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+    from io import BytesIO
+    from gftools.utils import download_file
+
+    payload = bytes(range(256)) * 4096
+    (tmp_path / "served").mkdir()
+    (tmp_path / "served" / "file.bin").write_bytes(payload)
+    ranges = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        # Just enough Range and If-Range support to resume a download
+        def send_head(self):
+            if "Range" not in self.headers:
+                return super().send_head()
+            ranges.append(self.headers["Range"])
+            path = self.translate_path(self.path)
+            if self.headers.get("If-Range") != self.date_time_string(
+                int(os.path.getmtime(path))
+            ):
+                return super().send_head()
+            start = int(self.headers["Range"][len("bytes=") :].rstrip("-"))
+            data = open(path, "rb").read()
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return BytesIO(b"")
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(data)-1}/{len(data)}"
+            )
+            self.send_header("Content-Length", str(len(data) - start))
+            self.end_headers()
+            return BytesIO(data[start:])
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), partial(Handler, directory=str(tmp_path / "served"))
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/file.bin"
+    try:
+        with download_file(url) as fp:
+            assert fp.read() == payload
+
+        # A partial download is resumed rather than started again
+        dst = tmp_path / "file.bin"
+        part = tmp_path / "file.bin.part"
+        validator = tmp_path / "file.bin.part.validator"
+        last_modified = Handler.date_time_string(
+            None, int(os.path.getmtime(tmp_path / "served" / "file.bin"))
+        )
+        part.write_bytes(payload[:1000])
+        validator.write_text(last_modified)
+        download_file(url, str(dst), sha256=hashlib.sha256(payload).hexdigest())
+        assert dst.read_bytes() == payload
+        assert ranges == ["bytes=1000-"]
+        assert not part.exists() and not validator.exists()
+
+        # Unless the resource has changed since
+        part.write_bytes(b"x" * 1000)
+        validator.write_text("Thu, 01 Jan 2015 00:00:00 GMT")
+        download_file(url, str(dst))
+        assert dst.read_bytes() == payload
+
+        # Or there is no way to tell whether it has
+        part.write_bytes(b"x" * 1000)
+        download_file(url, str(dst))
+        assert dst.read_bytes() == payload
+        assert ranges == ["bytes=1000-", "bytes=1000-"]
+
+        # A partial download longer than the resource is started again
+        part.write_bytes(payload + b"x" * 1000)
+        validator.write_text(last_modified)
+        download_file(url, str(dst))
+        assert dst.read_bytes() == payload
+        assert not part.exists()
+
+        with pytest.raises(ValueError):
+            download_file(url, str(tmp_path / "bad.bin"), size=1)
+        assert not (tmp_path / "bad.bin.part").exists()
+    finally:
+        server.shutdown()
+
+
+def test_parallel_map_unordered_streams_its_input():
+    import itertools
+
+    from gftools.utils import parallel_map_unordered
+
+    # An endless input is only consumed as far as the window allows
+    results = parallel_map_unordered(abs, itertools.count(-10), jobs=2, window=4)
+    first = sorted(itertools.islice(results, 5))
+    results.close()
+    assert {index for index, _ in first} <= set(range(9))
+    assert all(result == abs(index - 10) for index, result in first)
+    assert sorted(parallel_map_unordered(pow, [2, 3], [3, 2], jobs=1)) == [
+        (0, 8),
+        (1, 9),
+    ]
+
+
+def test_prune_cache(tmp_path, monkeypatch, capsys):
+    import os
+    import time
+
+    from filelock import FileLock
+
+    from gftools.utils import maybe_prune_cache, prune_cache
+
+    cache = tmp_path / "http"
+    cache.mkdir()
+    now = time.time()
+
+    def entry(key, age, size=10):
+        for suffix in (".body", ".json", ".lock"):
+            path = cache / f"{key}{suffix}"
+            path.write_bytes(b"x" * size if suffix == ".body" else b"")
+            os.utime(path, (now - age, now - age))
+
+    entry("old", 40 * 86400)
+    entry("locked", 40 * 86400)
+    entry("big", 2 * 86400, size=1000)
+    entry("new", 0)
+    (cache / ".tmp-writing").write_bytes(b"")
+    with FileLock(str(cache / "locked.lock")):
+        # Another process would wait on this; prune_cache must not
+        pid = os.fork()
+        if pid == 0:
+            os._exit(prune_cache(cache, max_age=30 * 86400)[0])
+        assert os.waitpid(pid, 0)[1] >> 8 == 1
+    names = sorted(os.listdir(cache))
+    assert "old.body" not in names and "old.json" not in names
+    assert {"old.lock", "locked.body", "big.body", "new.body"} <= set(names)
+
+    # Then the least recently used entries go, until the rest fit
+    assert prune_cache(cache, max_size=500) == (2, 1010)
+    assert sorted(p for p in os.listdir(cache) if not p.endswith(".lock")) == [
+        ".tmp-writing",
+        "new.body",
+        "new.json",
+    ]
+
+    # Caches prune themselves at most once a day
+    monkeypatch.setenv("GFTOOLS_CACHE_MAX_AGE", "1")
+    os.utime(cache / "new.body", (now - 10, now - 10))
+    os.utime(cache / "new.json", (now - 10, now - 10))
+    (cache / ".last-pruned").touch()
+    maybe_prune_cache(cache)
+    assert (cache / "new.body").exists()
+    os.utime(cache / ".last-pruned", (now - 2 * 86400, now - 2 * 86400))
+    maybe_prune_cache(cache)
+    assert not (cache / "new.body").exists()
+    assert (cache / ".tmp-writing").exists()
+
+    from gftools.scripts.clean_cache import main
+
+    monkeypatch.setenv("GFTOOLS_CACHE_DIR", str(tmp_path))
+    entry("again", 0)
+    main(["--all"])
+    assert "http: removed 1 entries" in capsys.readouterr().out
+    assert not (cache / "again.body").exists()